@@ -1,173 +1,218 @@
+import hashlib
+import json
+import os
 import re
+import sys
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import review_cache  # noqa: E402
+from rolling_stats import RollingScorer  # noqa: E402
+from taxonomy_store import load_taxonomy  # noqa: E402
+from text_clusters import cluster_texts  # noqa: E402
+
 
 @dataclass(frozen=True)
 class Theme:
     name: str
 
 
-THEMES = [
-    Theme("Ads related issues"),
-    Theme("Coins related issues"),
-    Theme("Content discovery issues"),
-    Theme("Listening related issues"),
-    Theme("Payments & Support"),
-    Theme("Localization & Availability"),
-    Theme("Content quality & format"),
-    Theme("Other")
-]
-
-
-# Canonical subcategory mapping to themes (MECE by design here)
-SUBCAT_TO_THEME: Dict[str, str] = {
-    # Ads related
-    "Ads gating / too many ads": "Ads related issues",
-    "Misleading ads / bait-and-switch": "Ads related issues",
-    "Story mismatch vs ads": "Ads related issues",
-
-    # Coins related
-    "Too expensive / high coin cost": "Coins related issues",
-    "Too slow unlock / few free episodes": "Coins related issues",
-    "Subscription needed / request": "Coins related issues",
-
-    # Listening related
-    "Crashes / app not working": "Listening related issues",
-    "Buffering / won't load": "Listening related issues",
-    "Playback jumps / episode switching": "Listening related issues",
-    "Offline / download issues": "Listening related issues",
-    "Notifications / interruptions": "Listening related issues",
-
-    # Payments & Support
-    "Billing / refund / trial issues": "Payments & Support",
-    "Unauthorized charge / auto pay": "Payments & Support",
-    "Support unresponsive": "Payments & Support",
-
-    # Localization
-    "Missing languages / dubbing": "Localization & Availability",
+# Theme rules from taxonomies/themes.json; their patterns are written in lower case and
+# matched case-insensitively
+THEME_TAXONOMY = load_taxonomy(review_cache.THEME_TAXONOMY)
 
-    # Content quality & format
-    "AI voices / quality": "Content quality & format",
-    "Visual vs audio expectation": "Content quality & format",
-}
+THEMES = [Theme(name) for name in THEME_TAXONOMY.data["themes"]]
 
+# Canonical subcategory mapping to themes
+SUBCAT_TO_THEME: Dict[str, str] = THEME_TAXONOMY.data["subcategory_themes"]
 
 # Fallback: category label to theme
-CATEGORY_TO_THEME: Dict[str, str] = {
-    "Playback & Performance": "Listening related issues",
-    "Monetization & Pricing": "Coins related issues",
-    "Payments & Support": "Payments & Support",
-    "Localization & Availability": "Localization & Availability",
-    # Content & UX maps to content quality & format unless we detect discovery via text
-    "Content & UX": "Content quality & format",
-}
-
+CATEGORY_TO_THEME: Dict[str, str] = THEME_TAXONOMY.data["category_themes"]
 
 # Heuristic keyword rules for themes when subcategory is missing/unknown
 THEME_REGEXES: List[Tuple[str, re.Pattern]] = [
-    ("Ads related issues", re.compile(r"\b(ad|ads|advert|commercial)s?\b", re.IGNORECASE)),
-    ("Coins related issues", re.compile(r"\b(coin|price|expensive|cost|paywall|micro\s*transaction|subscription)\b", re.IGNORECASE)),
-    ("Listening related issues", re.compile(r"\b(crash|buffer|lag|freeze|bug|download|offline|load(ing)?|not\s+work(ing)?)\b", re.IGNORECASE)),
-    ("Payments & Support", re.compile(r"\b(refund|charged?|billing|invoice|payment|customer\s*service|support|help|contact)\b", re.IGNORECASE)),
-    ("Localization & Availability", re.compile(r"\b(language|dub|translation|locali[sz]ation|region|available|availability)\b", re.IGNORECASE)),
+    (rule["label"], re.compile(rule["pattern"], re.IGNORECASE)) for rule in THEME_TAXONOMY.data["theme_rules"]
 ]
 
-
-# Heuristic keyword rules for content discovery issues
-DISCOVERY_REGEX = re.compile(
-    r"(start(s|ed)?\s+another\s+series|auto[- ]?start|recommend|discover|search|find(\s+new)?|home\s+(page|feed)|curat|suggest|no\s+new\s+stor)",
-    re.IGNORECASE,
-)
-
-
-# Canonical subcategory mapping for discovery-related issues (MECE within the theme)
+# Heuristic keyword rules for content discovery issues, and the discovery theme's subcategories
+DISCOVERY_THEME: str = THEME_TAXONOMY.data["discovery"]["theme"]
+DISCOVERY_REGEX = re.compile(THEME_TAXONOMY.data["discovery"]["pattern"], re.IGNORECASE)
+DISCOVERY_DEFAULT: str = THEME_TAXONOMY.data["discovery"]["default"]
 DISCOVERY_SUBCATS: List[Tuple[str, re.Pattern]] = [
-    ("Auto-starts other series", re.compile(r"start(s|ed)?\s+another\s+series|auto[- ]?start", re.IGNORECASE)),
-    ("Poor recommendations/irrelevant suggestions", re.compile(r"recommend|suggest|curat", re.IGNORECASE)),
-    ("Search/discoverability issues", re.compile(r"search|find(\s+new)?|home\s+(page|feed)", re.IGNORECASE)),
-    ("Lack of new content", re.compile(r"no\s+new\s+stor", re.IGNORECASE)),
+    (rule["label"], re.compile(rule["pattern"], re.IGNORECASE)) for rule in THEME_TAXONOMY.data["discovery"]["rules"]
 ]
 
-
-def _split_multi(value: Optional[str]) -> List[str]:
-    if value is None:
-        return []
-    if not isinstance(value, str):
-        value = str(value)
-    parts = [p.strip() for p in value.split(";") if p and str(p).strip()]
-    return parts
-
-
-def _infer_discovery_subcategory(text: str) -> Optional[str]:
-    for label, pattern in DISCOVERY_SUBCATS:
-        if pattern.search(text or ""):
-            return label
-    return None
-
-
-def _assign_theme_and_subcat(row: pd.Series) -> List[Tuple[str, str]]:
-    assignments: List[Tuple[str, str]] = []
-
-    # Ensure review_text is a string for regex
-    rt = row.get("review_text", "")
-    review_text = rt if isinstance(rt, str) else ("" if pd.isna(rt) else str(rt))
-    categories = _split_multi(row.get("categories"))
-    subcategories = _split_multi(row.get("subcategories"))
-
-    # 1) Use explicit subcategories if present
-    for subcat in subcategories:
-        theme = SUBCAT_TO_THEME.get(subcat)
-        if theme:
-            assignments.append((theme, subcat))
-
-    # 2) If nothing assigned yet, map categories to themes
-    if not assignments:
-        for cat in categories:
-            theme = CATEGORY_TO_THEME.get(cat)
-            if theme:
-                # Use category as subcategory placeholder if no subcategory
-                assignments.append((theme, cat))
-
-    # 3) Discovery-specific detection from text (only add if not already assigned under discovery)
-    if DISCOVERY_REGEX.search(review_text):
-        subcat = _infer_discovery_subcategory(review_text) or "Content discovery friction"
-        assignments.append(("Content discovery issues", subcat))
-
-    # 4) Heuristic theme detection from text as fallback
-    if not assignments:
-        for theme_name, pattern in THEME_REGEXES:
-            if pattern.search(review_text):
-                assignments.append((theme_name, theme_name))
-                break
-
-    # 5) If still nothing, bucket as Other
-    if not assignments:
-        assignments.append(("Other", "Other"))
-
-    # De-duplicate pairs
-    deduped = list({(t, s) for t, s in assignments})
-    return deduped
-
-
-def compute_counts_and_trends(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
-    # Build assignments per row
-    df_assign = (
-        df.apply(_assign_theme_and_subcat, axis=1)
-          .rename("assignments")
-          .to_frame()
-    )
-
-    # Explode assignments into theme/subcategory columns
-    exploded = df_assign.assign(temp=df_assign["assignments"]).explode("temp", ignore_index=True)
-    exploded[["theme", "subcategory"]] = pd.DataFrame(exploded["temp"].tolist(), index=exploded.index)
-    exploded = exploded.drop(columns=["assignments", "temp"])  # keep only theme/subcategory
-
-    # Join back essential time fields
-    exploded = exploded.join(df[["day_index", "week_bucket", "week_label"]])
+# Theme and subcategory of reviews no rule matches
+OTHER_THEME = "Other"
+
+# Scorer state after the days already counted (see rolling_stats), a checksum of their counts and
+# the cached tables holding their scores
+ANOMALY_STATE_FILE = os.path.join(review_cache.CACHE_DIR, "theme_anomaly_state.json")
+ANOMALY_STATE_VERSION = 2
+ROLLING_COLUMNS = ["rolling_mean_7", "rolling_std_7"]
+
+
+def _split_labels(values: pd.Series) -> pd.Series:
+    # One entry per ";"-separated label, indexed by review position; blanks and missing values dropped
+    labels = values.astype(object).where(values.notna(), "").astype(str).str.split(";").explode().str.strip()
+    return labels[labels != ""]
+
+
+_CASE_SENSITIVE: Dict[re.Pattern, re.Pattern] = {}
+
+
+def _contains(text_l: pd.Series, pattern: re.Pattern) -> np.ndarray:
+    # Whether `pattern` occurs in each lowercased text. The rule patterns are written in lower case, and
+    # a case-sensitive scan of lowered text is several times faster than an IGNORECASE one
+    cased = _CASE_SENSITIVE.get(pattern)
+    if cased is None:
+        cased = _CASE_SENSITIVE[pattern] = re.compile(pattern.pattern, pattern.flags & ~re.IGNORECASE)
+    return text_l.map(cased.search).notna().to_numpy(dtype=bool)
+
+
+def _first_match(text: pd.Series, rules: List[Tuple[str, re.Pattern]], default: Optional[str]) -> np.ndarray:
+    # Label of the first rule whose pattern occurs in each lowercased text, else `default`
+    if text.empty:
+        return np.array([], dtype=object)
+    conditions = [_contains(text, pattern) for _, pattern in rules]
+    return np.select(conditions, [label for label, _ in rules], default=default)
+
+
+def assign_themes(df: pd.DataFrame) -> pd.DataFrame:
+    # (row, theme, subcategory) for every review, in rule order within a review:
+    # 1) known subcategories, 2) else known categories, 3) discovery wording in
+    # the text, 4) else the first theme keyword in the text, 5) else Other
+    n = len(df)
+    text = pd.Series(df["review_text"].to_numpy(dtype=object), dtype=object)
+    text = text.where(text.notna(), "").map(str).str.lower()
+
+    subcats = _split_labels(pd.Series(df["subcategories"].to_numpy(dtype=object)))
+    by_subcat = pd.DataFrame({"row": subcats.index, "theme": subcats.map(SUBCAT_TO_THEME).to_numpy(), "subcategory": subcats.to_numpy()})
+    by_subcat = by_subcat[by_subcat["theme"].notna()]
+
+    cats = _split_labels(pd.Series(df["categories"].to_numpy(dtype=object)))
+    cats = cats[~cats.index.isin(by_subcat["row"])]
+    by_cat = pd.DataFrame({"row": cats.index, "theme": cats.map(CATEGORY_TO_THEME).to_numpy(), "subcategory": cats.to_numpy()})
+    by_cat = by_cat[by_cat["theme"].notna()]
+
+    discovery_rows = np.flatnonzero(_contains(text, DISCOVERY_REGEX))
+    by_discovery = pd.DataFrame({
+        "row": discovery_rows,
+        "theme": DISCOVERY_THEME,
+        "subcategory": _first_match(text.iloc[discovery_rows], DISCOVERY_SUBCATS, DISCOVERY_DEFAULT),
+    })
+
+    assigned = np.zeros(n, dtype=bool)
+    for part in (by_subcat, by_cat, by_discovery):
+        assigned[part["row"].to_numpy(dtype=np.int64)] = True
+    fallback_rows = np.flatnonzero(~assigned)
+    fallback = _first_match(text.iloc[fallback_rows], THEME_REGEXES, OTHER_THEME)
+    by_fallback = pd.DataFrame({"row": fallback_rows, "theme": fallback, "subcategory": fallback})
+
+    pairs = pd.concat([by_subcat, by_cat, by_discovery, by_fallback], ignore_index=True)
+    pairs["row"] = pairs["row"].astype(np.int64)
+    pairs = pairs.drop_duplicates(["row", "theme", "subcategory"]).sort_values("row", kind="stable")
+    return pairs.reset_index(drop=True)
+
+
+def _load_anomaly_state(state_key: str) -> Optional[Dict]:
+    try:
+        with open(ANOMALY_STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    scorer = state.get("scorer", {})
+    if state.get("version") != ANOMALY_STATE_VERSION or state.get("key") != state_key or scorer.get("window") != RollingScorer().window or scorer.get("min_periods") != RollingScorer().min_periods:
+        return None
+    return state
+
+
+def _save_anomaly_state(state: Dict) -> None:
+    os.makedirs(os.path.dirname(ANOMALY_STATE_FILE), exist_ok=True)
+    tmp = f"{ANOMALY_STATE_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, ANOMALY_STATE_FILE)
+
+
+def _counts_checksum(rows: pd.DataFrame) -> str:
+    # Of the (day, theme, count) rows, in day and theme order
+    rows = rows.sort_values(["day", "theme"])
+    text = "".join(f"{day}\t{theme}\t{count}\n" for day, theme, count in zip(rows["day"].tolist(), rows["theme"].tolist(), rows["count"].tolist()))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _saved_scores(state: Dict, rows: pd.DataFrame) -> Optional[pd.DataFrame]:
+    # [day, theme, mean, std] of the days `state` covers, read back from the daily_theme table
+    # stored with it, when their counts are still those it was saved with
+    known = rows[rows["day"] <= state["scorer"]["last_day"]]
+    if _counts_checksum(known) != state["checksum"]:
+        return None
+    tables = review_cache.read_tables(state["tables"], ["daily_theme"])
+    if tables is None:
+        return None
+    saved = review_cache.to_frame(tables["daily_theme"])
+    saved = saved[saved["day_index"] <= state["scorer"]["last_day"]]
+    if len(saved) != len(known):
+        return None
+    saved = saved.rename(columns={"day_index": "day"})[["day", "theme"] + ROLLING_COLUMNS]
+    return saved.astype({"day": np.int64})
+
+
+def rolling_theme_scores(daily_theme: pd.DataFrame, state_key: Optional[str] = None, tables_key: Optional[str] = None) -> pd.DataFrame:
+    # rolling_mean_7 and rolling_std_7 of every daily_theme row, over the theme's last 7 rows
+    # (days it was seen on), in row order. With a state_key, the scorer is carried on from where
+    # an earlier run left it, and the scores of the days it had counted are read from the
+    # daily_theme table that run cached under its tables_key; only later days are appended. The
+    # latest day may still be gaining reviews: it is scored but not saved. The saved days are
+    # checked against a checksum of their counts; any change starts over.
+    days = daily_theme["day_index"].to_numpy(dtype=np.int64)
+    rows = pd.DataFrame({"day": days, "theme": daily_theme["theme"].to_numpy(), "count": daily_theme["count"].to_numpy(dtype=np.int64)})
+    state = _load_anomaly_state(state_key) if state_key else None
+    scorer = RollingScorer()
+    saved = _saved_scores(state, rows) if state is not None else None
+    if saved is not None:
+        scorer = RollingScorer.from_state(state["scorer"])
+    scored = []  # [day, theme, mean, std]
+    new_rows = rows[rows["day"] > scorer.last_day] if scorer.last_day is not None else rows
+    last_day = int(days.max()) if len(days) else None
+    committed = None
+    for day, group in new_rows.groupby("day", sort=True):
+        day = int(day)
+        if day == last_day and scorer.last_day is not None:
+            committed = {
+                "version": ANOMALY_STATE_VERSION,
+                "key": state_key,
+                "tables": tables_key,
+                "scorer": scorer.to_state(),
+                "checksum": _counts_checksum(rows[rows["day"] <= scorer.last_day]),
+            }
+        counts = dict(zip(group["theme"], group["count"].tolist()))
+        scores = scorer.append_day(day, counts)
+        for theme in counts:
+            score = scores.get(theme)
+            scored.append([day, theme, score.mean if score else None, score.std if score else None])
+    if state_key and tables_key and committed is not None:
+        _save_anomaly_state(committed)
+    scored = pd.DataFrame(scored, columns=["day", "theme"] + ROLLING_COLUMNS)
+    if saved is not None:
+        scored = pd.concat([saved, scored], ignore_index=True)
+    return rows[["day", "theme"]].merge(scored, on=["day", "theme"], how="left")[ROLLING_COLUMNS]
+
+
+def compute_counts_and_trends(df: pd.DataFrame, state_key: Optional[str] = None, tables_key: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    # With a state_key, and the tables_key the results will be cached under, rolling scores carry on
+    # from the previous run (see rolling_theme_scores)
+    # One row per (review, theme, subcategory) assignment
+    pairs = assign_themes(df)
+
+    # Attach each assignment's own review time fields
+    time_fields = df[["day_index", "week_bucket", "week_label"]].iloc[pairs["row"].to_numpy()].reset_index(drop=True)
+    exploded = pd.concat([pairs[["theme", "subcategory"]], time_fields], axis=1)
 
     # Overall counts
     overall_theme = exploded.groupby("theme", as_index=False).size().rename(columns={"size": "count"}).sort_values("count", ascending=False)
@@ -197,9 +242,10 @@ def compute_counts_and_trends(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
         / daily_theme.groupby("theme")["count"].shift(1)
     ).replace([np.inf, -np.inf], np.nan)
 
-    # Simple anomaly detection using rolling z-score (window=7)
-    daily_theme["rolling_mean_7"] = daily_theme.groupby("theme")["count"].transform(lambda x: x.rolling(window=7, min_periods=3).mean())
-    daily_theme["rolling_std_7"] = daily_theme.groupby("theme")["count"].transform(lambda x: x.rolling(window=7, min_periods=3).std(ddof=0))
+    # Simple anomaly detection using rolling z-score (window=7), updated online a day at a time
+    rolling = rolling_theme_scores(daily_theme, state_key, tables_key)
+    for col in ROLLING_COLUMNS:
+        daily_theme[col] = rolling[col].to_numpy(dtype=float)
     daily_theme["zscore_7"] = (daily_theme["count"] - daily_theme["rolling_mean_7"]) / daily_theme["rolling_std_7"]
 
     anomalies = daily_theme[(daily_theme["zscore_7"] >= 2.0) & daily_theme["rolling_std_7"].notna()].copy()
@@ -215,18 +261,50 @@ def compute_counts_and_trends(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
     }
 
 
-def main() -> None:
-    input_path = "/workspace/analysis_output/parsed_reviews.csv"
-    out_dir = "/workspace/analysis_output"
+def _frame_to_table(frame: pd.DataFrame) -> Dict[str, list]:
+    return {col: frame[col].tolist() for col in frame.columns}
+
 
-    df = pd.read_csv(input_path)
+def load_results(source: str = review_cache.SOURCE_FILE) -> Dict[str, pd.DataFrame]:
+    # Theme tables for `source`, computed once per cache key and shared with the reporting scripts
+    key = review_cache.theme_key(source)
+    tables = review_cache.read_tables(key, review_cache.THEME_TABLES)
+    if tables is not None:
+        return {name: review_cache.to_frame(table) for name, table in tables.items()}
+
+    df = review_cache.to_frame(review_cache.reviews_table(source))
 
     # Ensure required columns exist
     for col in ["day_index", "categories", "subcategories", "review_text", "week_bucket", "week_label"]:
         if col not in df.columns:
             df[col] = np.nan
 
-    results = compute_counts_and_trends(df)
+    results = compute_counts_and_trends(df, review_cache.history_key(source), key)
+    review_cache.write_tables(key, {name: _frame_to_table(results[name]) for name in review_cache.THEME_TABLES})
+    return results
+
+
+def other_clusters(source: str = review_cache.SOURCE_FILE) -> pd.DataFrame:
+    # Candidate new themes among the reviews left in Other, largest first
+    df = review_cache.to_frame(review_cache.reviews_table(source))
+    pairs = assign_themes(df)
+    rows = pairs.loc[pairs["theme"] == OTHER_THEME, "row"].to_numpy()
+    texts = df["review_text"].iloc[rows]
+    texts = texts[texts.notna()].astype(str).tolist()
+    clusters = cluster_texts(lambda: iter(texts))
+    return pd.DataFrame({
+        "cluster": range(1, len(clusters) + 1),
+        "reviews": [c.size for c in clusters],
+        "share_of_other": [round(c.size / len(texts), 4) for c in clusters],
+        "top_terms": [", ".join(c.top_terms) for c in clusters],
+        "examples": [" | ".join(c.examples) for c in clusters],
+    })
+
+
+def main() -> None:
+    out_dir = "/workspace/analysis_output"
+
+    results = load_results()
 
     # Write outputs
     results["overall_theme"].to_csv(f"{out_dir}/overall_theme_counts.csv", index=False)
@@ -234,6 +312,8 @@ def main() -> None:
     results["daily_theme"].to_csv(f"{out_dir}/daily_theme_counts.csv", index=False)
     results["daily_subcat"].to_csv(f"{out_dir}/daily_subcategory_counts.csv", index=False)
     results["anomalies"].to_csv(f"{out_dir}/anomalies_daily_theme.csv", index=False)
+    clusters = other_clusters()
+    clusters.to_csv(f"{out_dir}/other_theme_clusters.csv", index=False)
 
     # Print a concise summary
     top_themes = results["overall_theme"].head(10)
@@ -261,6 +341,14 @@ def main() -> None:
         print(results["anomalies"][["day_index", "theme", "count", "zscore_7"]].head(20).to_string(index=False))
 
 
+    if not clusters.empty:
+        print(f"\nCandidate themes in {OTHER_THEME} (clusters of unmatched reviews):")
+        for c in clusters.head(8).itertuples(index=False):
+            print(f"\n#{c.cluster} {c.reviews} reviews ({c.share_of_other:.0%} of {OTHER_THEME}): {c.top_terms}")
+            for quote in c.examples.split(" | ")[:2]:
+                print(f"  \"{quote}\"")
+
+
 if __name__ == "__main__":
     main()
 
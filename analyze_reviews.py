@@ -1,24 +1,38 @@
 #!/usr/bin/env python3
-import re
 import os
 import sys
 import json
-import csv
-from collections import defaultdict, Counter
+import hashlib
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional, Tuple
+from datetime import date, datetime, timedelta
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
+
+from keyword_automaton import MATCHER_VERSION
+from output_paths import OUTPUT_DIR
+from parallel_match import iter_matches
+from review_dedup import FingerprintStore, iter_unique
+from review_index import IndexedCsvWriter, TokenIndex, TokenIndexBuilder, encode_csv_row, file_stamp
+from review_parser import ParsedReview, ParserState, expand_sources, find_base_date, iter_corpus, iter_dump, iter_dump_parallel, iter_parsed_lines
+from taxonomy_store import KIND_KEYWORDS, compiled_matcher, load_taxonomy
+from trend_matrix import CountMatrix, DayCounts
 
-SOURCE_FILE = "/workspace/App reviews dump - Sheet1.csv"
-OUTPUT_DIR = "/workspace/analysis_output"
 
+SOURCE_FILE = "/workspace/App reviews dump - Sheet1.csv"
+PARSE_WORKERS = 1  # >1 parses header-aligned shards of the dump in worker processes
+BULK_WORKERS = None  # parse processes when ingesting many dumps; None uses every core
+CATEGORIZE_WORKERS = None  # processes matching reviews against the taxonomy; None uses every core (see parallel_match)
+CHECKPOINT_FILE = os.path.join(OUTPUT_DIR, "parse_checkpoint.json")
+CHECKPOINT_VERSION = 4
+CHECKPOINT_HASH_BLOCK = 1 << 20  # bytes of the consumed prefix per digest in the checkpoint
+DEDUP_DIR = os.path.join(OUTPUT_DIR, "dedup")  # fingerprints of reviews ingested from any export
+REVIEW_TAXONOMY = "reviews"  # taxonomies/reviews.json
+REVIEW_INDEX_FILE = os.path.join(OUTPUT_DIR, "review_index.bin")  # token index over parsed_reviews.csv (see review_index)
+APPLIED_TAXONOMY_FILE = os.path.join(OUTPUT_DIR, "taxonomy_applied.json")  # the taxonomy parsed_reviews.csv was categorized with
+LATEST_WINDOW_DAYS = 7  # days of the report's latest-activity section
 
-# Be lenient: accept any content between stars and sentiment, focus on 'by <name>' and sentiment token
-STAR_LINE_RE = re.compile(r"★+.*?\bby\s*(.+?)\s*·\s*(Negative|Positive|Neutral)", re.IGNORECASE)
-WEEKLY_SUMMARY_RE = re.compile(r"^Weekly Summary for\s*(.+?)\s*$")
-APBOT_HEADER_INLINE_RE = re.compile(r"^Appbot: .*?APP\s+(\d{1,2}):(\d{2})\s*(AM|PM)\s*$")
-TIME_ONLY_RE = re.compile(r"^(\d{1,2}):(\d{2})\s*$")
-LANG_LINE_RE = re.compile(r"^(English|Spanish|German|French|Hindi|Finnish|Danish|Portuguese|Italian|Dutch|Polish|Turkish|Arabic|Russian|Indonesian|Malay|Thai|Vietnamese|Chinese)\s*·\s*Google Play\s*$", re.IGNORECASE)
+LanguageTaxonomies = Dict[str, Dict[str, Dict[str, List[str]]]]  # {language: {category: {subcategory: [keywords]}}}
 
 
 @dataclass
@@ -34,6 +48,11 @@ class Review:
     week_label: Optional[str]
     categories: List[str]
     subcategories: List[str]
+    platform: Optional[str] = None
+    country: Optional[str] = None
+    app_version: Optional[str] = None
+    posted_at: Optional[datetime] = None
+    original_text: Optional[str] = None  # the review as written, when review_text is its translation
 
 
 def ensure_output_dir(path: str) -> None:
@@ -45,221 +64,72 @@ def read_lines(path: str) -> List[str]:
         return [line.rstrip("\n") for line in f]
 
 
-def parse_reviews(lines: List[str]) -> Tuple[List[Review], List[Tuple[int, str]]]:
-    reviews: List[Review] = []
-    weekly_anchors: List[Tuple[int, str]] = []  # (line_index, label)
+def review_from_parsed(p: ParsedReview) -> Review:
+    return Review(
+        day_index=p.day_index,
+        line_index=p.line_index,
+        reviewer=p.reviewer,
+        rating=p.rating,
+        sentiment=p.sentiment,
+        review_text=p.review_text,
+        language=p.language,
+        week_bucket=None,
+        week_label=None,
+        categories=[],
+        subcategories=[],
+        platform=p.platform,
+        country=p.country,
+        app_version=p.app_version,
+        posted_at=p.posted_at,
+        original_text=p.original_text,
+    )
+
+
+def iter_parsed_reviews(lines: Iterable[str], weekly_anchors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Review]:
+    return map(review_from_parsed, iter_parsed_lines(lines, weekly_anchors))
 
-    current_language: Optional[str] = None
-    current_day_index = 1
-    last_star_block: Optional[Dict] = None
-    i = 0
-    line_count = len(lines)
-
-    while i < line_count:
-        line = lines[i].strip()
-
-        # Detect weekly summary anchors
-        m_week = WEEKLY_SUMMARY_RE.match(line)
-        if m_week:
-            weekly_anchors.append((i, m_week.group(1)))
-            i += 1
-            continue
-
-        # Detect appbot inline header with time; use 12:xx AM as day boundary
-        m_hdr = APBOT_HEADER_INLINE_RE.match(line)
-        if m_hdr:
-            hour = int(m_hdr.group(1))
-            minute = int(m_hdr.group(2))
-            ampm = m_hdr.group(3)
-            if ampm.upper() == "AM" and hour == 12:
-                # Heuristic: treat 12:xx AM as a new day boundary
-                current_day_index += 1
-            i += 1
-            continue
-
-        # Time-only lines might appear; they don't change state significantly
-        if TIME_ONLY_RE.match(line):
-            i += 1
-            continue
-
-        # Language lines
-        m_lang = LANG_LINE_RE.match(line)
-        if m_lang:
-            current_language = m_lang.group(1)
-            i += 1
-            continue
-
-        # Star line indicates start of a review block
-        m_star = STAR_LINE_RE.search(line)
-        if m_star:
-            reviewer = m_star.group(1).strip()
-            sentiment = m_star.group(2)
-
-            rating = line.count("★")
-
-            # The review text is usually the next non-empty line(s) until a blank or a known separator
-            review_lines: List[str] = []
-            j = i + 1
-
-            # Support translated blocks: if we encounter a dashed separator followed by 'English Translation', capture translated text block
-            captured_translation = False
-            while j < line_count:
-                nxt = lines[j].strip()
-                if nxt == "":
-                    # blank line terminates block in the secondary export; in CSV-like export, we may not see blanks often
-                    break
-                # End of this block if next star line or header or weekly summary
-                if STAR_LINE_RE.search(nxt) or APBOT_HEADER_INLINE_RE.match(nxt) or WEEKLY_SUMMARY_RE.match(nxt) or TIME_ONLY_RE.match(nxt) or LANG_LINE_RE.match(nxt):
-                    break
-                # Stop at reply/permalink marker line
-                if "reply |" in nxt.lower():
-                    break
-                # Translation block support
-                if nxt.startswith("-------------------"):
-                    # Look ahead for 'English Translation' line
-                    if j + 1 < line_count and lines[j + 1].strip().lower().startswith("english translation"):
-                        # Skip the 'English Translation' line
-                        j += 2
-                        # Capture until next dashed separator or block end
-                        trans_lines: List[str] = []
-                        while j < line_count:
-                            tline = lines[j].strip()
-                            if tline.startswith("-------------------"):
-                                captured_translation = True
-                                break
-                            # stop when encountering next block markers
-                            if STAR_LINE_RE.match(tline) or APBOT_HEADER_INLINE_RE.match(tline) or WEEKLY_SUMMARY_RE.match(tline) or TIME_ONLY_RE.match(tline) or LANG_LINE_RE.match(tline):
-                                captured_translation = True
-                                j -= 1  # step back to let outer loop break on this marker
-                                break
-                            trans_lines.append(tline)
-                            j += 1
-                        review_lines = trans_lines if trans_lines else review_lines
-                    # Move past dashed separator closing if present
-                    j += 1
-                    # Continue; the outer break conditions will handle further markers
-                    continue
-                else:
-                    review_lines.append(nxt)
-                    j += 1
-
-            review_text = " ".join(review_lines).strip()
-
-            reviews.append(
-                Review(
-                    day_index=current_day_index,
-                    line_index=i,
-                    reviewer=reviewer if reviewer else None,
-                    rating=rating,
-                    sentiment=sentiment,
-                    review_text=review_text,
-                    language=current_language,
-                    week_bucket=None,
-                    week_label=None,
-                    categories=[],
-                    subcategories=[],
-                )
-            )
-            i = j
-            continue
-
-        # Default advance
-        i += 1
 
+def iter_reviews(path: str, weekly_anchors: Optional[List[Tuple[int, str]]] = None, workers: int = 1) -> Iterator[Review]:
+    # Lazily parse a dump of any supported export format; memory stays flat regardless of file size.
+    # With workers > 1 the dump is parsed in parallel shards and merged back in order.
+    if workers > 1:
+        return map(review_from_parsed, iter_dump_parallel(path, weekly_anchors, workers))
+    return map(review_from_parsed, iter_dump(path, weekly_anchors))
+
+
+def parse_reviews(lines: List[str]) -> Tuple[List[Review], List[Tuple[int, str]]]:
+    weekly_anchors: List[Tuple[int, str]] = []  # (line_index, label)
+    reviews = list(iter_parsed_reviews(lines, weekly_anchors))
     return reviews, weekly_anchors
 
 
 def build_taxonomy() -> Dict[str, Dict[str, List[str]]]:
-    # Keyword-based taxonomy; simple lowercase string contains checks
-    return {
-        "Monetization & Pricing": {
-            "Too expensive / high coin cost": [
-                "expensive", "too expensive", "cost", "money pit", "coins", "coin", "price", "pricing", "costly", "paywall", "micro transaction", "microtransaction", "overpriced"
-            ],
-            "Subscription needed / request": [
-                "subscription", "monthly", "subscribe", "abo", "abonnement"
-            ],
-            "Coin loss / inconsistency": [
-                "coins back", "coin back", "taking coins", "stole coins", "coins were stolen", "lost coins", "coin balance"
-            ],
-            "Ads gating / too many ads": [
-                "too many ads", "ads", "adverts", "advertisements", "watch ads", "forced ads", "2 minutes of ads", "20 ads", "ad block", "ad is"
-            ],
-            "Misleading ads / bait-and-switch": [
-                "misleading", "bait", "bait-and-switch", "facebook ads", "ad has nothing to do", "lie", "fake ads", "ad lies", "false advertising"
-            ],
-            "Unauthorized charge / auto pay": [
-                "charged without", "without my knowledge", "auto pay", "auto-pay", "auto debit", "unauthorized", "deducted", "auto charge", "rupees deducted", "599"
-            ],
-        },
-        "Playback & Performance": {
-            "Buffering / won't load": [
-                "buffering", "won't load", "cant load", "can't load", "not load", "loading only", "keep loading", "unable to open", "spinning", "spin", "won't open", "couldn't get it to open"
-            ],
-            "Crashes / app not working": [
-                "crash", "crashes", "stops", "not working", "doesn't work", "stopped working", "bug", "buggy"
-            ],
-            "Playback jumps / episode switching": [
-                "jumping back", "switching", "skipping", "skip", "next episode automatically", "starts between", "scroll 100s", "bookmark lost"
-            ],
-            "Offline / download issues": [
-                "download", "offline", "downloaded"
-            ],
-        },
-        "Content & UX": {
-            "Story mismatch vs ads": [
-                "nothing like", "nothing to do with the ad", "story changes", "the ad has nothing to do"
-            ],
-            "Visual vs audio expectation": [
-                "video", "visual", "picture", "image with background audio", "not a episode on screen"
-            ],
-            "AI voices / quality": [
-                "ai", "ai-generated", "voice", "narrator", "audio quality", "sound quality"
-            ],
-            "Too slow unlock / few free episodes": [
-                "unlock slowly", "free episodes", "only one free episode", "one free episode", "reduce the free episodes", "wait for free episodes"
-            ],
-            "Notifications / interruptions": [
-                "notification", "notifications"
-            ],
-        },
-        "Payments & Support": {
-            "Billing / refund / trial issues": [
-                "refund", "trial", "free trial", "charged", "payment failed", "billing", "invoice", "receipts"
-            ],
-            "Support unresponsive": [
-                "support", "no response", "didn't respond", "useless"
-            ],
-        },
-        "Localization & Availability": {
-            "Missing languages / dubbing": [
-                "telugu", "hindi", "language", "translate", "translation", "dub", "dubbing"
-            ],
-            "Region restrictions": [
-                "not available", "region", "country"
-            ],
-        },
-    }
+    # Keyword-based taxonomy from taxonomies/reviews.json; keywords are matched from word starts (see keyword_automaton)
+    return load_taxonomy(REVIEW_TAXONOMY).data
+
 
+def build_language_taxonomies() -> LanguageTaxonomies:
+    # Keywords in other languages from the same file, labelling with build_taxonomy()'s subcategories
+    return load_taxonomy(REVIEW_TAXONOMY).languages
 
-def categorize_text(text: str, taxonomy: Dict[str, Dict[str, List[str]]]) -> Tuple[List[str], List[str]]:
-    text_l = text.lower()
-    categories: List[str] = []
-    subcategories: List[str] = []
-    for cat, subs in taxonomy.items():
-        matched_any = False
-        for sub, keywords in subs.items():
-            for kw in keywords:
-                if kw in text_l:
-                    if cat not in categories:
-                        categories.append(cat)
-                    if sub not in subcategories:
-                        subcategories.append(sub)
-                    matched_any = True
-                    break
-        # if matched_any:  # allow multiple subs per category; don't break
-        #     pass
-    return categories, subcategories
+
+def categorize_text(text: str, taxonomy: Dict[str, Dict[str, List[str]]], languages: Optional[LanguageTaxonomies] = None, language: Optional[str] = None, original_text: Optional[str] = None) -> Tuple[List[str], List[str]]:
+    # `language`'s keywords match original_text (or text, when it was not translated); the base keywords match text
+    if languages:
+        return compiled_matcher(KIND_KEYWORDS, taxonomy, languages=languages).categorize(text, language, original_text)
+    return compiled_matcher(KIND_KEYWORDS, taxonomy).categorize(text)
+
+
+def categorize_reviews(reviews: Iterable[Review], taxonomy: Dict[str, Dict[str, List[str]]], workers: Optional[int] = 1, languages: Optional[LanguageTaxonomies] = None) -> Iterator[Review]:
+    # In input order; workers > 1 (or None, every core) matches chunks in worker processes
+    if languages:
+        matcher = compiled_matcher(KIND_KEYWORDS, taxonomy, languages=languages)
+        matches = iter_matches(reviews, matcher, "categorize_review", workers, text=lambda r: (r.review_text, r.language, r.original_text))
+    else:
+        matches = iter_matches(reviews, compiled_matcher(KIND_KEYWORDS, taxonomy), "categorize", workers, text=lambda r: r.review_text)
+    for r, (categories, subcategories) in matches:
+        r.categories, r.subcategories = categories, subcategories
+        yield r
 
 
 def assign_weeks_by_stride(max_day_index: int, stride: int = 7) -> Dict[int, Tuple[int, str]]:
@@ -273,108 +143,176 @@ def assign_weeks_by_stride(max_day_index: int, stride: int = 7) -> Dict[int, Tup
     return mapping
 
 
-def compute_trends(reviews: List[Review]) -> Dict:
-    # Aggregate per day and per week
-    by_day_cat = defaultdict(lambda: defaultdict(int))  # day -> category -> count
-    by_week_cat = defaultdict(lambda: defaultdict(int))  # week -> category -> count
-    by_day_sub = defaultdict(lambda: defaultdict(int))
-    by_week_sub = defaultdict(lambda: defaultdict(int))
-    day_totals = Counter()
-    week_totals = Counter()
+def week_for_day(day_index: int, stride: int = 7) -> Tuple[int, str]:
+    # Same bucketing as assign_weeks_by_stride, without needing max_day up front
+    week_bucket = (day_index - 1) // stride + 1
+    return week_bucket, f"Week {week_bucket}"
 
+
+def compute_trends(reviews: Iterable[Review], on_review: Optional[Callable[[Review], None]] = None, base: Optional[Dict] = None) -> Dict:
+    # Aggregate per day and per week in a single pass; `on_review` sees each review after its week is assigned.
+    # Counting continues from `base`, an earlier result of this function, when given. Counts go into dense
+    # day x category and day x subcategory matrices (see trend_matrix); weeks are their weekly roll-ups.
+    by_cat = DayCounts()
+    by_sub = DayCounts()
     max_day = 0
+    if base is not None:
+        for counts, saved in ((by_cat, base["by_day_cat"]), (by_sub, base["by_day_sub"])):
+            for day, labels in saved.items():
+                for label, n in labels.items():
+                    counts.add(int(day), label, n)
+        for day, n in base["day_totals"].items():
+            by_cat.add_review(int(day), n)
+            by_sub.add_review(int(day), n)
+        max_day = base["max_day"]
     for r in reviews:
         max_day = max(max_day, r.day_index)
-    week_map = assign_weeks_by_stride(max_day)
-
-    for r in reviews:
-        week_bucket, week_label = week_map.get(r.day_index, (None, None))
+        week_bucket, week_label = week_for_day(r.day_index)
         r.week_bucket = week_bucket
         r.week_label = week_label
-        day_totals[r.day_index] += 1
-        if week_bucket is not None:
-            week_totals[week_bucket] += 1
+        by_cat.add_review(r.day_index)
+        by_sub.add_review(r.day_index)
         for cat in r.categories:
-            by_day_cat[r.day_index][cat] += 1
-            if week_bucket is not None:
-                by_week_cat[week_bucket][cat] += 1
+            by_cat.add(r.day_index, cat)
         for sub in r.subcategories:
-            by_day_sub[r.day_index][sub] += 1
-            if week_bucket is not None:
-                by_week_sub[week_bucket][sub] += 1
+            by_sub.add(r.day_index, sub)
+        if on_review is not None:
+            on_review(r)
 
+    daily_cat, daily_sub = by_cat.matrix(), by_sub.matrix()
+    weekly_cat, weekly_sub = daily_cat.weekly(), daily_sub.weekly()
     return {
-        "by_day_cat": {str(k): dict(v) for k, v in by_day_cat.items()},
-        "by_week_cat": {str(k): dict(v) for k, v in by_week_cat.items()},
-        "by_day_sub": {str(k): dict(v) for k, v in by_day_sub.items()},
-        "by_week_sub": {str(k): dict(v) for k, v in by_week_sub.items()},
-        "day_totals": {str(k): v for k, v in day_totals.items()},
-        "week_totals": {str(k): v for k, v in week_totals.items()},
+        "by_day_cat": daily_cat.to_nested(),
+        "by_week_cat": weekly_cat.to_nested(),
+        "by_day_sub": daily_sub.to_nested(),
+        "by_week_sub": weekly_sub.to_nested(),
+        "day_totals": daily_cat.review_totals(),
+        "week_totals": weekly_cat.review_totals(),
         "max_day": max_day,
     }
 
 
+def day_dates(day_totals: Dict[str, int], base_date: Optional[date]) -> Dict[str, str]:
+    # Calendar date of each day_index present, once the parser has anchored day 1
+    if base_date is None:
+        return {}
+    return {d: (base_date + timedelta(days=int(d) - 1)).isoformat() for d in day_totals}
+
+
+def base_date_of(trends: Dict) -> Optional[date]:
+    # Calendar date of day_index 1, read back from the dates of trends["day_dates"]
+    for day, posted_on in trends.get("day_dates", {}).items():
+        return date.fromisoformat(posted_on) - timedelta(days=int(day) - 1)
+    return None
+
+
+def trends_between(trends: Dict, start: Optional[date] = None, end: Optional[date] = None) -> Dict:
+    # The daily counts of `trends` on the dates start <= date < end, an open bound meaning no
+    # limit, with each label's total over them. Days are consecutive calendar days, so a window
+    # is a slice of rows of the dense day matrices and costs its own days, not the history's.
+    base_date = base_date_of(trends)
+    if base_date is None and (start is not None or end is not None):
+        raise ValueError("trends have no calendar dates yet: the dump has no Weekly Summary")
+    first_day = (start - base_date).days + 1 if start is not None else None
+    last_day = (end - base_date).days if end is not None else None
+    window: Dict = {}
+    for key, totals_key in (("by_day_cat", "cat_totals"), ("by_day_sub", "sub_totals")):
+        daily = CountMatrix.from_nested(trends[key], trends["day_totals"]).between(first_day, last_day)
+        window[key] = daily.to_nested()
+        window[totals_key] = {label: n for label, n in zip(daily.labels, daily.totals().tolist()) if n}
+    window["day_totals"] = daily.review_totals()
+    return window
+
+
 def compute_growth_signals(by_week: Dict[str, Dict[str, int]], week_totals: Dict[str, int]) -> Dict[str, Dict[str, float]]:
-    # Compare first half vs last half share per category/subcategory
-    weeks_sorted = sorted(int(w) for w in by_week.keys())
-    if not weeks_sorted:
+    # Compare first half vs last half share per category/subcategory. Every week from the first to the
+    # last is counted, quiet ones as zero; weeks without reviews have no share and are skipped
+    weekly = CountMatrix.from_nested(by_week, week_totals)
+    if not weekly.rows or not weekly.labels:
         return {}
-    mid = len(weeks_sorted) // 2
-    early = weeks_sorted[:mid]
-    late = weeks_sorted[mid:]
-
-    def share_avg(keys: List[int], cat: str) -> float:
-        shares = []
-        for w in keys:
-            total = week_totals.get(str(w), 0)
-            if total <= 0:
-                continue
-            count = by_week.get(str(w), {}).get(cat, 0)
-            shares.append(count / total)
-        return sum(shares) / len(shares) if shares else 0.0
-
-    # Collect all categories across weeks
-    cats = set()
-    for w in by_week.values():
-        cats.update(w.keys())
-
-    result: Dict[str, Dict[str, float]] = {}
-    for cat in cats:
-        early_share = share_avg(early, cat)
-        late_share = share_avg(late, cat)
-        delta = late_share - early_share
-        pct_change = (delta / early_share * 100.0) if early_share > 0 else (late_share * 100.0)
-        result[cat] = {
-            "early_share": early_share,
-            "late_share": late_share,
-            "delta_share": delta,
-            "pct_change": pct_change,
+    mid = weekly.rows // 2
+    shares = weekly.rates()
+    reviewed = weekly.reviews > 0
+
+    def share_avg(weeks: slice) -> np.ndarray:
+        n = int(reviewed[weeks].sum())
+        return shares[weeks][reviewed[weeks]].sum(axis=0) / n if n else np.zeros(len(weekly.labels))
+
+    early_share = share_avg(slice(None, mid))
+    late_share = share_avg(slice(mid, None))
+    delta = late_share - early_share
+    pct_change = np.where(early_share > 0, delta / np.where(early_share > 0, early_share, 1) * 100.0, late_share * 100.0)
+    return {
+        label: {
+            "early_share": float(early_share[j]),
+            "late_share": float(late_share[j]),
+            "delta_share": float(delta[j]),
+            "pct_change": float(pct_change[j]),
         }
-    return result
+        for j, label in enumerate(weekly.labels)
+    }
+
+
+PARSED_REVIEWS_HEADER = ["day_index", "week_bucket", "week_label", "line_index", "posted_at", "reviewer", "rating", "sentiment", "language", "platform", "country", "app_version", "categories", "subcategories", "review_text", "original_text"]
 
 
-def write_outputs(reviews: List[Review], trends: Dict, taxonomy: Dict[str, Dict[str, List[str]]]) -> None:
+def review_to_row(r: Review) -> List:
+    return [
+        r.day_index,
+        r.week_bucket,
+        r.week_label,
+        r.line_index,
+        r.posted_at.isoformat(sep=" ", timespec="minutes") if r.posted_at else "",
+        r.reviewer or "",
+        r.rating or "",
+        r.sentiment or "",
+        r.language or "",
+        r.platform or "",
+        r.country or "",
+        r.app_version or "",
+        ";".join(r.categories),
+        ";".join(r.subcategories),
+        r.review_text,
+        r.original_text or "",
+    ]
+
+
+def indexed_writer(f, builder: TokenIndexBuilder) -> IndexedCsvWriter:
+    return IndexedCsvWriter(f, builder, PARSED_REVIEWS_HEADER.index("review_text"), PARSED_REVIEWS_HEADER.index("day_index"))
+
+
+def create_parsed_csv(parsed_csv: str) -> Tuple[BinaryIO, IndexedCsvWriter]:
+    # parsed_reviews.csv holding only its header, and a writer that indexes the rows after it
+    f = open(parsed_csv, "wb")
+    header = encode_csv_row(PARSED_REVIEWS_HEADER)
+    f.write(header)
+    return f, indexed_writer(f, TokenIndexBuilder(len(header)))
+
+
+def save_review_index(builder: TokenIndexBuilder, parsed_csv: str) -> None:
+    # Once the CSV is closed, so the stamp is final
+    builder.build().save(REVIEW_INDEX_FILE, file_stamp(parsed_csv))
+
+
+def write_outputs(reviews: Iterable[Review], taxonomy: Dict[str, Dict[str, List[str]]], languages: Optional[LanguageTaxonomies] = None) -> Dict:
+    # Consumes `reviews` once: rows are streamed to the CSV while trends accumulate
     ensure_output_dir(OUTPUT_DIR)
 
     # Parsed reviews CSV
     parsed_csv = os.path.join(OUTPUT_DIR, "parsed_reviews.csv")
-    with open(parsed_csv, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(["day_index", "week_bucket", "week_label", "line_index", "reviewer", "rating", "sentiment", "language", "categories", "subcategories", "review_text"])
-        for r in reviews:
-            w.writerow([
-                r.day_index,
-                r.week_bucket,
-                r.week_label,
-                r.line_index,
-                r.reviewer or "",
-                r.rating or "",
-                r.sentiment or "",
-                r.language or "",
-                ";".join(r.categories),
-                ";".join(r.subcategories),
-                r.review_text,
-            ])
+    f, w = create_parsed_csv(parsed_csv)
+    with f:
+        trends = compute_trends(reviews, on_review=lambda r: w.writerow(review_to_row(r)))
+    save_review_index(w.builder, parsed_csv)
+    save_applied_taxonomy(taxonomy, languages)
+    write_summary(trends)
+    return trends
+
+
+def write_summary(trends: Dict) -> None:
+    # trends.json and report.md, both derived from the aggregates alone
+    total_reviews = sum(trends["day_totals"].values())
+    dates = trends.get("day_dates", {})
 
     # Trends JSON
     with open(os.path.join(OUTPUT_DIR, "trends.json"), "w", encoding="utf-8") as f:
@@ -384,26 +322,35 @@ def write_outputs(reviews: List[Review], trends: Dict, taxonomy: Dict[str, Dict[
     cat_growth = compute_growth_signals(trends["by_week_cat"], trends["week_totals"])
     sub_growth = compute_growth_signals(trends["by_week_sub"], trends["week_totals"])
 
-    # Top categories latest week
-    if trends["week_totals"]:
+    # Top categories over the last 7 calendar days; the last stride week may have just begun
+    if dates:
+        latest = date.fromisoformat(max(dates.values()))
+        latest_start = latest - timedelta(days=LATEST_WINDOW_DAYS - 1)
+        latest_window = trends_between(trends, latest_start, latest + timedelta(days=1))
+        latest_heading = f"Last {LATEST_WINDOW_DAYS} Days ({latest_start} to {latest})"
+        latest_cat, latest_sub = latest_window["cat_totals"], latest_window["sub_totals"]
+    elif trends["week_totals"]:
         latest_week = max(int(w) for w in trends["week_totals"].keys())
+        latest_heading = "Latest Week"
         latest_cat = trends["by_week_cat"].get(str(latest_week), {})
         latest_sub = trends["by_week_sub"].get(str(latest_week), {})
     else:
-        latest_week = None
+        latest_heading = "Latest Week"
         latest_cat = {}
         latest_sub = {}
 
-    # Markdown report
+    # Markdown report; ties are listed by name, so it depends on the counts alone
     report_md = os.path.join(OUTPUT_DIR, "report.md")
     with open(report_md, "w", encoding="utf-8") as f:
         f.write("## Review Analysis Summary\n\n")
-        f.write(f"Total reviews parsed: {len(reviews)}\n\n")
-        f.write("### Latest Week Top Categories\n")
-        for cat, cnt in sorted(latest_cat.items(), key=lambda x: x[1], reverse=True)[:10]:
+        f.write(f"Total reviews parsed: {total_reviews}\n\n")
+        if dates:
+            f.write(f"Period: {min(dates.values())} to {max(dates.values())}\n\n")
+        f.write(f"### {latest_heading} Top Categories\n")
+        for cat, cnt in sorted(latest_cat.items(), key=lambda x: (-x[1], x[0]))[:10]:
             f.write(f"- {cat}: {cnt}\n")
-        f.write("\n### Latest Week Top Subcategories\n")
-        for sub, cnt in sorted(latest_sub.items(), key=lambda x: x[1], reverse=True)[:12]:
+        f.write(f"\n### {latest_heading} Top Subcategories\n")
+        for sub, cnt in sorted(latest_sub.items(), key=lambda x: (-x[1], x[0]))[:12]:
             f.write(f"- {sub}: {cnt}\n")
 
         f.write("\n### Emerging vs Long-standing (Categories)\n")
@@ -418,39 +365,259 @@ def write_outputs(reviews: List[Review], trends: Dict, taxonomy: Dict[str, Dict[
                 st.append((cat, g))
         if emg:
             f.write("- Increasing:\n")
-            for cat, g in sorted(emg, key=lambda x: x[1]["pct_change"], reverse=True):
+            for cat, g in sorted(emg, key=lambda x: (-x[1]["pct_change"], x[0])):
                 f.write(f"  - {cat}: {g['early_share']:.1%} -> {g['late_share']:.1%} ({g['pct_change']:.0f}%)\n")
         if dec:
             f.write("- Declining:\n")
-            for cat, g in sorted(dec, key=lambda x: x[1]["pct_change"]):
+            for cat, g in sorted(dec, key=lambda x: (x[1]["pct_change"], x[0])):
                 f.write(f"  - {cat}: {g['early_share']:.1%} -> {g['late_share']:.1%} ({g['pct_change']:.0f}%)\n")
         if st:
             f.write("- Stable/Mixed:\n")
-            for cat, g in sorted(st, key=lambda x: -abs(x[1]["pct_change"]))[:10]:
+            for cat, g in sorted(st, key=lambda x: (-abs(x[1]["pct_change"]), x[0]))[:10]:
                 f.write(f"  - {cat}: {g['early_share']:.1%} -> {g['late_share']:.1%} ({g['pct_change']:.0f}%)\n")
 
         f.write("\n### Notes\n")
-        f.write("- Day-by-day trends are computed by chronological buckets due to sparse explicit dates in the export. Weekly aggregation uses consecutive 7-day windows.\n")
+        f.write("- Days are reconstructed from alert times (the clock going backwards marks midnight) and pinned to the calendar by the Weekly Summary alerts. Weekly aggregation uses consecutive 7-day windows from the first day.\n")
         f.write("- Categories are assigned via keyword matching; multiple categories can apply per review.\n")
 
 
+def prefix_digests(path: str, length: int, known: Sequence[str] = (), known_length: int = 0) -> List[str]:
+    # A digest of each CHECKPOINT_HASH_BLOCK-byte block of the first `length` bytes, the last
+    # block possibly short. The whole blocks of `known`, already checked digests of the first
+    # `known_length` bytes, are kept without reading them again, so a growing dump is only
+    # hashed where it grew.
+    digests = list(known[:min(known_length, length) // CHECKPOINT_HASH_BLOCK])
+    with open(path, "rb") as f:
+        f.seek(len(digests) * CHECKPOINT_HASH_BLOCK)
+        for start in range(len(digests) * CHECKPOINT_HASH_BLOCK, length, CHECKPOINT_HASH_BLOCK):
+            block = f.read(min(CHECKPOINT_HASH_BLOCK, length - start))
+            digests.append(hashlib.blake2b(block, digest_size=16).hexdigest())
+    return digests
+
+
+def prefix_matches(path: str, length: int, digests: Sequence[str]) -> bool:
+    # Is the first `length` bytes of `path` still what `digests` were taken of? Every block is
+    # compared, so an edit anywhere in the prefix is caught; reading stops at the first mismatch.
+    if len(digests) != -(-length // CHECKPOINT_HASH_BLOCK):
+        return False
+    with open(path, "rb") as f:
+        for i, digest in enumerate(digests):
+            block = f.read(min(CHECKPOINT_HASH_BLOCK, length - i * CHECKPOINT_HASH_BLOCK))
+            if hashlib.blake2b(block, digest_size=16).hexdigest() != digest:
+                return False
+    return True
+
+
+def taxonomy_hash(taxonomy: Dict[str, Dict[str, List[str]]], languages: Optional[LanguageTaxonomies] = None) -> str:
+    # Covers the matching rules too, so saved categories go stale with either. Key order
+    # is kept: it decides the order of each review's labels. Language blocks count only
+    # when there are some, so outputs of an English-only taxonomy stay valid
+    payload = {"matcher": MATCHER_VERSION, "taxonomy": taxonomy}
+    if languages:
+        payload["languages"] = languages
+    payload = json.dumps(payload)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def save_applied_taxonomy(taxonomy: Dict[str, Dict[str, List[str]]], languages: Optional[LanguageTaxonomies] = None) -> None:
+    tmp = APPLIED_TAXONOMY_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"taxonomy_hash": taxonomy_hash(taxonomy, languages), "taxonomy": taxonomy, "languages": languages or {}}, f, ensure_ascii=False)
+    os.replace(tmp, APPLIED_TAXONOMY_FILE)
+
+
+def load_applied_taxonomy() -> Optional[Dict]:
+    try:
+        with open(APPLIED_TAXONOMY_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_checkpoint(source: str, taxonomy: Dict[str, Dict[str, List[str]]], languages: Optional[LanguageTaxonomies] = None) -> Optional[Dict]:
+    # The saved checkpoint, or None when it no longer describes a prefix of `source` and the current outputs
+    try:
+        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+            ckpt = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if ckpt.get("version") != CHECKPOINT_VERSION or ckpt.get("source") != source or ckpt.get("taxonomy") != taxonomy_hash(taxonomy, languages):
+        return None
+    offset = ckpt["state"]["byte_offset"]
+    if os.path.getsize(source) < offset or not prefix_matches(source, offset, ckpt["prefix_digests"]):
+        return None
+    parsed_csv = os.path.join(OUTPUT_DIR, "parsed_reviews.csv")
+    if not os.path.exists(parsed_csv) or os.path.getsize(parsed_csv) < ckpt["csv_offset"]:
+        return None
+    if ckpt["state"]["base_date"] is None and find_base_date(source, checkpoint_state(ckpt)) is not None:
+        # The first Weekly Summary has arrived, so rows written without dates can now be dated
+        return None
+    return ckpt
+
+
+def checkpoint_state(ckpt: Dict) -> ParserState:
+    state = ParserState(**ckpt["state"])
+    if state.base_date is not None:
+        state.base_date = date.fromisoformat(state.base_date)
+    return state
+
+
+def save_checkpoint(source: str, taxonomy: Dict[str, Dict[str, List[str]]], state: ParserState, csv_offset: int, trends: Dict, languages: Optional[LanguageTaxonomies] = None, previous: Optional[Dict] = None) -> None:
+    # `previous`, the checkpoint this run resumed from, lends the digests of the prefix it checked
+    if previous is not None:
+        digests = prefix_digests(source, state.byte_offset, previous["prefix_digests"], previous["state"]["byte_offset"])
+    else:
+        digests = prefix_digests(source, state.byte_offset)
+    state_fields = asdict(state)
+    state_fields.pop("resume")
+    state_fields["base_date"] = state.base_date.isoformat() if state.base_date else None
+    ckpt = {
+        "version": CHECKPOINT_VERSION,
+        "source": source,
+        "prefix_digests": digests,
+        "taxonomy": taxonomy_hash(taxonomy, languages),
+        "state": state_fields,
+        "csv_offset": csv_offset,
+        "trends": trends,
+    }
+    tmp = CHECKPOINT_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ckpt, f)
+    os.replace(tmp, CHECKPOINT_FILE)
+
+
+def hold_back_last_batch(records: Iterable[ParsedReview], tail: List[ParsedReview]) -> Iterator[ParsedReview]:
+    # Yields records of completed alert batches; the latest batch is left in `tail`
+    for r in records:
+        if tail and r.batch_index != tail[-1].batch_index:
+            yield from tail
+            tail.clear()
+        tail.append(r)
+
+
+def run_incremental(source: str, taxonomy: Dict[str, Dict[str, List[str]]], workers: int = 1, store: Optional[FingerprintStore] = None, categorize_workers: Optional[int] = 1, languages: Optional[LanguageTaxonomies] = None) -> Dict:
+    # Parse only what was appended since the last run. The checkpoint sits on the
+    # latest Appbot header, where no review is open, together with the CSV length
+    # and aggregates as of that header; the batch after it is re-parsed each run
+    # because Appbot may still be adding to it. Anything that invalidates the
+    # checkpoint falls back to a full parse from byte 0. With a fingerprint
+    # store, only repeats within `source` itself are skipped: no other export
+    # is in the outputs, so their claims are dropped first. Dedup across
+    # exports happens in run_bulk.
+    ensure_output_dir(OUTPUT_DIR)
+    parsed_csv = os.path.join(OUTPUT_DIR, "parsed_reviews.csv")
+    ckpt = load_checkpoint(source, taxonomy, languages)
+    if ckpt is None:
+        if os.path.exists(CHECKPOINT_FILE):
+            os.remove(CHECKPOINT_FILE)
+        state = ParserState()
+        base = None
+        f, w = create_parsed_csv(parsed_csv)
+    else:
+        state = checkpoint_state(ckpt)
+        base = ckpt["trends"]
+        # The token index is cut back with the CSV; re-read from the CSV if it does not match
+        index = TokenIndex.load(REVIEW_INDEX_FILE, file_stamp(parsed_csv))
+        os.truncate(parsed_csv, ckpt["csv_offset"])
+        builder = index.resume(ckpt["csv_offset"]) if index is not None else None
+        if builder is None:
+            builder = TokenIndex.from_csv(parsed_csv).resume(ckpt["csv_offset"])
+        f = open(parsed_csv, "ab")
+        w = indexed_writer(f, builder)
+    if store is not None:
+        # Lines after the resume point are parsed again, so their earlier claims no longer count
+        store.keep_sources([source])
+        store.forget_source(source, from_line=state.line_index)
+
+    with f:
+        def write_row(r: Review) -> None:
+            w.writerow(review_to_row(r))
+
+        if workers > 1:
+            records = iter_dump_parallel(source, workers=workers, state=state)
+        else:
+            records = iter_dump(source, state=state)
+        if store is not None:
+            records = iter_unique(records, store, source)
+        tail: List[ParsedReview] = []
+        settled = map(review_from_parsed, hold_back_last_batch(records, tail))
+        trends = compute_trends(categorize_reviews(settled, taxonomy, categorize_workers, languages), on_review=write_row, base=base)
+        resume = state.resume
+        if resume is not None and tail and tail[0].batch_index <= resume.batch_index:
+            # The latest header had no reviews, so the held-back batch is complete
+            trends = compute_trends(categorize_reviews(map(review_from_parsed, tail), taxonomy, languages=languages), on_review=write_row, base=trends)
+            tail = []
+        f.flush()
+        csv_offset = f.tell()
+        settled_trends = trends
+        trends = compute_trends(categorize_reviews(map(review_from_parsed, tail), taxonomy, languages=languages), on_review=write_row, base=trends)
+    save_review_index(w.builder, parsed_csv)
+
+    trends["day_dates"] = day_dates(trends["day_totals"], state.base_date)
+    save_applied_taxonomy(taxonomy, languages)
+    write_summary(trends)
+    # Without a new resume point the previous checkpoint still holds
+    if resume is not None:
+        save_checkpoint(source, taxonomy, resume, csv_offset, settled_trends, languages, previous=ckpt)
+    return trends
+
+
+def run_bulk(sources: List[str], taxonomy: Dict[str, Dict[str, List[str]]], workers: Optional[int] = None, store: Optional[FingerprintStore] = None, categorize_workers: Optional[int] = 1, languages: Optional[LanguageTaxonomies] = None) -> Dict:
+    # Parse every dump in `sources` concurrently and aggregate them as one corpus,
+    # in the order given, which should be chronological. Always a full run; the
+    # single-dump checkpoint no longer describes the outputs afterwards.
+    ensure_output_dir(OUTPUT_DIR)
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+    if store is not None:
+        # The outputs are rebuilt from `sources` alone, so no earlier claim counts
+        store.keep_sources([])
+    state = ParserState()
+    records = iter_corpus(sources, workers=workers, state=state)
+    if store is not None:
+        records = ((source, r) for source, r in records if store.claim(r, source) is None)
+    reviews = (review_from_parsed(r) for _, r in records)
+    parsed_csv = os.path.join(OUTPUT_DIR, "parsed_reviews.csv")
+    f, w = create_parsed_csv(parsed_csv)
+    with f:
+        trends = compute_trends(categorize_reviews(reviews, taxonomy, categorize_workers, languages), on_review=lambda r: w.writerow(review_to_row(r)))
+    save_review_index(w.builder, parsed_csv)
+    trends["day_dates"] = day_dates(trends["day_totals"], state.base_date)
+    save_applied_taxonomy(taxonomy, languages)
+    write_summary(trends)
+    return trends
+
+
 def main() -> None:
+    # With arguments, each is a dump, a directory of dumps or a glob, ingested together in bulk
+    if len(sys.argv) > 1:
+        sources = [path for pattern in sys.argv[1:] for path in expand_sources(pattern)]
+        if not sources:
+            print(f"No dumps match: {' '.join(sys.argv[1:])}", file=sys.stderr)
+            sys.exit(1)
+        with FingerprintStore(DEDUP_DIR) as store:
+            trends = run_bulk(sources, build_taxonomy(), workers=BULK_WORKERS, store=store, categorize_workers=CATEGORIZE_WORKERS, languages=build_language_taxonomies())
+        print(f"Parsed {sum(trends['day_totals'].values())} reviews from {len(sources)} dumps ({store.duplicates} duplicates skipped). Output in {OUTPUT_DIR}")
+        return
     if not os.path.exists(SOURCE_FILE):
         print(f"Source file not found: {SOURCE_FILE}", file=sys.stderr)
         sys.exit(1)
-    lines = read_lines(SOURCE_FILE)
-    reviews, weekly_anchors = parse_reviews(lines)
     taxonomy = build_taxonomy()
-
-    # Categorize
-    for r in reviews:
-        cats, subs = categorize_text(r.review_text, taxonomy)
-        r.categories = cats
-        r.subcategories = subs
-
-    trends = compute_trends(reviews)
-    write_outputs(reviews, trends, taxonomy)
-    print(f"Parsed {len(reviews)} reviews. Output in {OUTPUT_DIR}")
+    languages = build_language_taxonomies()
+
+    # A taxonomy edit is applied to the existing outputs first, re-matching only the reviews it can affect
+    from recategorize import recategorize_outputs
+    stats = recategorize_outputs(taxonomy, languages)
+    if stats and stats["updated"]:
+        print(f"Taxonomy changed: {stats['updated']} of {stats['candidates']} candidate reviews relabelled")
+
+    # Parse -> categorize -> aggregate/write as one streaming pipeline, resuming after the last run
+    with FingerprintStore(DEDUP_DIR) as store:
+        trends = run_incremental(SOURCE_FILE, taxonomy, workers=PARSE_WORKERS, store=store, categorize_workers=CATEGORIZE_WORKERS, languages=languages)
+    # The reporting scripts read the reviews and trends from the shared cache rather than parsing again
+    from review_cache import store_outputs
+    store_outputs(SOURCE_FILE, os.path.join(OUTPUT_DIR, "parsed_reviews.csv"), trends)
+    print(f"Parsed {sum(trends['day_totals'].values())} reviews ({store.duplicates} duplicate reviews skipped). Output in {OUTPUT_DIR}")
 
 
 if __name__ == "__main__":
@@ -6,287 +6,177 @@ Analyzes Android reviews for Pocket FM app to categorize issues and identify tre
 
 import pandas as pd
 import numpy as np
-import re
-from datetime import datetime, timedelta
-from collections import defaultdict, Counter
+from collections import Counter
 import json
 import os
+import sys
+
+from review_parser import expand_sources, iter_corpus
+from match_provenance import MatchProvenance
+from near_duplicates import near_duplicate_clusters
+from parallel_match import match_all
+from taxonomy_store import LiveTaxonomy
+from trend_matrix import CountMatrix
+
+# Keyword table for categorize_review, {main category: {subcategory: [keywords]}}, from
+# taxonomies/android_reviews.json. Its compiled matcher is cached on disk, and edits to the file
+# are picked up by the next categorization. Per subcategory the first listed keyword
+# in the review is reported.
+CATEGORY_TAXONOMY = LiveTaxonomy("android_reviews")
+CATEGORIZE_WORKERS = None  # processes categorizing reviews; None uses every core
+# Trends count a cluster of near-duplicate reviews (copies, templates, review campaigns) once
+COUNT_DUPLICATE_CLUSTERS_ONCE = False
+ROLLING_WINDOW_DAYS = 7  # trailing window of the trends' rolling averages
+
 
 class AndroidReviewAnalyzer:
     def __init__(self, csv_file_path):
         self.csv_file_path = csv_file_path
         self.reviews_data = []
         self.parsed_reviews = []
-        self.categories = {
-            'Ads Related Issues': {
-                'Too many ads / ads gating': [],
-                'Misleading ads / bait-and-switch': [],
-                'Ad quality / inappropriate ads': [],
-                'Ad frequency / interruptions': [],
-                'Forced ad watching': []
-            },
-            'Coins Related Issues': {
-                'Too expensive / high coin cost': [],
-                'Subscription needed / pricing model': [],
-                'Too slow unlock / few free episodes': [],
-                'Coin system confusing': [],
-                'Unauthorized charges / billing issues': []
-            },
-            'Content Discovery Issues': {
-                'Search / discoverability problems': [],
-                'Poor recommendations / irrelevant suggestions': [],
-                'Auto-starts other series': [],
-                'Lack of new content': [],
-                'Content organization / categories': []
-            },
-            'Listening Related Issues': {
-                'Crashes / app not working': [],
-                'Offline / download issues': [],
-                'Buffering / won\'t load': [],
-                'Playback jumps / episode switching': [],
-                'Audio quality / sync issues': [],
-                'Notifications / interruptions': []
-            },
-            'Content Quality Issues': {
-                'AI voices / poor narration quality': [],
-                'Visual vs audio expectation mismatch': [],
-                'Story quality / content issues': [],
-                'Translation / language issues': [],
-                'Missing visual content': []
-            },
-            'User Experience Issues': {
-                'Interface / navigation problems': [],
-                'Login / account issues': [],
-                'Settings / customization problems': [],
-                'App performance / speed': [],
-                'Update / compatibility issues': []
-            },
-            'Support & Service Issues': {
-                'Support unresponsive': [],
-                'Refund / billing disputes': [],
-                'Account recovery problems': [],
-                'Feature requests ignored': [],
-                'Communication / transparency': []
-            },
-            'Localization Issues': {
-                'Missing languages / dubbing': [],
-                'Regional content availability': [],
-                'Cultural adaptation issues': [],
-                'Time zone / scheduling problems': []
-            }
-        }
+        self.matches = MatchProvenance(CATEGORY_TAXONOMY.current().data)  # keyword hits of analyze_reviews
         
     def load_and_parse_reviews(self):
-        """Load and parse the CSV file to extract Android reviews"""
+        """Load and parse the dump to extract Android reviews"""
         print("Loading and parsing reviews...")
         
-        with open(self.csv_file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        # Split by Appbot timestamps to identify individual review sessions
-        sessions = re.split(r'Appbot: App review alerts & repliesAPP \d+:\d+ [AP]M', content)
-        
-        current_date = datetime.now()
+        # Google Play reviews of one dump, or of a directory or glob of dumps parsed
+        # concurrently; days are the parser's calendar days, reconstructed from alert times
         day_counter = 0
-        
-        for session in sessions[1:]:  # Skip the first empty split
-            lines = session.strip().split('\n')
-            i = 0
-            
-            while i < len(lines):
-                line = lines[i].strip()
-                
-                # Look for timestamp pattern (e.g., "12:26")
-                time_match = re.match(r'^(\d{1,2}):(\d{2})$', line)
-                if time_match and i + 1 < len(lines):
-                    # Check if next line contains "Pocket FM: Audio Series (Google Play)"
-                    next_line = lines[i + 1].strip()
-                    if "Pocket FM: Audio Series (Google Play)" in next_line:
-                        # Found an Android review
-                        if i + 2 < len(lines):
-                            rating_line = lines[i + 2].strip()
-                            # Extract rating and reviewer info
-                            rating_match = re.search(r'★+.*?by (.*?) ·', rating_line)
-                            if rating_match:
-                                reviewer = rating_match.group(1)
-                                stars = rating_line.count('★')
-                                
-                                # Extract review text (next few lines until we hit reply/permalink/translate)
-                                review_text = ""
-                                j = i + 3
-                                while j < len(lines) and not any(keyword in lines[j].lower() for keyword in ['reply', 'permalink', 'translate', 'english ·', 'spanish ·', 'german ·', 'danish ·']):
-                                    if lines[j].strip() and not lines[j].strip().startswith('---'):
-                                        if "Translation" not in lines[j]:
-                                            review_text += lines[j].strip() + " "
-                                    j += 1
-                                
-                                if review_text.strip():
-                                    review = {
-                                        'timestamp': f"{time_match.group(1)}:{time_match.group(2)}",
-                                        'day': day_counter,
-                                        'reviewer': reviewer,
-                                        'stars': stars,
-                                        'text': review_text.strip().strip('"'),
-                                        'platform': 'Android'
-                                    }
-                                    self.reviews_data.append(review)
-                
-                i += 1
-            
-            day_counter += 1
+        for _, record in iter_corpus(expand_sources(self.csv_file_path), platform='Android'):
+            if record.batch_index < 0:
+                continue
+            day_counter = max(day_counter, record.day_index)
+            review_text = record.review_text.strip('"')
+            if review_text:
+                review = {
+                    'timestamp': record.timestamp,
+                    'posted_at': record.posted_at,
+                    'day': record.day_index,
+                    'reviewer': record.reviewer,
+                    'stars': record.rating,
+                    'text': review_text,
+                    'platform': 'Android'
+                }
+                self.reviews_data.append(review)
             
         print(f"Parsed {len(self.reviews_data)} Android reviews across {day_counter} days")
         return self.reviews_data
     
-    def categorize_review(self, review_text):
-        """Categorize a single review into themes and sub-categories"""
-        review_lower = review_text.lower()
-        categories_found = []
-        
-        # Define keyword patterns for each category and subcategory
-        patterns = {
-            'Ads Related Issues': {
-                'Too many ads / ads gating': ['too many ads', 'ads every', 'constant ads', 'ad after ad', 'ads gating', 'watch ads', 'ads to unlock', 'ads for coins'],
-                'Misleading ads / bait-and-switch': ['misleading ad', 'false ad', 'ad different', 'nothing like ad', 'ad shows', 'facebook ad', 'advertisement lie'],
-                'Ad quality / inappropriate ads': ['inappropriate ads', 'bad ads', 'annoying ads', 'stupid ads', 'ads suck'],
-                'Ad frequency / interruptions': ['ads interrupt', 'ads break', 'ads pause', 'ads in middle'],
-                'Forced ad watching': ['forced to watch', 'must watch ads', 'cant skip ads', 'skip ad']
-            },
-            'Coins Related Issues': {
-                'Too expensive / high coin cost': ['too expensive', 'cost too much', 'overpriced', 'ridiculous price', 'money pit', 'expensive coins', '$', 'euro', '€', 'price', 'costly'],
-                'Subscription needed / pricing model': ['subscription', 'monthly fee', 'pay to', 'premium', 'subscription model', 'recurring payment'],
-                'Too slow unlock / few free episodes': ['only free', 'few free', 'slow unlock', 'limited free', 'not enough free'],
-                'Coin system confusing': ['confusing coins', 'dont understand coins', 'coin system', 'how coins work'],
-                'Unauthorized charges / billing issues': ['charged without', 'unauthorized', 'auto charge', 'unexpected charge', 'billing issue', 'money taken']
-            },
-            'Content Discovery Issues': {
-                'Search / discoverability problems': ['cant find', 'search not work', 'hard to find', 'search broken', 'discover'],
-                'Poor recommendations / irrelevant suggestions': ['bad recommend', 'irrelevant suggest', 'wrong suggest', 'recommendations suck'],
-                'Auto-starts other series': ['auto start', 'starts other', 'switches story', 'changes series'],
-                'Lack of new content': ['no new content', 'same stories', 'need more content', 'limited content'],
-                'Content organization / categories': ['organize', 'categories', 'sort', 'filter']
-            },
-            'Listening Related Issues': {
-                'Crashes / app not working': ['crash', 'not working', 'wont work', 'broken', 'stops working', 'app freeze'],
-                'Offline / download issues': ['offline', 'download', 'cant download', 'offline not work'],
-                'Buffering / won\'t load': ['buffering', 'wont load', 'loading', 'buffer', 'slow load'],
-                'Playback jumps / episode switching': ['jumps episode', 'skips', 'playback issue', 'episode jump'],
-                'Audio quality / sync issues': ['audio quality', 'sound quality', 'sync issue', 'audio sync'],
-                'Notifications / interruptions': ['notification', 'interrupt', 'pause', 'stop playing']
-            },
-            'Content Quality Issues': {
-                'AI voices / poor narration quality': ['ai voice', 'robot voice', 'artificial voice', 'bad voice', 'voice quality', 'narration', 'narrator'],
-                'Visual vs audio expectation mismatch': ['expected video', 'thought video', 'no video', 'audio only', 'visual expect'],
-                'Story quality / content issues': ['bad story', 'story quality', 'poor content', 'story suck'],
-                'Translation / language issues': ['translation', 'language', 'subtitle', 'english'],
-                'Missing visual content': ['no visual', 'no picture', 'no image', 'audio only']
-            },
-            'User Experience Issues': {
-                'Interface / navigation problems': ['interface', 'navigation', 'ui', 'user interface', 'hard to use'],
-                'Login / account issues': ['login', 'account', 'sign in', 'password'],
-                'Settings / customization problems': ['settings', 'customize', 'options', 'preferences'],
-                'App performance / speed': ['slow app', 'app slow', 'performance', 'lag', 'sluggish'],
-                'Update / compatibility issues': ['update', 'version', 'compatibility', 'android version']
-            },
-            'Support & Service Issues': {
-                'Support unresponsive': ['support', 'customer service', 'help', 'contact', 'response', 'unresponsive'],
-                'Refund / billing disputes': ['refund', 'money back', 'billing', 'charge dispute'],
-                'Account recovery problems': ['account recovery', 'lost account', 'cant access'],
-                'Feature requests ignored': ['feature request', 'suggestion ignored', 'want feature'],
-                'Communication / transparency': ['communication', 'transparency', 'information', 'explain']
-            },
-            'Localization Issues': {
-                'Missing languages / dubbing': ['language', 'dubbing', 'hindi', 'spanish', 'german', 'french', 'local language'],
-                'Regional content availability': ['region', 'country', 'available in', 'geographic'],
-                'Cultural adaptation issues': ['cultural', 'culture', 'local custom'],
-                'Time zone / scheduling problems': ['time zone', 'schedule', 'timing']
+    @staticmethod
+    def category_entries(matches):
+        """matcher.match results as categorize_review reports them"""
+        return [
+            {
+                'main_category': main_category,
+                'subcategory': subcategory,
+                'keyword_matched': keyword
             }
-        }
-        
-        for main_category, subcategories in patterns.items():
-            for subcategory, keywords in subcategories.items():
-                for keyword in keywords:
-                    if keyword in review_lower:
-                        categories_found.append({
-                            'main_category': main_category,
-                            'subcategory': subcategory,
-                            'keyword_matched': keyword
-                        })
-                        break  # Only count once per subcategory per review
-        
-        return categories_found
+            for main_category, subcategory, keyword in matches
+        ]
+
+    def categorize_review(self, review_text, matcher=None):
+        """Categorize a single review into themes and sub-categories"""
+        matcher = matcher or CATEGORY_TAXONOMY.matcher()
+        return self.category_entries(matcher.match(review_text))
+
+    def categorize_many(self, texts, matcher=None, workers=1):
+        """Categorize a batch of reviews; one result list per text, in order. With workers > 1
+        (None: every core) chunks are matched in worker processes"""
+        matcher = matcher or CATEGORY_TAXONOMY.matcher()
+        return [self.category_entries(matches) for matches in match_all(texts, matcher, 'match', workers)]
     
     def analyze_reviews(self):
         """Analyze all reviews and categorize them"""
         print("Categorizing reviews...")
         
-        for review in self.reviews_data:
-            categories = self.categorize_review(review['text'])
-            review['categories'] = categories
+        # One taxonomy for the whole pass; a rerun after the file changes re-categorizes the parsed reviews
+        taxonomy = CATEGORY_TAXONOMY.current()
+        self.matches = MatchProvenance(taxonomy.data)
+        all_hits = match_all([review['text'] for review in self.reviews_data], taxonomy.matcher(), 'match_ids', CATEGORIZE_WORKERS)
+        for review_id, (review, hits) in enumerate(zip(self.reviews_data, all_hits)):
+            review['categories'] = [self.matches.entry(sub_id, keyword_index) for sub_id, keyword_index, _ in hits]
             
             # Add to category tracking
-            for cat in categories:
-                main_cat = cat['main_category']
-                sub_cat = cat['subcategory']
-                self.categories[main_cat][sub_cat].append({
-                    'review': review,
-                    'keyword': cat['keyword_matched']
-                })
+            for sub_id, keyword_index, offset in hits:
+                self.matches.add(review_id, sub_id, keyword_index, offset)
         
         print("Categorization complete!")
+
+    def matched_reviews(self, main_cat, sub_cat):
+        """Drill-down: (review, keyword, offset in the lowercased text) of every match of a subcategory"""
+        return [(self.reviews_data[review_id], keyword, offset) for review_id, keyword, offset in self.matches.hits(main_cat, sub_cat)]
+
+    def assign_duplicate_clusters(self):
+        """Give every review a near-duplicate cluster id, the index of the cluster's first review;
+        a review with no near-duplicate is its own cluster"""
+        print("Finding near-duplicate reviews...")
+        cluster_ids = near_duplicate_clusters(review['text'] for review in self.reviews_data)
+        for review, cluster_id in zip(self.reviews_data, cluster_ids):
+            review['duplicate_cluster'] = cluster_id
+        sizes = [n for n in Counter(cluster_ids).values() if n > 1]
+        print(f"{sum(sizes)} reviews in {len(sizes)} near-duplicate clusters")
         
-    def generate_daily_trends(self):
-        """Generate day-on-day trend analysis"""
+    def daily_matrices(self, count_clusters_once=COUNT_DUPLICATE_CLUSTERS_ONCE):
+        """Dense day x category and day x "category > subcategory" hit counts, every day from the
+        first review to the last, in one scatter-add over the keyword hits"""
+        review_days = np.array([review['day'] for review in self.reviews_data], dtype=np.int64)
+        counted = np.ones(len(review_days), dtype=bool)
+        if count_clusters_once:
+            clusters = np.array([review.get('duplicate_cluster', i) for i, review in enumerate(self.reviews_data)], dtype=np.int64)
+            counted = clusters == np.arange(len(clusters))
+        hit_reviews = np.frombuffer(self.matches.hit_reviews, dtype=np.uint32)
+        hit_subs = np.frombuffer(self.matches.hit_subs, dtype=np.uint16)
+        kept = counted[hit_reviews]
+        sub_labels = [f"{main_cat} > {sub_cat}" for main_cat, sub_cat in self.matches.subs]
+        by_sub = CountMatrix.from_hits(sub_labels, review_days[hit_reviews[kept]], hit_subs[kept], review_days[counted])
+        # Subcategories of a category are adjacent in the table
+        main_cats = [main_cat for main_cat, _ in self.matches.subs]
+        starts = [i for i, main_cat in enumerate(main_cats) if i == 0 or main_cats[i - 1] != main_cat]
+        return by_sub.combine([main_cats[i] for i in starts], starts), by_sub
+
+    def generate_daily_trends(self, count_clusters_once=COUNT_DUPLICATE_CLUSTERS_ONCE):
+        """Generate day-on-day trend analysis. With count_clusters_once only the first review
+        of each near-duplicate cluster is counted"""
         print("Analyzing daily trends...")
         
-        # Group reviews by day and category
-        daily_data = defaultdict(lambda: defaultdict(int))
-        daily_subcategory_data = defaultdict(lambda: defaultdict(int))
-        
-        for review in self.reviews_data:
-            day = review['day']
-            for cat in review['categories']:
-                main_cat = cat['main_category']
-                sub_cat = cat['subcategory']
-                daily_data[day][main_cat] += 1
-                daily_subcategory_data[day][f"{main_cat} > {sub_cat}"] += 1
+        # Day x category counts; days without complaints are zeros, not gaps
+        daily_data, daily_subcategory_data = self.daily_matrices(count_clusters_once)
+        days = daily_data.days()
+        rolling = daily_data.rolling_mean(ROLLING_WINDOW_DAYS)
+        rates = daily_data.rates()
         
         # Calculate trends and anomalies
         trends = {}
         anomalies = []
         
-        for main_cat in self.categories.keys():
-            daily_counts = []
-            days = sorted(daily_data.keys())
-            
-            for day in days:
-                count = daily_data[day][main_cat]
-                daily_counts.append(count)
+        for j, main_cat in enumerate(daily_data.labels):
+            daily_counts = daily_data.counts[:, j]
             
             if len(daily_counts) > 3:
-                # Calculate rolling average and detect anomalies
-                rolling_avg = np.mean(daily_counts)
-                rolling_std = np.std(daily_counts)
+                average = float(daily_counts.mean())
+                std = float(daily_counts.std())
                 
-                for i, count in enumerate(daily_counts):
-                    if rolling_std > 0:
-                        z_score = (count - rolling_avg) / rolling_std
-                        if z_score > 2.0:  # Significant anomaly
-                            anomalies.append({
-                                'day': days[i],
-                                'category': main_cat,
-                                'count': count,
-                                'average': rolling_avg,
-                                'z_score': z_score,
-                                'increase_pct': ((count - rolling_avg) / rolling_avg * 100) if rolling_avg > 0 else 0
-                            })
+                if std > 0:
+                    z_scores = (daily_counts - average) / std
+                    for i in np.flatnonzero(z_scores > 2.0):  # Significant anomaly
+                        anomalies.append({
+                            'day': int(days[i]),
+                            'category': main_cat,
+                            'count': int(daily_counts[i]),
+                            'average': average,
+                            'z_score': float(z_scores[i]),
+                            'increase_pct': float((daily_counts[i] - average) / average * 100) if average > 0 else 0
+                        })
                 
                 trends[main_cat] = {
-                    'daily_counts': daily_counts,
-                    'days': days,
-                    'average': rolling_avg,
-                    'std': rolling_std,
-                    'total': sum(daily_counts)
+                    'daily_counts': daily_counts.tolist(),
+                    'days': days.tolist(),
+                    'average': average,
+                    'std': std,
+                    'total': int(daily_counts.sum()),
+                    'rolling_average': rolling[:, j].tolist(),
+                    'share_of_reviews': rates[:, j].tolist()
                 }
         
         return trends, anomalies, daily_data, daily_subcategory_data
@@ -307,30 +197,31 @@ class AndroidReviewAnalyzer:
         }
         
         # Category summary
-        for main_cat, subcategories in self.categories.items():
-            total_issues = sum(len(issues) for issues in subcategories.values())
+        counts = self.matches.counts()
+        for main_cat, subcategories in counts.items():
+            total_issues = sum(subcategories.values())
             insights['category_summary'][main_cat] = {
                 'total_count': total_issues,
                 'percentage': (total_issues / len(self.reviews_data)) * 100 if len(self.reviews_data) > 0 else 0,
                 'subcategories': {}
             }
             
-            for sub_cat, issues in subcategories.items():
-                if len(issues) > 0:
+            for sub_cat, hits in subcategories.items():
+                if hits > 0:
                     insights['category_summary'][main_cat]['subcategories'][sub_cat] = {
-                        'count': len(issues),
-                        'percentage_of_category': (len(issues) / total_issues) * 100 if total_issues > 0 else 0
+                        'count': hits,
+                        'percentage_of_category': (hits / total_issues) * 100 if total_issues > 0 else 0
                     }
         
         # Top issues
         all_subcategory_counts = []
-        for main_cat, subcategories in self.categories.items():
-            for sub_cat, issues in subcategories.items():
-                if len(issues) > 0:
+        for main_cat, subcategories in counts.items():
+            for sub_cat, hits in subcategories.items():
+                if hits > 0:
                     all_subcategory_counts.append({
                         'main_category': main_cat,
                         'subcategory': sub_cat,
-                        'count': len(issues)
+                        'count': hits
                     })
         
         insights['top_issues'] = sorted(all_subcategory_counts, key=lambda x: x['count'], reverse=True)[:10]
@@ -366,21 +257,21 @@ class AndroidReviewAnalyzer:
         
         # Save subcategory details
         subcategory_details = []
-        for main_cat, subcategories in self.categories.items():
-            for sub_cat, issues in subcategories.items():
-                if len(issues) > 0:
+        for main_cat, subcategories in self.matches.counts().items():
+            for sub_cat, hits in subcategories.items():
+                if hits > 0:
                     subcategory_details.append({
                         'main_category': main_cat,
                         'subcategory': sub_cat,
-                        'count': len(issues),
-                        'percentage_of_total': (len(issues) / len(self.reviews_data)) * 100
+                        'count': hits,
+                        'percentage_of_total': (hits / len(self.reviews_data)) * 100
                     })
         pd.DataFrame(subcategory_details).to_csv('/workspace/android_analysis_output/android_subcategory_details.csv', index=False)
         
         # Save daily trends
         daily_trends = []
-        for day, categories in daily_data.items():
-            for category, count in categories.items():
+        for day, counts in zip(daily_data.days().tolist(), daily_data.counts.tolist()):
+            for category, count in zip(daily_data.labels, counts):
                 daily_trends.append({
                     'day': day,
                     'category': category,
@@ -398,7 +289,8 @@ class AndroidReviewAnalyzer:
         print("Results saved to /workspace/android_analysis_output/")
 
 def main():
-    analyzer = AndroidReviewAnalyzer('/workspace/App reviews dump - Sheet1.csv')
+    # A dump, a directory of dumps or a glob may be given on the command line
+    analyzer = AndroidReviewAnalyzer(sys.argv[1] if len(sys.argv) > 1 else '/workspace/App reviews dump - Sheet1.csv')
     
     # Load and parse reviews
     analyzer.load_and_parse_reviews()
@@ -406,6 +298,9 @@ def main():
     # Categorize reviews
     analyzer.analyze_reviews()
     
+    # Group near-duplicate reviews
+    analyzer.assign_duplicate_clusters()
+    
     # Generate trends and anomalies
     trends, anomalies, daily_data, daily_subcategory_data = analyzer.generate_daily_trends()
     
@@ -419,7 +314,7 @@ def main():
     print("ANDROID REVIEW ANALYSIS COMPLETE")
     print("="*60)
     print(f"Total Android reviews analyzed: {len(analyzer.reviews_data)}")
-    print(f"Categories identified: {len(analyzer.categories)}")
+    print(f"Categories identified: {len(analyzer.matches.category_names())}")
     print(f"Anomalies detected: {len(anomalies)}")
     print("\nTop 5 Issues:")
     for i, issue in enumerate(insights['top_issues'][:5], 1):
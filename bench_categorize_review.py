@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark: AndroidReviewAnalyzer.categorize_review on the compiled pattern
+matcher vs the previous per-call implementation, which rebuilt the keyword
+table and scanned it keyword by keyword on every review. The legacy method is
+kept here verbatim so both can be timed on the same reviews and checked for
+identical results, keyword_matched included. The naive-Bayes classifier
+trained on the same table's labels is timed on the same reviews too.
+"""
+
+import sys
+import time
+from typing import Dict, List
+
+import android_review_analysis
+import simple_android_analysis
+from review_classifier import train_classifier
+from review_parser import iter_dump
+
+
+SOURCE_FILE = "/workspace/App reviews dump - Sheet1.csv"
+
+
+def legacy_categorize_review(review_text):
+    review_lower = review_text.lower()
+    categories_found = []
+
+    # Define keyword patterns for each category and subcategory
+    patterns = {
+        'Ads Related Issues': {
+            'Too many ads / ads gating': ['too many ads', 'ads every', 'constant ads', 'ad after ad', 'ads gating', 'watch ads', 'ads to unlock', 'ads for coins'],
+            'Misleading ads / bait-and-switch': ['misleading ad', 'false ad', 'ad different', 'nothing like ad', 'ad shows', 'facebook ad', 'advertisement lie'],
+            'Ad quality / inappropriate ads': ['inappropriate ads', 'bad ads', 'annoying ads', 'stupid ads', 'ads suck'],
+            'Ad frequency / interruptions': ['ads interrupt', 'ads break', 'ads pause', 'ads in middle'],
+            'Forced ad watching': ['forced to watch', 'must watch ads', 'cant skip ads', 'skip ad']
+        },
+        'Coins Related Issues': {
+            'Too expensive / high coin cost': ['too expensive', 'cost too much', 'overpriced', 'ridiculous price', 'money pit', 'expensive coins', '$', 'euro', '€', 'price', 'costly'],
+            'Subscription needed / pricing model': ['subscription', 'monthly fee', 'pay to', 'premium', 'subscription model', 'recurring payment'],
+            'Too slow unlock / few free episodes': ['only free', 'few free', 'slow unlock', 'limited free', 'not enough free'],
+            'Coin system confusing': ['confusing coins', 'dont understand coins', 'coin system', 'how coins work'],
+            'Unauthorized charges / billing issues': ['charged without', 'unauthorized', 'auto charge', 'unexpected charge', 'billing issue', 'money taken']
+        },
+        'Content Discovery Issues': {
+            'Search / discoverability problems': ['cant find', 'search not work', 'hard to find', 'search broken', 'discover'],
+            'Poor recommendations / irrelevant suggestions': ['bad recommend', 'irrelevant suggest', 'wrong suggest', 'recommendations suck'],
+            'Auto-starts other series': ['auto start', 'starts other', 'switches story', 'changes series'],
+            'Lack of new content': ['no new content', 'same stories', 'need more content', 'limited content'],
+            'Content organization / categories': ['organize', 'categories', 'sort', 'filter']
+        },
+        'Listening Related Issues': {
+            'Crashes / app not working': ['crash', 'not working', 'wont work', 'broken', 'stops working', 'app freeze'],
+            'Offline / download issues': ['offline', 'download', 'cant download', 'offline not work'],
+            'Buffering / won\'t load': ['buffering', 'wont load', 'loading', 'buffer', 'slow load'],
+            'Playback jumps / episode switching': ['jumps episode', 'skips', 'playback issue', 'episode jump'],
+            'Audio quality / sync issues': ['audio quality', 'sound quality', 'sync issue', 'audio sync'],
+            'Notifications / interruptions': ['notification', 'interrupt', 'pause', 'stop playing']
+        },
+        'Content Quality Issues': {
+            'AI voices / poor narration quality': ['ai voice', 'robot voice', 'artificial voice', 'bad voice', 'voice quality', 'narration', 'narrator'],
+            'Visual vs audio expectation mismatch': ['expected video', 'thought video', 'no video', 'audio only', 'visual expect'],
+            'Story quality / content issues': ['bad story', 'story quality', 'poor content', 'story suck'],
+            'Translation / language issues': ['translation', 'language', 'subtitle', 'english'],
+            'Missing visual content': ['no visual', 'no picture', 'no image', 'audio only']
+        },
+        'User Experience Issues': {
+            'Interface / navigation problems': ['interface', 'navigation', 'ui', 'user interface', 'hard to use'],
+            'Login / account issues': ['login', 'account', 'sign in', 'password'],
+            'Settings / customization problems': ['settings', 'customize', 'options', 'preferences'],
+            'App performance / speed': ['slow app', 'app slow', 'performance', 'lag', 'sluggish'],
+            'Update / compatibility issues': ['update', 'version', 'compatibility', 'android version']
+        },
+        'Support & Service Issues': {
+            'Support unresponsive': ['support', 'customer service', 'help', 'contact', 'response', 'unresponsive'],
+            'Refund / billing disputes': ['refund', 'money back', 'billing', 'charge dispute'],
+            'Account recovery problems': ['account recovery', 'lost account', 'cant access'],
+            'Feature requests ignored': ['feature request', 'suggestion ignored', 'want feature'],
+            'Communication / transparency': ['communication', 'transparency', 'information', 'explain']
+        },
+        'Localization Issues': {
+            'Missing languages / dubbing': ['language', 'dubbing', 'hindi', 'spanish', 'german', 'french', 'local language'],
+            'Regional content availability': ['region', 'country', 'available in', 'geographic'],
+            'Cultural adaptation issues': ['cultural', 'culture', 'local custom'],
+            'Time zone / scheduling problems': ['time zone', 'schedule', 'timing']
+        }
+    }
+
+    for main_category, subcategories in patterns.items():
+        for subcategory, keywords in subcategories.items():
+            for keyword in keywords:
+                if keyword in review_lower:
+                    categories_found.append({
+                        'main_category': main_category,
+                        'subcategory': subcategory,
+                        'keyword_matched': keyword
+                    })
+                    break  # Only count once per subcategory per review
+
+    return categories_found
+
+
+def legacy_scan(review_text: str, patterns: Dict[str, Dict[str, List[str]]]) -> List[Dict[str, str]]:
+    # The legacy loop over another analyzer's table, for the equivalence check only
+    review_lower = review_text.lower()
+    categories_found = []
+    for main_category, subcategories in patterns.items():
+        for subcategory, keywords in subcategories.items():
+            for keyword in keywords:
+                if keyword in review_lower:
+                    categories_found.append({'main_category': main_category, 'subcategory': subcategory, 'keyword_matched': keyword})
+                    break
+    return categories_found
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    path = sys.argv[1] if len(sys.argv) > 1 else SOURCE_FILE
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    texts = [r.review_text.strip('"') for r in iter_dump(path, platform='Android')] * copies
+
+    analyzer = android_review_analysis.AndroidReviewAnalyzer(path)
+    if [legacy_categorize_review(t) for t in texts] != analyzer.categorize_many(texts):
+        print("Output mismatch between legacy and compiled categorize_review", file=sys.stderr)
+        sys.exit(1)
+    simple = simple_android_analysis.AndroidReviewAnalyzer(path)
+    if [legacy_scan(t, simple_android_analysis.CATEGORY_TAXONOMY.current().data) for t in texts] != simple.categorize_many(texts):
+        print("Output mismatch in simple_android_analysis", file=sys.stderr)
+        sys.exit(1)
+
+    t_legacy = best_of(lambda: [legacy_categorize_review(t) for t in texts], 3)
+    t_single = best_of(lambda: [analyzer.categorize_review(t) for t in texts], 3)
+    t_batch = best_of(lambda: analyzer.categorize_many(texts), 3)
+    model = train_classifier(android_review_analysis.CATEGORY_TAXONOMY.current(), texts)
+    t_bayes = best_of(lambda: model.classify(texts), 3)
+    print(f"Reviews: {len(texts):,}")
+    print(f"Legacy per-call:      {t_legacy:.3f}s  ({len(texts) / t_legacy:,.0f} reviews/s)")
+    print(f"categorize_review:    {t_single:.3f}s  ({len(texts) / t_single:,.0f} reviews/s)")
+    print(f"categorize_many:      {t_batch:.3f}s  ({len(texts) / t_batch:,.0f} reviews/s)")
+    print(f"Naive Bayes classify: {t_bayes:.3f}s  ({len(texts) / t_bayes:,.0f} reviews/s)")
+    print(f"Speedup: {t_legacy / t_batch:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
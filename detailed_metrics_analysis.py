@@ -1,26 +1,25 @@
 #!/usr/bin/env python3
 import pandas as pd
-import json
 from collections import defaultdict
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime, timedelta
 
+import review_cache
+
 # Load the existing analysis data
 def load_analysis_data():
-    # Load parsed reviews
-    reviews_df = pd.read_csv('/workspace/analysis_output/parsed_reviews.csv')
-    
-    # Load trends data
-    with open('/workspace/analysis_output/trends.json', 'r') as f:
-        trends = json.load(f)
+    # Load parsed reviews (typed columns from the shared cache)
+    reviews_df = review_cache.to_frame(review_cache.reviews_table())
     
-    # Load daily theme counts
-    daily_themes = pd.read_csv('/workspace/analysis_output/daily_theme_counts.csv')
+    # Load trends data (from the shared cache too)
+    trends = review_cache.load_trends()
     
-    # Load overall counts
-    overall_themes = pd.read_csv('/workspace/analysis_output/overall_theme_counts.csv')
-    overall_subcategories = pd.read_csv('/workspace/analysis_output/overall_subcategory_counts.csv')
+    # Load daily theme counts and overall counts
+    themes = review_cache.theme_tables()
+    daily_themes = review_cache.to_frame(themes['daily_theme'])
+    overall_themes = review_cache.to_frame(themes['overall_theme'])
+    overall_subcategories = review_cache.to_frame(themes['overall_subcat'])
     
     return reviews_df, trends, daily_themes, overall_themes, overall_subcategories
 
@@ -3,25 +3,18 @@ import csv
 import json
 from collections import defaultdict
 
-def load_csv_data(filename):
-    """Load CSV data into list of dictionaries"""
-    data = []
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                data.append(row)
-    except FileNotFoundError:
-        print(f"File {filename} not found")
-        return []
-    return data
+import review_cache
+
+def load_table_data(name):
+    """Load a cached theme table into list of dictionaries"""
+    return review_cache.table_rows(review_cache.theme_tables()[name])
 
 def create_enhanced_analysis():
     # Load existing data
-    overall_themes = load_csv_data('/workspace/analysis_output/overall_theme_counts.csv')
-    overall_subcategories = load_csv_data('/workspace/analysis_output/overall_subcategory_counts.csv')
-    daily_themes = load_csv_data('/workspace/analysis_output/daily_theme_counts.csv')
-    anomalies = load_csv_data('/workspace/analysis_output/anomalies_daily_theme.csv')
+    overall_themes = load_table_data('overall_theme')
+    overall_subcategories = load_table_data('overall_subcat')
+    daily_themes = load_table_data('daily_theme')
+    anomalies = load_table_data('anomalies')
     
     # Calculate total reviews
     total_reviews = sum(int(row['count']) for row in overall_themes if row['theme'] != 'Other')
@@ -201,7 +194,7 @@ def create_enhanced_analysis():
 
 def create_priority_csv():
     """Create a priority matrix CSV"""
-    overall_themes = load_csv_data('/workspace/analysis_output/overall_theme_counts.csv')
+    overall_themes = load_table_data('overall_theme')
     total_reviews = sum(int(row['count']) for row in overall_themes if row['theme'] != 'Other')
     
     priority_data = []
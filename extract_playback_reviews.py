@@ -7,27 +7,25 @@ Uses language understanding and pattern matching to identify relevant reviews.
 import re
 import json
 import csv
-from typing import List, Dict, Any
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
 
-def is_playback_performance_issue(text: str) -> bool:
-    """
-    Determine if a review text relates to playback or performance issues.
-    Uses both keyword matching and contextual understanding.
-    """
-    text_lower = text.lower()
-    
+from keyword_automaton import SubstringAutomaton
+from parallel_match import match_all
+from review_parser import iter_dump
+
+# Pattern families; each pattern is searched in the lowercased review text
+PLAYBACK_PATTERN_FAMILIES = {
     # Crash and freezing issues
-    crash_patterns = [
+    'crash': [
         r'\b(crash|crashing|crashed|freeze|freezing|frozen|hang|hanging|hangs)\b',
         r'\bapp.*stop.*work',
         r'\bstop.*working',
         r'\bnot.*working.*properly',
         r'\bapp.*broken',
         r'\bglitch|glitchy|bug|bugs|buggy'
-    ]
-    
+    ],
     # Buffering and loading issues
-    buffer_patterns = [
+    'buffer': [
         r'\bbuffer|buffering\b',
         r'\blag|lagging|laggy\b', 
         r'\bslow.*load|loading.*slow\b',
@@ -35,10 +33,9 @@ def is_playback_performance_issue(text: str) -> bool:
         r'\btakes.*long.*load',
         r'\bload.*turtle',
         r'\bslow.*performance'
-    ]
-    
+    ],
     # Audio playback issues
-    audio_patterns = [
+    'audio': [
         r'\baudio.*not.*play',
         r'\bsound.*not.*work',
         r'\bno.*audio|no.*sound',
@@ -51,19 +48,17 @@ def is_playback_performance_issue(text: str) -> bool:
         r'\bnoise.*much|distort|static',
         r'\bbroken.*speaker',
         r'\bquality.*poor|poor.*quality'
-    ]
-    
+    ],
     # Download and offline issues  
-    download_patterns = [
+    'download': [
         r'\bdownload.*fail|download.*problem|download.*error',
         r'\bwon\'?t.*download|can\'?t.*download',
         r'\bdownload.*not.*work',
         r'\boffline.*not.*work|can\'?t.*play.*offline',
         r'\bdownload.*episode.*not.*play'
-    ]
-    
+    ],
     # App functionality issues
-    functionality_patterns = [
+    'functionality': [
         r'\bapp.*not.*work|not.*work.*properly',
         r'\bstuck|freeze.*up',
         r'\berror|errors',
@@ -72,130 +67,194 @@ def is_playback_performance_issue(text: str) -> bool:
         r'\bskip.*episode|jump.*episode',
         r'\breset.*progress|restart.*episode',
         r'\brepeat.*episode|replay.*episode'
-    ]
-    
+    ],
     # Performance issues
-    performance_patterns = [
+    'performance': [
         r'\bperformance.*bad|bad.*performance',
         r'\bapp.*slow|slow.*app',
         r'\bhang.*lot|hanging.*much',
         r'\bcrash.*frequent|frequent.*crash',
         r'\bstop.*frequent|frequent.*stop'
-    ]
-    
-    all_patterns = (crash_patterns + buffer_patterns + audio_patterns + 
-                   download_patterns + functionality_patterns + performance_patterns)
-    
-    # Check if any pattern matches
-    for pattern in all_patterns:
-        if re.search(pattern, text_lower):
-            return True
-    
-    # Additional contextual checks for performance issues
-    performance_keywords = [
-        'crash', 'freeze', 'hang', 'buffer', 'lag', 'slow', 'loading', 'glitch',
-        'bug', 'error', 'broken', 'stuck', 'stop', 'pause', 'skip', 'jump',
-        'repeat', 'restart', 'reset', 'download', 'offline', 'audio', 'sound',
-        'play', 'playing', 'volume', 'quality', 'noise', 'distort', 'static'
-    ]
-    
-    # Check for negative sentiment with performance keywords
-    negative_words = ['not', 'no', 'never', 'can\'t', 'cannot', 'won\'t', 'doesn\'t', 
-                     'bad', 'terrible', 'awful', 'horrible', 'worst', 'annoying', 
-                     'frustrating', 'disappointed', 'useless']
-    
-    words = text_lower.split()
-    has_performance_keyword = any(keyword in text_lower for keyword in performance_keywords)
-    has_negative_sentiment = any(neg in text_lower for neg in negative_words)
-    
-    return has_performance_keyword and has_negative_sentiment
+    ],
+}
 
-def parse_reviews_file(filename: str) -> List[Dict[str, Any]]:
-    """Parse the reviews file and extract structured review data."""
-    reviews = []
-    current_review = {}
-    
-    with open(filename, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        
-        # Skip empty lines
-        if not line:
-            i += 1
+# Contextual check: a performance keyword together with negative sentiment
+PERFORMANCE_KEYWORDS = [
+    'crash', 'freeze', 'hang', 'buffer', 'lag', 'slow', 'loading', 'glitch',
+    'bug', 'error', 'broken', 'stuck', 'stop', 'pause', 'skip', 'jump',
+    'repeat', 'restart', 'reset', 'download', 'offline', 'audio', 'sound',
+    'play', 'playing', 'volume', 'quality', 'noise', 'distort', 'static'
+]
+NEGATIVE_WORDS = ['not', 'no', 'never', 'can\'t', 'cannot', 'won\'t', 'doesn\'t', 
+                  'bad', 'terrible', 'awful', 'horrible', 'worst', 'annoying', 
+                  'frustrating', 'disappointed', 'useless']
+CONTEXTUAL_FAMILY = 'contextual'
+
+
+def _split_top_level(pattern: str, sep: str) -> List[str]:
+    # Split on `sep` outside groups, classes and escapes
+    parts, depth, start, i = [], 0, 0, 0
+    in_class = False
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 2
             continue
-            
-        # Check if this is a timestamp line (format: HH:MM)
-        if re.match(r'^\d{1,2}:\d{2}$', line):
-            # If we have a current review, save it
-            if current_review and 'review_text' in current_review:
-                reviews.append(current_review.copy())
-            current_review = {'timestamp': line}
-            i += 1
+        if in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif depth == 0 and pattern.startswith(sep, i):
+            parts.append(pattern[start:i])
+            start = i = i + len(sep)
             continue
-        
-        # Check if this is an app name line
-        if 'Pocket FM: Audio Series (Google Play)' in line:
-            current_review['app'] = line
+        i += 1
+    parts.append(pattern[start:])
+    return parts
+
+
+def _required_literal(token: str) -> Optional[str]:
+    # Longest run of plain characters every match of `token` contains, or None
+    runs, run, i = [], '', 0
+    while i < len(token):
+        c = token[i]
+        if c == '\\':
+            nxt = token[i + 1:i + 2]
+            if nxt == 'b':
+                i += 2
+                continue
+            if nxt.isalnum():
+                runs.append(run)
+                run = ''
+            else:
+                run += nxt
+            i += 2
+        elif c in '?*{':
+            run = run[:-1]
+            runs.append(run)
+            run = ''
             i += 1
-            continue
-            
-        # Check if this is a rating/reviewer line (contains stars)
-        if '★' in line and '·' in line:
-            current_review['rating_info'] = line
-            # Extract star rating
-            star_match = re.search(r'(★+)', line)
-            if star_match:
-                current_review['stars'] = len(star_match.group(1))
-            # Extract reviewer name
-            reviewer_match = re.search(r'by\s+([^·]+)', line)
-            if reviewer_match:
-                current_review['reviewer'] = reviewer_match.group(1).strip()
+        elif c == '+':
+            runs.append(run)
+            run = ''
             i += 1
+        elif c in '([.|^$':
+            # Groups, classes and alternation are not unpicked; stop at the first one
+            runs.append(run)
+            run = ''
+            break
+        else:
+            run += c
+            i += 1
+    runs.append(run)
+    longest = max(runs, key=len)
+    return longest or None
+
+
+class PlaybackMatcher:
+    """
+    PLAYBACK_PATTERN_FAMILIES and the contextual keyword check compiled for one
+    pass per review. A substring automaton finds which literals occur; only
+    patterns whose literals all occur are confirmed with their regex. Each
+    ".*" chain is rewritten so "a.*b.*c" takes the first a, then the first b
+    after it, then the first c, each in an atomic group: the same answer, but
+    the scan is linear instead of backtracking over every split point.
+    """
+
+    def __init__(self, families: Dict[str, List[str]], keywords: List[str], negatives: List[str]) -> None:
+        self.families = list(families)
+        self.keywords = frozenset(keywords)
+        self.negatives = frozenset(negatives)
+        # (family, compiled alternative, literals it needs)
+        self.alternatives: List[Tuple[str, re.Pattern, FrozenSet[str]]] = []
+        for family, patterns in families.items():
+            for pattern in patterns:
+                for alt in _split_top_level(pattern, '|'):
+                    tokens = _split_top_level(alt, '.*')
+                    literals = frozenset(lit for lit in map(_required_literal, tokens) if lit)
+                    linear = re.compile(''.join(f'(?>.*?{token})' for token in tokens))
+                    self.alternatives.append((family, linear, literals))
+        self.unfiltered = [i for i, (_, _, literals) in enumerate(self.alternatives) if not literals]
+        self.by_literal: Dict[str, List[int]] = {}
+        for i, (_, _, literals) in enumerate(self.alternatives):
+            for lit in literals:
+                self.by_literal.setdefault(lit, []).append(i)
+        self.automaton: SubstringAutomaton[str] = SubstringAutomaton(
+            (lit, lit) for lit in set(self.by_literal) | self.keywords | self.negatives
+        )
+
+    def match(self, text: str) -> List[str]:
+        text_lower = text.lower()
+        present = self.automaton.find(text_lower)
+        candidates = set(self.unfiltered)
+        for lit in present:
+            candidates.update(self.by_literal.get(lit, ()))
+        fired = set()
+        lines = None
+        for i in sorted(candidates):
+            family, linear, literals = self.alternatives[i]
+            if family in fired or not literals <= present:
+                continue
+            if lines is None:
+                # "." never crosses a line break, so chains are matched line by line
+                lines = text_lower.split('\n')
+            if any(linear.match(line) for line in lines):
+                fired.add(family)
+        families = [family for family in self.families if family in fired]
+        if not present.isdisjoint(self.keywords) and not present.isdisjoint(self.negatives):
+            families.append(CONTEXTUAL_FAMILY)
+        return families
+
+
+PLAYBACK_MATCHER = PlaybackMatcher(PLAYBACK_PATTERN_FAMILIES, PERFORMANCE_KEYWORDS, NEGATIVE_WORDS)
+CLASSIFY_WORKERS = None  # processes for main's classify_many; None uses every core
+
+
+def playback_issue_families(text: str) -> List[str]:
+    """
+    Pattern families that fire for a review, in PLAYBACK_PATTERN_FAMILIES order,
+    plus 'contextual' for a performance keyword alongside negative sentiment.
+    Empty when the review is not about playback or performance.
+    """
+    return PLAYBACK_MATCHER.match(text)
+
+
+def classify_many(texts: Iterable[str], workers: Optional[int] = 1) -> List[List[str]]:
+    """
+    playback_issue_families for a batch of reviews, in order. With workers > 1
+    (None: every core) chunks are classified in worker processes.
+    """
+    return match_all(texts, PLAYBACK_MATCHER, 'match', workers)
+
+
+def is_playback_performance_issue(text: str) -> bool:
+    """
+    Determine if a review text relates to playback or performance issues.
+    Uses both keyword matching and contextual understanding.
+    """
+    return bool(playback_issue_families(text))
+
+def parse_reviews_file(filename: str) -> List[Dict[str, Any]]:
+    """Parse the reviews file and extract structured review data."""
+    reviews = []
+    for record in iter_dump(filename):
+        if not record.review_text:
             continue
-            
-        # Check if this is a review text (not a system line)
-        if (line and not line.startswith('reply |') and 
-            not line.startswith('English ·') and not line.startswith('Spanish ·') and
-            not line.startswith('German ·') and not line.startswith('French ·') and
-            not line.endswith('Google Play') and
-            not line.startswith('Appbot:') and
-            not line.startswith('----') and
-            not line.startswith('English Translation') and
-            not re.match(r'^\d+\s+new\s+review', line)):
-            
-            # This could be review text
-            review_text = line
-            
-            # Check if this spans multiple lines (look ahead)
-            j = i + 1
-            while j < len(lines) and lines[j].strip():
-                next_line = lines[j].strip()
-                # Stop if we hit a system line
-                if (next_line.startswith('reply |') or 
-                    next_line.endswith('Google Play') or
-                    next_line.startswith('----') or
-                    next_line.startswith('English Translation')):
-                    break
-                # Add to review text if it's continuation
-                if not re.match(r'^\d{1,2}:\d{2}$', next_line) and '★' not in next_line:
-                    review_text += ' ' + next_line
-                else:
-                    break
-                j += 1
-            
-            current_review['review_text'] = review_text
-            i = j
-            continue
-            
-        i += 1
-    
-    # Don't forget the last review
-    if current_review and 'review_text' in current_review:
-        reviews.append(current_review)
-    
+        reviews.append({
+            'timestamp': record.timestamp,
+            'app': record.app,
+            'platform': record.platform,
+            'rating_info': record.rating_line,
+            'stars': record.rating,
+            'reviewer': record.reviewer,
+            'country': record.country,
+            'app_version': record.app_version,
+            'review_text': record.review_text
+        })
     return reviews
 
 def main():
@@ -205,8 +264,9 @@ def main():
     
     # Filter for playback/performance issues
     filtered_reviews = []
-    for review in reviews:
-        if 'review_text' in review and is_playback_performance_issue(review['review_text']):
+    for review, families in zip(reviews, classify_many((review['review_text'] for review in reviews), CLASSIFY_WORKERS)):
+        if families:
+            review['issue_families'] = families
             filtered_reviews.append(review)
     
     print(f"Reviews with playback/performance issues: {len(filtered_reviews)}")
@@ -218,10 +278,10 @@ def main():
     # Save as CSV
     if filtered_reviews:
         with open('/workspace/playback_performance_reviews.csv', 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['timestamp', 'app', 'rating_info', 'stars', 'reviewer', 'review_text'])
+            writer = csv.DictWriter(f, fieldnames=['timestamp', 'app', 'platform', 'rating_info', 'stars', 'reviewer', 'country', 'app_version', 'review_text', 'issue_families'])
             writer.writeheader()
             for review in filtered_reviews:
-                writer.writerow(review)
+                writer.writerow({**review, 'issue_families': ';'.join(review['issue_families'])})
     
     # Print sample results
     print("\nSample filtered reviews:")
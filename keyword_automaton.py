@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Multi-keyword matcher compiled once from the taxonomy.
+
+All keywords go into one character trie. A hit has to start at a word
+boundary, so the trie is only entered at word starts and every walk stops at
+the first character no keyword continues with; the text is scanned once, and
+the cost does not depend on how many keywords there are. Keywords of
+STEM_MIN_LENGTH characters or more also match as word prefixes ("crash" in
+"crashed"); shorter ones must end at a word boundary, bar a plural "s", so
+"ai" no longer matches "again" nor "ads" "loads".
+
+LanguageMatcher adds per-language keyword blocks, each compiled on its own:
+a review runs only the block of its language, on its untranslated text, and
+the base (English) keywords on its English text.
+
+SubstringAutomaton is the plain-substring counterpart (Aho-Corasick, with
+failure links) for the Android analyzers' pattern tables, which match
+keywords anywhere in the text.
+"""
+
+import re
+from collections import deque
+from typing import Dict, Generic, Hashable, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar
+
+
+MATCHER_VERSION = "1"  # bump whenever matching rules change; it keys checkpoints and cached tables
+STEM_MIN_LENGTH = 4
+
+_HITS = ""  # trie key of the payloads ending at a node; never a text character
+
+T = TypeVar("T", bound=Hashable)
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+class KeywordAutomaton(Generic[T]):
+    def __init__(self, keywords: Iterable[Tuple[str, T]], stem_min_length: int = STEM_MIN_LENGTH) -> None:
+        # keywords: (keyword, payload); a keyword may carry several payloads
+        self.root: Dict = {}
+        for keyword, payload in keywords:
+            keyword = keyword.lower().strip()
+            if not keyword:
+                continue
+            node = self.root
+            for c in keyword:
+                node = node.setdefault(c, {})
+            # (whole_word_only, payload) per keyword ending here
+            node.setdefault(_HITS, []).append((len(keyword) < stem_min_length, payload))
+        self.starts = self._starts_re(self.root)
+
+    @staticmethod
+    def _starts_re(root: Dict) -> "re.Pattern":
+        # Word starts at a character some keyword begins with; the others cannot start a hit
+        first = "".join(sorted(re.escape(c) for c in root if _is_word_char(c)))
+        return re.compile(rf"\b(?=[{first}])") if first else re.compile(r"(?!)")
+
+    def __getstate__(self) -> Dict:
+        return {"root": self.root}
+
+    def __setstate__(self, state: Dict) -> None:
+        # Cached matchers pickle the trie alone
+        self.root = state["root"]
+        self.starts = self._starts_re(self.root)
+
+    def iter_hits(self, text_l: str) -> Iterator[Tuple[int, int, T]]:
+        # (start, end, payload) of every keyword hit in already-lowercased text
+        n = len(text_l)
+        root = self.root
+        for m in self.starts.finditer(text_l):
+            start = i = m.start()
+            node = root
+            while i < n:
+                node = node.get(text_l[i])
+                if node is None:
+                    break
+                i += 1
+                hits = node.get(_HITS)
+                if hits is None:
+                    continue
+                at_boundary = i == n or not _is_word_char(text_l[i])
+                plural = not at_boundary and text_l[i] == "s" and (i + 1 == n or not _is_word_char(text_l[i + 1]))
+                for whole_word, payload in hits:
+                    if at_boundary or not whole_word or plural:
+                        yield start, i, payload
+
+    def find(self, text_l: str) -> Set[T]:
+        return {payload for _, _, payload in self.iter_hits(text_l)}
+
+
+class TaxonomyMatcher:
+    """A taxonomy compiled for categorize_text; results keep the taxonomy's category and subcategory order."""
+
+    def __init__(self, taxonomy: Dict[str, Dict[str, List[str]]], stem_min_length: int = STEM_MIN_LENGTH) -> None:
+        self.subs: List[Tuple[str, str]] = [(cat, sub) for cat, subs in taxonomy.items() for sub in subs]
+        self.automaton: KeywordAutomaton[int] = KeywordAutomaton(
+            ((kw, i) for i, (cat, sub) in enumerate(self.subs) for kw in taxonomy[cat][sub]),
+            stem_min_length,
+        )
+
+    def categorize(self, text: str) -> Tuple[List[str], List[str]]:
+        return self.labels(self.hit_ids(text))
+
+    def hit_ids(self, text: str) -> Set[int]:
+        # Positions in self.subs of the subcategories found in `text`
+        return self.automaton.find(text.lower())
+
+    def labels(self, hits: Set[int]) -> Tuple[List[str], List[str]]:
+        # Categories and subcategories of positions in self.subs, in taxonomy order
+        categories: List[str] = []
+        subcategories: List[str] = []
+        for i in sorted(hits):
+            cat, sub = self.subs[i]
+            if cat not in categories:
+                categories.append(cat)
+            if sub not in subcategories:
+                subcategories.append(sub)
+        return categories, subcategories
+
+
+class LanguageMatcher:
+    """A TaxonomyMatcher plus {language: {category: {subcategory: [keywords]}}} blocks in other
+    languages, labelling with the base taxonomy's categories. Languages are named as in the
+    review's "<Language> · Google Play" trailer, in any case."""
+
+    def __init__(self, taxonomy: Dict[str, Dict[str, List[str]]], languages: Dict[str, Dict[str, Dict[str, List[str]]]], stem_min_length: int = STEM_MIN_LENGTH) -> None:
+        self.base = TaxonomyMatcher(taxonomy, stem_min_length)
+        self.subs = self.base.subs
+        index = {pair: i for i, pair in enumerate(self.subs)}
+        self.by_language: Dict[str, KeywordAutomaton[int]] = {
+            language.lower(): KeywordAutomaton(
+                ((kw, index[(cat, sub)]) for cat, subs in block.items() for sub, kws in subs.items() for kw in kws),
+                stem_min_length,
+            )
+            for language, block in languages.items()
+        }
+
+    def categorize(self, text: str, language: Optional[str] = None, original_text: Optional[str] = None) -> Tuple[List[str], List[str]]:
+        # `text` is in English when a translation was captured, and `original_text` is then the
+        # review as written. The base keywords always run on `text`: untranslated reviews are
+        # often in English whatever the store language.
+        return self.base.labels(self.hit_ids(text, language, original_text))
+
+    def hit_ids(self, text: str, language: Optional[str] = None, original_text: Optional[str] = None) -> Set[int]:
+        # Positions in self.subs of the subcategories categorize() finds
+        hits = self.base.hit_ids(text)
+        automaton = self.by_language.get(language.lower()) if language else None
+        if automaton is not None:
+            hits |= automaton.find((original_text or text).lower())
+        return hits
+
+    def categorize_review(self, parts: Tuple[str, Optional[str], Optional[str]]) -> Tuple[List[str], List[str]]:
+        # categorize(*parts), for parallel_match, which passes one value per review
+        return self.categorize(*parts)
+
+
+class SubstringAutomaton(Generic[T]):
+    # Aho-Corasick: every occurrence of every keyword, anywhere in the text, in one pass
+    def __init__(self, keywords: Iterable[Tuple[str, T]]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[T]] = [[]]
+        for keyword, payload in keywords:
+            keyword = keyword.lower()
+            if not keyword:
+                continue
+            node = 0
+            for c in keyword:
+                nxt = goto[node].get(c)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                    goto[node][c] = nxt
+                node = nxt
+            outputs[node].append(payload)
+        # Breadth-first, so a node's failure target is final before its children need it
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for c, child in goto[node].items():
+                queue.append(child)
+                f = fail[node]
+                while f and c not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(c, 0)
+                fail[child] = target if target != child else 0
+                outputs[child] = outputs[child] + outputs[fail[child]]
+        self.goto = goto
+        self.fail = fail
+        self.outputs: List[Optional[Tuple[T, ...]]] = [tuple(o) if o else None for o in outputs]
+
+    def find(self, text_l: str) -> Set[T]:
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found: Set[T] = set()
+        node = 0
+        for c in text_l:
+            while True:
+                nxt = goto[node].get(c)
+                if nxt is not None:
+                    node = nxt
+                    break
+                if not node:
+                    break
+                node = fail[node]
+            out = outputs[node]
+            if out:
+                found.update(out)
+        return found
+
+
+class PatternTableMatcher:
+    """A {category: {subcategory: [keywords]}} table for substring matching. Per subcategory the
+    first listed keyword present is reported, as a keyword-by-keyword scan in table order would."""
+
+    def __init__(self, patterns: Dict[str, Dict[str, List[str]]]) -> None:
+        self.subs: List[Tuple[str, str]] = [(cat, sub) for cat, subs in patterns.items() for sub in subs]
+        self.automaton: SubstringAutomaton[Tuple[int, int, str]] = SubstringAutomaton(
+            (kw, (i, k, kw)) for i, (cat, sub) in enumerate(self.subs) for k, kw in enumerate(patterns[cat][sub])
+        )
+
+    def match(self, text: str) -> List[Tuple[str, str, str]]:
+        # (category, subcategory, keyword_matched) in table order
+        matched: List[Tuple[str, str, str]] = []
+        last = -1
+        for i, _, kw in sorted(self.automaton.find(text.lower())):
+            if i != last:
+                cat, sub = self.subs[i]
+                matched.append((cat, sub, kw))
+                last = i
+        return matched
+
+    def hit_ids(self, text: str) -> Set[int]:
+        # Positions in self.subs of the subcategories match() finds
+        return {i for i, _, _ in self.automaton.find(text.lower())}
+
+    def match_ids(self, text: str) -> List[Tuple[int, int, int]]:
+        # match() as (subcategory index, keyword index in its list, offset of the keyword's first
+        # occurrence in the lowercased text)
+        text_l = text.lower()
+        matched: List[Tuple[int, int, int]] = []
+        last = -1
+        for i, k, kw in sorted(self.automaton.find(text_l)):
+            if i != last:
+                matched.append((i, k, text_l.find(kw.lower())))
+                last = i
+        return matched
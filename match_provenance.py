@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Keyword hits of a pattern table, kept as parallel integer arrays.
+
+Each hit is a review id, a subcategory id, a keyword id and the offset the
+keyword was found at, in four typed arrays: 14 bytes a hit, where a dict
+holding the review cost hundreds. Counts, per category or subcategory, and
+drill-downs to the matching reviews are read off the arrays. Ids follow the
+table: subcategories in table order (as PatternTableMatcher.subs), keywords
+numbered across the whole table.
+"""
+
+import itertools
+from array import array
+from collections import Counter
+from typing import Dict, List, Tuple
+
+
+class MatchProvenance:
+    """Hits of a {category: {subcategory: [keywords]}} table."""
+
+    def __init__(self, patterns: Dict[str, Dict[str, List[str]]]) -> None:
+        self.subs: List[Tuple[str, str]] = [(cat, sub) for cat, subs in patterns.items() for sub in subs]
+        self.sub_ids: Dict[Tuple[str, str], int] = {pair: i for i, pair in enumerate(self.subs)}
+        self.keywords: List[str] = []
+        self.first_keyword = array("I")  # subcategory id -> id of its first keyword
+        for cat, sub in self.subs:
+            self.first_keyword.append(len(self.keywords))
+            self.keywords.extend(patterns[cat][sub])
+        self.hit_reviews = array("I")
+        self.hit_subs = array("H")
+        self.hit_keywords = array("I")
+        self.hit_offsets = array("I")  # in the lowercased review text
+        self._entries: Dict[Tuple[int, int], Dict[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.hit_reviews)
+
+    def add(self, review_id: int, sub_id: int, keyword_index: int, offset: int) -> None:
+        # keyword_index: position in the subcategory's keyword list
+        self.hit_reviews.append(review_id)
+        self.hit_subs.append(sub_id)
+        self.hit_keywords.append(self.first_keyword[sub_id] + keyword_index)
+        self.hit_offsets.append(offset)
+
+    def entry(self, sub_id: int, keyword_index: int) -> Dict[str, str]:
+        # The categorize_review dict of a hit; one shared dict per (subcategory, keyword), so treat it as read-only
+        key = (sub_id, keyword_index)
+        found = self._entries.get(key)
+        if found is None:
+            cat, sub = self.subs[sub_id]
+            found = self._entries[key] = {'main_category': cat, 'subcategory': sub, 'keyword_matched': self.keywords[self.first_keyword[sub_id] + keyword_index]}
+        return found
+
+    def category_names(self) -> List[str]:
+        return list(dict.fromkeys(cat for cat, _ in self.subs))
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        # {category: {subcategory: hits}} in table order, subcategories without hits included
+        per_sub = Counter(self.hit_subs)
+        counts: Dict[str, Dict[str, int]] = {}
+        for i, (cat, sub) in enumerate(self.subs):
+            counts.setdefault(cat, {})[sub] = per_sub[i]
+        return counts
+
+    def category_counts(self) -> Dict[str, int]:
+        return {cat: sum(subs.values()) for cat, subs in self.counts().items()}
+
+    def hits(self, category: str, subcategory: str) -> List[Tuple[int, str, int]]:
+        # Drill-down: (review id, keyword, offset) of every hit of a subcategory, in review order
+        sub_id = self.sub_ids[(category, subcategory)]
+        selected = itertools.compress(zip(self.hit_reviews, self.hit_keywords, self.hit_offsets), map(sub_id.__eq__, self.hit_subs))
+        return [(review_id, self.keywords[keyword_id], offset) for review_id, keyword_id, offset in selected]
+
+    def review_ids(self, category: str, subcategory: str) -> List[int]:
+        return [review_id for review_id, _, _ in self.hits(category, subcategory)]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate and template review detection with MinHash and LSH.
+
+A review is shingled into its consecutive word pairs and summarised by a
+MinHash signature. One hash per shingle is enough (one-permutation hashing,
+Li et al. 2012): its low bits pick one of NUM_PERM bins and the rest is a
+value, and each bin keeps its least value. A bin no shingle fell into copies
+the first filled bin of a fixed random probe order (Shrivastava's optimal
+densification), the same order for every review. Two signatures agree in
+about as many places as the reviews' Jaccard similarity. Signatures are cut
+into BANDS bands; reviews that agree on a whole band land in the same bucket
+and become candidates, so similar reviews meet without comparing every pair.
+Candidates are confirmed by their estimated similarity and joined into
+clusters. Buckets are built one band at a time and signatures are packed, so
+memory is a few hundred bytes a review.
+
+Short reviews ("good app") repeat without anyone copying them; reviews of
+fewer than MIN_WORDS words are never grouped.
+"""
+
+import re
+import zlib
+from array import array
+from random import Random
+from typing import Iterable, List, Optional
+
+
+NUM_PERM = 64  # signature bins; a power of two
+BANDS = 16  # of NUM_PERM // BANDS rows: pairs above ~0.55 similarity are likely to share a band
+SIMILARITY = 0.7  # estimated Jaccard similarity of word pairs that makes two reviews near-duplicates
+MIN_WORDS = 8
+MINHASH_SEED = 20240501
+
+WORD_RE = re.compile(r"\w+")
+_MASK32 = 0xFFFFFFFF
+_BIN_BITS = NUM_PERM.bit_length() - 1
+_EMPTY = _MASK32 >> _BIN_BITS  # above every value
+_ROWS = NUM_PERM // BANDS
+
+
+def _probe_orders() -> List[List[int]]:
+    rng = Random(MINHASH_SEED)
+    orders = []
+    for i in range(NUM_PERM):
+        others = [j for j in range(NUM_PERM) if j != i]
+        rng.shuffle(others)
+        orders.append(others)
+    return orders
+
+
+_PROBES = _probe_orders()
+
+
+def _shingle_hash(shingle: str) -> int:
+    # crc32 is cheap but linear, so its bits are mixed (murmur3's finalizer) before minhashing
+    h = zlib.crc32(shingle.encode("utf-8"))
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & _MASK32
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & _MASK32
+    return h ^ (h >> 16)
+
+
+def minhash_signature(text: str) -> Optional[array]:
+    # NUM_PERM 32-bit minimums, or None for a review too short to group
+    words = WORD_RE.findall(text.casefold())
+    if len(words) < MIN_WORDS:
+        return None
+    bins = [_EMPTY + 1] * NUM_PERM
+    for a, b in zip(words, words[1:]):
+        h = _shingle_hash(f"{a} {b}")
+        i, value = h & (NUM_PERM - 1), h >> _BIN_BITS
+        if value < bins[i]:
+            bins[i] = value
+    filled = list(bins)
+    for i, value in enumerate(filled):
+        if value > _EMPTY:
+            bins[i] = next(filled[j] for j in _PROBES[i] if filled[j] <= _EMPTY)
+    return array("I", bins)
+
+
+def estimated_similarity(x: array, y: array) -> float:
+    return sum(1 for a, b in zip(x, y) if a == b) / NUM_PERM
+
+
+def _find(parent: List[int], i: int) -> int:
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        parent[i], i = root, parent[i]
+    return root
+
+
+def near_duplicate_clusters(texts: Iterable[str]) -> List[int]:
+    # A cluster id per text: the position of the cluster's first text, so a text that
+    # has no near-duplicate is its own cluster
+    signatures = array("I")
+    signed: List[int] = []  # positions with a signature, in order
+    n = 0
+    for n, text in enumerate(texts, 1):
+        signature = minhash_signature(text or "")
+        if signature is not None:
+            signatures.extend(signature)
+            signed.append(n - 1)
+    parent = list(range(n))
+    packed = signatures.tobytes()
+    width = signatures.itemsize
+    for band in range(BANDS):
+        buckets = {}
+        lo, hi = band * _ROWS * width, (band + 1) * _ROWS * width
+        for k, i in enumerate(signed):
+            base = k * NUM_PERM * width
+            first = buckets.setdefault(packed[base + lo:base + hi], k)
+            if first == k:
+                continue
+            a, b = _find(parent, signed[first]), _find(parent, i)
+            if a == b:
+                continue
+            if estimated_similarity(signatures[first * NUM_PERM:(first + 1) * NUM_PERM], signatures[k * NUM_PERM:(k + 1) * NUM_PERM]) >= SIMILARITY:
+                # The smaller position is the root, so it names the cluster
+                parent[max(a, b)] = min(a, b)
+    return [_find(parent, i) for i in range(n)]
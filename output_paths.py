@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Where the analysis scripts write their outputs and caches.
+
+Kept apart from analyze_reviews so that modules it imports, such as
+taxonomy_store, can place their caches beside review_cache's tables.
+"""
+
+import os
+
+
+OUTPUT_DIR = "/workspace/analysis_output"
+CACHE_DIR = os.path.join(OUTPUT_DIR, "cache")  # review tables (review_cache), compiled matchers, classifiers
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Runs a compiled matcher over many reviews in worker processes.
+
+Reviews are sent to the pool in chunks; every worker receives the compiled
+matcher once, when it starts, so a task carries only texts and results.
+Results come back in input order. A bounded number of chunks is in flight,
+so the input can be a stream (the parser) that keeps producing while the
+workers match, and memory does not grow with the corpus. Input shorter than
+one chunk, or a single worker, is matched in this process.
+"""
+
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+
+CHUNK_SIZE = 1000  # reviews per task
+CHUNKS_IN_FLIGHT_PER_WORKER = 4
+
+T = TypeVar("T")
+
+_worker_match: Optional[Callable[[str], Any]] = None
+
+
+def _start_worker(matcher: Any, method: str) -> None:
+    global _worker_match
+    _worker_match = getattr(matcher, method)
+
+
+def _match_chunk(texts: List[str]) -> List[Any]:
+    return [_worker_match(text) for text in texts]
+
+
+def iter_matches(items: Iterable[T], matcher: Any, method: str, workers: Optional[int] = None, text: Optional[Callable[[T], str]] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[T, Any]]:
+    # (item, getattr(matcher, method)(text(item))) for every item, in order; `text` defaults
+    # to the item itself, and workers=None uses every core
+    workers = workers or os.cpu_count() or 1
+    text = text or (lambda item: item)
+    items = iter(items)
+    first = list(itertools.islice(items, chunk_size))
+    if workers <= 1 or len(first) < chunk_size:
+        match = getattr(matcher, method)
+        for item in itertools.chain(first, items):
+            yield item, match(text(item))
+        return
+    chunks = itertools.chain([first], iter(lambda: list(itertools.islice(items, chunk_size)), []))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker, initargs=(matcher, method)) as pool:
+        in_flight = deque()
+        for chunk in itertools.islice(chunks, workers * CHUNKS_IN_FLIGHT_PER_WORKER):
+            in_flight.append((chunk, pool.submit(_match_chunk, [text(item) for item in chunk])))
+        while in_flight:
+            chunk, submitted = in_flight.popleft()
+            results = submitted.result()
+            for next_chunk in itertools.islice(chunks, 1):
+                in_flight.append((next_chunk, pool.submit(_match_chunk, [text(item) for item in next_chunk])))
+            yield from zip(chunk, results)
+
+
+def match_all(texts: Iterable[str], matcher: Any, method: str, workers: Optional[int] = None) -> List[Any]:
+    # getattr(matcher, method)(text) for every text, in order
+    return [result for _, result in iter_matches(texts, matcher, method, workers)]
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Apply a taxonomy edit to existing outputs without re-categorizing everything.
+
+The taxonomy the outputs were built with is saved next to them. Diffing it
+against the current one gives the subcategories whose keywords changed; the
+token index over the review texts gives the only rows those keywords can
+match, since keywords match from word starts. Only those rows are matched
+again. Rows whose labels change are rewritten in parsed_reviews.csv, and the
+daily and weekly counts in trends.json and the checkpoint are moved from the
+old labels to the new. Every other row is copied byte for byte.
+
+Keywords in other languages match the review as written, which the CSV keeps
+beside any translation. The token index only covers review_text, so an edit
+to another language's keywords re-matches its subcategories on every row.
+"""
+
+import array
+import json
+import mmap
+import os
+import sys
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from analyze_reviews import (
+    APPLIED_TAXONOMY_FILE, CHECKPOINT_FILE, OUTPUT_DIR, PARSED_REVIEWS_HEADER, REVIEW_INDEX_FILE,
+    LanguageTaxonomies, build_language_taxonomies, build_taxonomy, load_applied_taxonomy, save_applied_taxonomy, taxonomy_hash, write_summary,
+)
+from review_index import TOKEN_RE, TokenIndex, encode_csv_row, file_stamp, parse_csv_row
+from keyword_automaton import LanguageMatcher
+from taxonomy_store import KIND_KEYWORDS, compiled_matcher
+
+
+Taxonomy = Dict[str, Dict[str, List[str]]]
+
+DAY_COL = PARSED_REVIEWS_HEADER.index("day_index")
+WEEK_COL = PARSED_REVIEWS_HEADER.index("week_bucket")
+CATEGORIES_COL = PARSED_REVIEWS_HEADER.index("categories")
+SUBCATEGORIES_COL = PARSED_REVIEWS_HEADER.index("subcategories")
+TEXT_COL = PARSED_REVIEWS_HEADER.index("review_text")
+LANGUAGE_COL = PARSED_REVIEWS_HEADER.index("language")
+ORIGINAL_TEXT_COL = PARSED_REVIEWS_HEADER.index("original_text")
+
+
+def _keyword_set(keywords: List[str]) -> Set[str]:
+    # As KeywordAutomaton sees them
+    return {k.lower().strip() for k in keywords} - {""}
+
+
+def changed_subcategories(old: Taxonomy, new: Taxonomy) -> Optional[Set[Tuple[str, str]]]:
+    # (category, subcategory) pairs added, removed or with different keywords; None when the
+    # pairs both taxonomies share were reordered, which reorders the labels of every review
+    old_pairs = [(cat, sub) for cat, subs in old.items() for sub in subs]
+    new_pairs = [(cat, sub) for cat, subs in new.items() for sub in subs]
+    old_set, new_set = set(old_pairs), set(new_pairs)
+    if [p for p in old_pairs if p in new_set] != [p for p in new_pairs if p in old_set]:
+        return None
+    changed = old_set ^ new_set
+    for cat, sub in old_set & new_set:
+        if _keyword_set(old[cat][sub]) != _keyword_set(new[cat][sub]):
+            changed.add((cat, sub))
+    return changed
+
+
+def changed_language_subcategories(old: LanguageTaxonomies, new: LanguageTaxonomies) -> Set[Tuple[str, str]]:
+    # (category, subcategory) pairs whose keywords changed in some other language
+    changed: Set[Tuple[str, str]] = set()
+    for language in old.keys() | new.keys():
+        old_block, new_block = old.get(language, {}), new.get(language, {})
+        for cat in old_block.keys() | new_block.keys():
+            for sub in old_block.get(cat, {}).keys() | new_block.get(cat, {}).keys():
+                if _keyword_set(old_block.get(cat, {}).get(sub, [])) != _keyword_set(new_block.get(cat, {}).get(sub, [])):
+                    changed.add((cat, sub))
+    return changed
+
+
+def keyword_rows(index: TokenIndex, keyword: str) -> Set[int]:
+    # Rows a keyword can match from a word start: every word but the last is followed by a
+    # non-word character in the keyword, so it must be a whole word of the text; the last
+    # may be a word prefix. A keyword starting with a non-word character never matches.
+    words = TOKEN_RE.findall(keyword)
+    if not words or not keyword.startswith(words[0]):
+        return set()
+    rows = index.rows_with_prefix(words[-1])
+    for word in words[:-1]:
+        if not rows:
+            break
+        rows &= index.rows_with_token(word)
+    return rows
+
+
+def candidate_rows(index: TokenIndex, keywords: Set[str]) -> Set[int]:
+    rows: Set[int] = set()
+    for keyword in keywords:
+        rows |= keyword_rows(index, keyword)
+    return rows
+
+
+class PartialMatcher:
+    """Re-labels a review for a taxonomy edit by matching only the changed subcategories, in
+    English and in the review's language. Hits of the unchanged ones are read back from the
+    review's stored labels."""
+
+    def __init__(self, taxonomy: Taxonomy, changed: Set[Tuple[str, str]], languages: Optional[LanguageTaxonomies] = None) -> None:
+        self.order = {pair: i for i, pair in enumerate((cat, sub) for cat, subs in taxonomy.items() for sub in subs)}
+        self.changed = changed
+        self.pairs_by_sub: Dict[str, Tuple[str, str]] = {}
+        for cat, sub in self.order:
+            self.pairs_by_sub[sub] = (cat, sub)
+        subset: Taxonomy = {}
+        for cat, sub in self.order:
+            if (cat, sub) in changed:
+                subset.setdefault(cat, {})[sub] = taxonomy[cat][sub]
+        language_subsets: LanguageTaxonomies = {}
+        for language, block in (languages or {}).items():
+            for cat, subs in block.items():
+                for sub, kws in subs.items():
+                    if sub in subset.get(cat, {}):
+                        language_subsets.setdefault(language, {}).setdefault(cat, {})[sub] = kws
+        self.matcher = LanguageMatcher(subset, language_subsets)
+
+    @staticmethod
+    def usable(old: Taxonomy, new: Taxonomy) -> bool:
+        # Stored labels map back to subcategories only while no name is shared between categories
+        return all(len({sub for subs in t.values() for sub in subs}) == sum(len(subs) for subs in t.values()) for t in (old, new))
+
+    def categorize(self, text: str, language: Optional[str], original_text: Optional[str], old_subcategories: List[str]) -> Tuple[List[str], List[str]]:
+        hits = {self.pairs_by_sub[sub] for sub in old_subcategories if sub in self.pairs_by_sub}
+        hits -= self.changed
+        for i in self.matcher.hit_ids(text, language, original_text):
+            hits.add(self.matcher.subs[i])
+        categories: List[str] = []
+        subcategories: List[str] = []
+        for cat, sub in sorted(hits, key=self.order.__getitem__):
+            if cat not in categories:
+                categories.append(cat)
+            subcategories.append(sub)
+        return categories, subcategories
+
+
+def _labels(value: str) -> List[str]:
+    return value.split(";") if value else []
+
+
+def _shift(trends: Dict, day: str, week: str, categories: List[str], subcategories: List[str], delta: int) -> None:
+    # Adds `delta` to every count of the labels; counts that reach zero are dropped, as compute_trends never writes them
+    for key, bucket, labels in (("by_day_cat", day, categories), ("by_week_cat", week, categories), ("by_day_sub", day, subcategories), ("by_week_sub", week, subcategories)):
+        counts = trends[key].setdefault(bucket, {})
+        for label in labels:
+            n = counts.get(label, 0) + delta
+            if n:
+                counts[label] = n
+            else:
+                counts.pop(label, None)
+        if not counts:
+            del trends[key][bucket]
+
+
+def _sort_counts(trends: Dict) -> None:
+    # Buckets ascending and labels by name, as CountMatrix.to_nested writes them; _shift appends
+    # the buckets and labels it adds
+    for key in ("by_day_cat", "by_week_cat", "by_day_sub", "by_week_sub"):
+        trends[key] = {bucket: dict(sorted(counts.items())) for bucket, counts in sorted(trends[key].items(), key=lambda item: int(item[0]))}
+
+
+def recategorize_outputs(taxonomy: Taxonomy, languages: Optional[LanguageTaxonomies] = None) -> Optional[Dict[str, int]]:
+    # Brings parsed_reviews.csv, trends.json, report.md and the checkpoint up to `taxonomy`.
+    # None when there are no complete outputs to update, or they cannot be updated in place,
+    # and only a full run will do.
+    parsed_csv = os.path.join(OUTPUT_DIR, "parsed_reviews.csv")
+    trends_json = os.path.join(OUTPUT_DIR, "trends.json")
+    applied = load_applied_taxonomy()
+    if applied is None or not os.path.exists(parsed_csv):
+        return None
+    with open(parsed_csv, "rb") as f:
+        if f.readline() != encode_csv_row(PARSED_REVIEWS_HEADER):
+            # Written before the CSV had its current columns
+            return None
+    languages = languages or {}
+    new_hash = taxonomy_hash(taxonomy, languages)
+    stats = {"changed_subcategories": 0, "candidates": 0, "updated": 0}
+    if applied["taxonomy_hash"] == new_hash:
+        return stats
+    try:
+        with open(trends_json, "r", encoding="utf-8") as f:
+            trends = json.load(f)
+    except (OSError, ValueError):
+        return None
+    try:
+        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+            ckpt = json.load(f)
+        if ckpt.get("taxonomy") != applied["taxonomy_hash"]:
+            ckpt = None
+    except (OSError, ValueError):
+        ckpt = None
+
+    # A new matcher version changes what every keyword matches
+    changed = None
+    language_changed: Set[Tuple[str, str]] = set()
+    applied_languages = applied.get("languages") or {}
+    if taxonomy_hash(applied["taxonomy"], applied_languages) == applied["taxonomy_hash"]:
+        changed = changed_subcategories(applied["taxonomy"], taxonomy)
+    if changed is not None:
+        language_changed = changed_language_subcategories(applied_languages, languages)
+        changed |= language_changed
+    stats["changed_subcategories"] = len(changed) if changed is not None else sum(len(subs) for subs in taxonomy.values())
+    index = TokenIndex.load(REVIEW_INDEX_FILE, file_stamp(parsed_csv))
+    if index is None:
+        index = TokenIndex.from_csv(parsed_csv, "review_text")
+        index.save(REVIEW_INDEX_FILE, file_stamp(parsed_csv))
+    if changed is None or language_changed:
+        # Other languages' keywords match original_text, which the index does not cover
+        candidates: Sequence[int] = range(index.rows)
+    else:
+        keywords: Set[str] = set()
+        for cat, sub in changed:
+            for side in (applied["taxonomy"], taxonomy):
+                keywords |= _keyword_set(side.get(cat, {}).get(sub, []))
+        candidates = sorted(candidate_rows(index, keywords))
+    stats["candidates"] = len(candidates)
+
+    # Until the new labels are everywhere the outputs are not described by any taxonomy;
+    # an interrupted run leaves no snapshot behind, and the next run starts over
+    os.remove(APPLIED_TAXONOMY_FILE)
+    ckpt_offset = ckpt["csv_offset"] if ckpt is not None else -1
+    offsets = index.offsets
+    edits: List[Tuple[int, bytes]] = []  # (row, new bytes), in row order
+    if candidates:
+        if changed is not None and PartialMatcher.usable(applied["taxonomy"], taxonomy):
+            partial = PartialMatcher(taxonomy, changed, languages)
+            relabel = partial.categorize
+        elif languages:
+            matcher = compiled_matcher(KIND_KEYWORDS, taxonomy, languages=languages)
+
+            def relabel(text: str, language: Optional[str], original_text: Optional[str], old_subcategories: List[str]) -> Tuple[List[str], List[str]]:
+                return matcher.categorize(text, language, original_text)
+        else:
+            matcher = compiled_matcher(KIND_KEYWORDS, taxonomy)
+
+            def relabel(text: str, language: Optional[str], original_text: Optional[str], old_subcategories: List[str]) -> Tuple[List[str], List[str]]:
+                return matcher.categorize(text)
+        with open(parsed_csv, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for i in candidates:
+                row = parse_csv_row(data[offsets[i]:offsets[i + 1]])
+                old_categories, old_subcategories = _labels(row[CATEGORIES_COL]), _labels(row[SUBCATEGORIES_COL])
+                categories, subcategories = relabel(row[TEXT_COL], row[LANGUAGE_COL] or None, row[ORIGINAL_TEXT_COL] or None, old_subcategories)
+                if categories == old_categories and subcategories == old_subcategories:
+                    continue
+                day, week = row[DAY_COL], row[WEEK_COL]
+                for counts in [trends] + ([ckpt["trends"]] if offsets[i + 1] <= ckpt_offset else []):
+                    _shift(counts, day, week, old_categories, old_subcategories, -1)
+                    _shift(counts, day, week, categories, subcategories, 1)
+                row[CATEGORIES_COL] = ";".join(categories)
+                row[SUBCATEGORIES_COL] = ";".join(subcategories)
+                edits.append((i, encode_csv_row(row)))
+            stats["updated"] = len(edits)
+            if edits:
+                # Rows in between are copied as they are
+                tmp = f"{parsed_csv}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as dst, memoryview(data) as view:
+                    pos = 0
+                    for i, raw in edits:
+                        dst.write(view[pos:offsets[i]])
+                        dst.write(raw)
+                        pos = offsets[i + 1]
+                    dst.write(view[pos:])
+    if edits:
+        os.replace(tmp, parsed_csv)
+        for counts in [trends] + ([ckpt["trends"]] if ckpt is not None else []):
+            _sort_counts(counts)
+        new_offsets = array.array("Q")
+        shift = prev = 0
+        for i, raw in edits:
+            new_offsets.extend(o + shift for o in offsets[prev:i + 1])
+            shift += len(raw) - (offsets[i + 1] - offsets[i])
+            prev = i + 1
+        new_offsets.extend(o + shift for o in offsets[prev:])
+        if ckpt is not None:
+            j = bisect_left(offsets, ckpt_offset)
+            ckpt["csv_offset"] = new_offsets[j] if j < len(offsets) and offsets[j] == ckpt_offset else None
+        index.offsets = new_offsets
+        index.save(REVIEW_INDEX_FILE, file_stamp(parsed_csv))
+
+    if ckpt is not None and ckpt["csv_offset"] is not None:
+        ckpt["taxonomy"] = new_hash
+        tmp = CHECKPOINT_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(ckpt, f)
+        os.replace(tmp, CHECKPOINT_FILE)
+    elif os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+    write_summary(trends)
+    save_applied_taxonomy(taxonomy, languages)
+    return stats
+
+
+def main() -> None:
+    stats = recategorize_outputs(build_taxonomy(), build_language_taxonomies())
+    if stats is None:
+        print(f"No categorized outputs in {OUTPUT_DIR} that can be updated in place; run analyze_reviews.py", file=sys.stderr)
+        sys.exit(1)
+    print(f"{stats['changed_subcategories']} subcategories changed; re-matched {stats['candidates']} reviews, {stats['updated']} relabelled. Output in {OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
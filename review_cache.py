@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of parsed reviews and theme tables.
+
+Tables live under analysis_output/cache/<key>/, where the key is derived from
+the bytes of the source dump, the parser version and the taxonomy. Each table
+is a small binary file of typed columns (int64, float64 or UTF-8 strings), so
+loading it needs no CSV parsing or type inference. analyze_reviews.py fills
+the cache with the reviews and trends it has just written; a script that
+still misses builds the tables once, and every later script and run reads
+them back.
+"""
+
+import array
+import csv
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+from typing import Callable, Dict, List, Optional, Sequence
+
+from analyze_reviews import PARSED_REVIEWS_HEADER, SOURCE_FILE, Review, build_language_taxonomies, build_taxonomy, categorize_reviews, compute_trends, day_dates, review_from_parsed, review_to_row, taxonomy_hash
+from output_paths import CACHE_DIR
+from review_dedup import FingerprintStore, iter_unique
+from review_parser import PARSER_VERSION, find_base_date, iter_dump
+from taxonomy_store import load_taxonomy
+
+
+SOURCE_DIGESTS_FILE = os.path.join(CACHE_DIR, "sources.json")
+TABLE_MAGIC = b"RVCOLS1\n"
+HASH_CHUNK_BYTES = 1 << 20
+TRENDS_FILE = "trends.json"  # compute_trends' result, beside the reviews table of a key
+INT_COLUMNS = {"day_index", "week_bucket", "line_index", "rating"}  # of parsed_reviews.csv; review_to_row writes ints there
+
+COL_INT = "i8"
+COL_FLOAT = "f8"
+COL_STR = "str"
+
+# Written by analysis_output/run_review_analysis.py, from the themes taxonomy
+THEME_TAXONOMY = "themes"
+THEME_TABLES = ["overall_theme", "overall_subcat", "daily_theme", "daily_subcat", "anomalies", "exploded"]
+
+Table = Dict[str, Sequence]  # column name -> values, in column order
+
+
+def source_digest(path: str) -> str:
+    # SHA-256 of the dump, remembered per (size, mtime) so unchanged files are not re-hashed
+    st = os.stat(path)
+    abspath = os.path.abspath(path)
+    try:
+        with open(SOURCE_DIGESTS_FILE, "r", encoding="utf-8") as f:
+            known = json.load(f)
+    except (OSError, ValueError):
+        known = {}
+    entry = known.get(abspath)
+    if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return entry["sha256"]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            h.update(chunk)
+    known[abspath] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": h.hexdigest()}
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _atomic_write(SOURCE_DIGESTS_FILE, json.dumps(known, indent=2).encode("utf-8"))
+    return h.hexdigest()
+
+
+def cache_key(source: str = SOURCE_FILE) -> str:
+    parts = [source_digest(source), PARSER_VERSION, taxonomy_hash(build_taxonomy(), build_language_taxonomies())]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def theme_key(source: str = SOURCE_FILE) -> str:
+    # Theme tables also go stale when taxonomies/themes.json changes
+    parts = [cache_key(source), load_taxonomy(THEME_TAXONOMY).digest]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def history_key(source: str = SOURCE_FILE) -> str:
+    # theme_key without the dump's contents: Appbot only appends, so what was counted for a day
+    # stays valid while the dump grows. State carried across runs checks its days against the counts
+    parts = [os.path.abspath(source), PARSER_VERSION, taxonomy_hash(build_taxonomy(), build_language_taxonomies()), load_taxonomy(THEME_TAXONOMY).digest]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _column_type(values: Sequence) -> str:
+    # Typed by the Python values present: ints with gaps become floats, as pandas would
+    kinds = {type(v) for v in values if not _is_missing(v)}
+    if kinds <= {int} and not any(_is_missing(v) for v in values):
+        return COL_INT
+    if kinds <= {int, float}:
+        return COL_FLOAT
+    return COL_STR
+
+
+def encode_table(table: Table) -> bytes:
+    rows = len(next(iter(table.values()))) if table else 0
+    columns = []
+    blobs: List[bytes] = []
+    for name, values in table.items():
+        col_type = _column_type(values)
+        col = {"name": name, "type": col_type}
+        if col_type == COL_INT:
+            data = array.array("q", values)
+        elif col_type == COL_FLOAT:
+            data = array.array("d", (float("nan") if _is_missing(v) else v for v in values))
+        else:
+            # Character offsets into one string, so decoding is a single call
+            text = []
+            offsets = array.array("q", [0])
+            mask = bytearray(rows)
+            end = 0
+            for i, v in enumerate(values):
+                if _is_missing(v):
+                    mask[i] = 1
+                else:
+                    s = v if isinstance(v, str) else str(v)
+                    text.append(s)
+                    end += len(s)
+                offsets.append(end)
+            blob = "".join(text).encode("utf-8")
+            if any(mask):
+                col["nulls"] = True
+            col["bytes"] = len(blob)
+            if sys.byteorder != "little":
+                offsets.byteswap()
+            blobs.append(offsets.tobytes())
+            blobs.append(blob)
+            if any(mask):
+                blobs.append(bytes(mask))
+            columns.append(col)
+            continue
+        if sys.byteorder != "little":
+            data.byteswap()
+        blobs.append(data.tobytes())
+        columns.append(col)
+    header = json.dumps({"rows": rows, "columns": columns}).encode("utf-8")
+    return TABLE_MAGIC + struct.pack("<I", len(header)) + header + b"".join(blobs)
+
+
+def decode_table(data: bytes) -> Table:
+    if not data.startswith(TABLE_MAGIC):
+        raise ValueError("not a review cache table")
+    pos = len(TABLE_MAGIC)
+    (header_len,) = struct.unpack_from("<I", data, pos)
+    pos += 4
+    header = json.loads(data[pos:pos + header_len])
+    pos += header_len
+    rows = header["rows"]
+    table: Table = {}
+    for col in header["columns"]:
+        if col["type"] in (COL_INT, COL_FLOAT):
+            values = array.array("q" if col["type"] == COL_INT else "d")
+            values.frombytes(data[pos:pos + 8 * rows])
+            pos += 8 * rows
+            if sys.byteorder != "little":
+                values.byteswap()
+            table[col["name"]] = values
+            continue
+        offsets = array.array("q")
+        offsets.frombytes(data[pos:pos + 8 * (rows + 1)])
+        pos += 8 * (rows + 1)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        text = data[pos:pos + col["bytes"]].decode("utf-8")
+        pos += col["bytes"]
+        strings: List[Optional[str]] = [text[a:b] for a, b in zip(offsets, offsets[1:])]
+        if col.get("nulls"):
+            for i, null in enumerate(data[pos:pos + rows]):
+                if null:
+                    strings[i] = None
+            pos += rows
+        table[col["name"]] = strings
+    return table
+
+
+def read_tables(key: str, names: List[str]) -> Optional[Dict[str, Table]]:
+    # All of `names` under `key`, or None if any is missing
+    tables: Dict[str, Table] = {}
+    for name in names:
+        try:
+            with open(os.path.join(CACHE_DIR, key, f"{name}.bin"), "rb") as f:
+                tables[name] = decode_table(f.read())
+        except (OSError, ValueError):
+            return None
+    return tables
+
+
+def write_tables(key: str, tables: Dict[str, Table]) -> None:
+    os.makedirs(os.path.join(CACHE_DIR, key), exist_ok=True)
+    for name, table in tables.items():
+        _atomic_write(os.path.join(CACHE_DIR, key, f"{name}.bin"), encode_table(table))
+
+
+def load_or_build(key: str, names: List[str], build: Callable[[], Dict[str, Table]]) -> Dict[str, Table]:
+    tables = read_tables(key, names)
+    if tables is None:
+        tables = build()
+        write_tables(key, tables)
+    return tables
+
+
+def _build_reviews(source: str) -> Dict[str, Table]:
+    # Same pipeline and columns as parsed_reviews.csv; blanks are stored as missing, as read_csv reads them
+    columns: Dict[str, List] = {name: [] for name in PARSED_REVIEWS_HEADER}
+    targets = [columns[name] for name in PARSED_REVIEWS_HEADER]
+
+    def add(r: Review) -> None:
+        for target, value in zip(targets, review_to_row(r)):
+            target.append(None if value == "" else value)
+
+    # Repeats within the dump are dropped as analyze_reviews drops them, so either fill gives one table per key
+    with tempfile.TemporaryDirectory() as scratch, FingerprintStore(scratch) as store:
+        reviews = map(review_from_parsed, iter_unique(iter_dump(source), store, source))
+        trends = compute_trends(categorize_reviews(reviews, build_taxonomy(), languages=build_language_taxonomies()), on_review=add)
+    trends["day_dates"] = day_dates(trends["day_totals"], find_base_date(source))
+    write_trends(cache_key(source), trends)
+    return {"reviews": columns}
+
+
+def store_outputs(source: str, parsed_csv: str, trends: Dict) -> None:
+    # Called by analyze_reviews.py once it has written parsed_reviews.csv and trends.json for
+    # `source`, so no reporting script parses the dump again
+    key = cache_key(source)
+    if read_tables(key, ["reviews"]) is not None and read_trends(key) is not None:
+        return
+    with open(parsed_csv, "r", encoding="utf-8", newline="") as f:
+        rows = csv.reader(f)
+        header = next(rows)
+        if header != PARSED_REVIEWS_HEADER:
+            raise ValueError(f"{parsed_csv}: expected the columns {PARSED_REVIEWS_HEADER}, got {header}")
+        columns: Dict[str, List] = {name: [] for name in header}
+        targets = [(columns[name], name in INT_COLUMNS) for name in header]
+        for row in rows:
+            for (target, is_int), value in zip(targets, row):
+                target.append(None if value == "" else int(value) if is_int else value)
+    write_tables(key, {"reviews": columns})
+    write_trends(key, trends)
+
+
+def write_trends(key: str, trends: Dict) -> None:
+    os.makedirs(os.path.join(CACHE_DIR, key), exist_ok=True)
+    _atomic_write(os.path.join(CACHE_DIR, key, TRENDS_FILE), json.dumps(trends).encode("utf-8"))
+
+
+def read_trends(key: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(CACHE_DIR, key, TRENDS_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def reviews_table(source: str = SOURCE_FILE) -> Table:
+    key = cache_key(source)
+    return load_or_build(key, ["reviews"], lambda: _build_reviews(source))["reviews"]
+
+
+def load_trends(source: str = SOURCE_FILE) -> Dict:
+    # As trends.json; a miss parses the dump once, caching its reviews table too
+    key = cache_key(source)
+    cached = read_trends(key)
+    if cached is None:
+        write_tables(key, _build_reviews(source))
+        cached = read_trends(key)
+    return cached
+
+
+def theme_tables(source: str = SOURCE_FILE) -> Dict[str, Table]:
+    # Built by run_review_analysis on a miss, which stores them under the same key
+    key = theme_key(source)
+    tables = read_tables(key, THEME_TABLES)
+    if tables is None:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_output"))
+        from run_review_analysis import load_results
+        load_results(source)
+        tables = read_tables(key, THEME_TABLES)
+        if tables is None:
+            raise OSError(f"theme tables of {source} could not be read back from {os.path.join(CACHE_DIR, key)} after building them")
+    return tables
+
+
+def table_rows(table: Table) -> List[Dict]:
+    names = list(table)
+    return [dict(zip(names, row)) for row in zip(*table.values())]
+
+
+def to_frame(table: Table):
+    # pandas is only needed by the scripts that ask for a DataFrame
+    import numpy as np
+    import pandas as pd
+    return pd.DataFrame({name: np.asarray(values) if isinstance(values, array.array) else values for name, values in table.items()})
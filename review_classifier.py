@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+A naive-Bayes review classifier bootstrapped from the keyword matchers.
+
+The keyword taxonomies label the corpus; the classifier learns from those
+labels which other terms come with each subcategory, so it can label
+paraphrases no keyword covers. Every subcategory is its own binary
+multinomial naive-Bayes model over hashed word unigrams and bigrams (words as
+text_clusters reads them), with a term counted once per review, which suits
+short texts. All models share one weight matrix, features x subcategories,
+so a batch of reviews is scored against every subcategory with one sparse
+matrix product, and each score is a log-odds turned into a confidence.
+
+    review_classifier.py [TAXONOMY] [DUMP]
+
+trains on a dump, saves the model under CLASSIFIER_DIR and reports what the
+classifier finds beyond the keywords.
+"""
+
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Callable, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from output_paths import CACHE_DIR
+from review_parser import iter_dump
+from taxonomy_store import Taxonomy, load_taxonomy
+from text_clusters import BATCH_SIZE, STOP_WORDS, WORD_RE, term_feature
+
+
+SOURCE_FILE = "/workspace/App reviews dump - Sheet1.csv"
+CLASSIFIER_DIR = os.path.join(CACHE_DIR, "classifiers")
+CLASSIFIER_FEATURES = 1 << 16  # hashed features folded down to this many weights per subcategory
+REFERENCE_TERMS = 32  # distinct terms past which a review's evidence stops growing linearly
+SMOOTHING = 10.0  # weight of the all-reviews term distribution each label's distribution is smoothed toward
+CONFIDENCE = 0.9  # least confidence for classify() to report a subcategory
+EXAMPLES = 2  # reviews quoted per subcategory in the report
+
+Label = Tuple[str, str]  # (category, subcategory)
+_BIGRAM_MIX = 0x9E3779B1  # odd multiplier that spreads a bigram's first word over the feature bits
+
+
+class _WordFeatures(dict):
+    # word -> term_feature(word), or -1 for a stop word
+    def __missing__(self, word: str) -> int:
+        feature = -1 if word in STOP_WORDS else term_feature(word)
+        self[word] = feature
+        return feature
+
+
+def keyword_labels(matcher, text: str) -> Set[int]:
+    # Positions in matcher.subs of the subcategories any of the keyword matchers finds
+    return matcher.hit_ids(text)
+
+
+class NaiveBayesClassifier:
+    """One binary naive-Bayes model per label, trained a batch at a time with partial_fit and
+    made ready for scoring by finish()."""
+
+    def __init__(self, labels: Sequence[Label]) -> None:
+        self.labels: List[Label] = list(labels)
+        self.words = _WordFeatures()
+        self.term_counts = np.zeros((len(self.labels), CLASSIFIER_FEATURES), dtype=np.float64)  # term weight in reviews with the label
+        self.review_counts = np.zeros(CLASSIFIER_FEATURES, dtype=np.float64)  # term weight in all reviews
+        self.label_reviews = np.zeros(len(self.labels), dtype=np.int64)
+        self.reviews = 0
+        self.weights: Optional[np.ndarray] = None  # (CLASSIFIER_FEATURES, labels) log-likelihood ratios
+        self.bias: Optional[np.ndarray] = None  # (labels,) prior log-odds
+
+    def _features(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # (position, feature) of every distinct folded feature of every text, by position, and each
+        # text's weight: 1 up to REFERENCE_TERMS features, shrinking as 1 / sqrt(features) past that, so
+        # a long review does not pile up evidence for every label (Rennie et al., "Tackling the poor
+        # assumptions of naive Bayes text classifiers"). Words are looked up per text; bigrams of
+        # adjacent non-stop words are hashed for the whole batch.
+        lookup = self.words.__getitem__
+        word_features: List[int] = []
+        lengths: List[int] = []
+        for text in texts:
+            found = list(map(lookup, WORD_RE.findall(text.lower())))
+            word_features.extend(found)
+            lengths.append(len(found))
+        words = np.array(word_features, dtype=np.int64)
+        positions = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        content = words >= 0
+        pairs = content[:-1] & content[1:] & (positions[:-1] == positions[1:])
+        bigrams = (words[:-1][pairs] * _BIGRAM_MIX + words[1:][pairs]) & 0xFFFFFFFF
+        positions = np.concatenate([positions[content], positions[:-1][pairs]])
+        features = np.concatenate([words[content], bigrams]) & (CLASSIFIER_FEATURES - 1)
+        keys = np.unique(positions * CLASSIFIER_FEATURES + features)
+        positions = keys // CLASSIFIER_FEATURES
+        lengths = np.maximum(np.bincount(positions, minlength=len(texts)), 1)
+        return positions, keys % CLASSIFIER_FEATURES, np.minimum(1, np.sqrt(REFERENCE_TERMS / lengths)).astype(np.float32)
+
+    def partial_fit(self, texts: List[str], labels: List[Iterable[int]]) -> None:
+        # labels[i]: positions in self.labels of the labels of texts[i]
+        positions, features, scale = self._features(texts)
+        values = scale[positions]
+        has = np.zeros((len(texts), len(self.labels)), dtype=bool)
+        for i, found in enumerate(labels):
+            has[i, list(found)] = True
+        self.review_counts += np.bincount(features, values, minlength=CLASSIFIER_FEATURES)
+        for j in np.flatnonzero(has.any(axis=0)).tolist():
+            rows = has[positions, j]
+            self.term_counts[j] += np.bincount(features[rows], values[rows], minlength=CLASSIFIER_FEATURES)
+        self.label_reviews += has.sum(axis=0)
+        self.reviews += len(texts)
+
+    def finish(self) -> None:
+        # Per label, the term distributions of the reviews with it and of those without it, each
+        # smoothed toward the distribution over all reviews (a Dirichlet prior of SMOOTHING terms'
+        # weight). A term a label has never seen then counts a little against it, however rare the
+        # term, rather than for every label whose reviews are few. Unseen features weigh nothing.
+        seen = np.flatnonzero(self.review_counts)
+        background = self.review_counts[seen] / self.review_counts[seen].sum()
+        with_label = self.term_counts[:, seen]
+        without_label = self.review_counts[seen] - with_label
+        log_with = np.log((with_label + SMOOTHING * background) / (with_label.sum(axis=1, keepdims=True) + SMOOTHING))
+        log_without = np.log((without_label + SMOOTHING * background) / (without_label.sum(axis=1, keepdims=True) + SMOOTHING))
+        self.weights = np.zeros((CLASSIFIER_FEATURES, len(self.labels)), dtype=np.float32)
+        self.weights[seen] = (log_with - log_without).T
+        self.bias = np.log((self.label_reviews + 1) / (self.reviews - self.label_reviews + 1)).astype(np.float32)
+
+    def log_odds(self, texts: List[str]) -> np.ndarray:
+        # (texts, labels): each row is the review's term vector times the weight matrix, plus the priors
+        scores = np.tile(self.bias, (len(texts), 1))
+        positions, features, scale = self._features(texts)
+        if len(positions):
+            kept, starts = np.unique(positions, return_index=True)
+            scores[kept] += np.add.reduceat(self.weights[features], starts, axis=0) * scale[kept, None]
+        return scores
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        # (texts, labels) confidences in [0, 1]
+        return 1 / (1 + np.exp(-np.clip(self.log_odds(texts), -50, 50)))
+
+    def classify(self, texts: List[str], threshold: float = CONFIDENCE) -> List[List[Tuple[str, str, float]]]:
+        # (category, subcategory, confidence) of every label at or above `threshold`, per text, in label order
+        found: List[List[Tuple[str, str, float]]] = []
+        for start in range(0, len(texts), BATCH_SIZE):
+            proba = self.predict_proba(texts[start:start + BATCH_SIZE])
+            batch = [[] for _ in range(len(proba))]
+            rows, cols = np.nonzero(proba >= threshold)
+            for i, j, confidence in zip(rows.tolist(), cols.tolist(), proba[rows, cols].tolist()):
+                batch[i].append(self.labels[j] + (confidence,))
+            found.extend(batch)
+        return found
+
+    def save(self, path: str, digest: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, weights=self.weights, bias=self.bias, labels=np.array(json.dumps(self.labels, ensure_ascii=False)), digest=np.array(digest))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, digest: str) -> Optional["NaiveBayesClassifier"]:
+        # None unless a model trained on the taxonomy with this digest is saved at `path`
+        try:
+            with np.load(path) as saved:
+                if str(saved["digest"]) != digest:
+                    return None
+                model = cls([tuple(label) for label in json.loads(str(saved["labels"]))])
+                model.weights, model.bias = saved["weights"], saved["bias"]
+        except (OSError, KeyError, ValueError):
+            return None
+        return model
+
+
+def classifier_path(taxonomy: Taxonomy) -> str:
+    return os.path.join(CLASSIFIER_DIR, f"{taxonomy.name}.npz")
+
+
+def _batches(source: Iterable[str]) -> Iterable[List[str]]:
+    batch: List[str] = []
+    for text in source:
+        batch.append(text)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def train_classifier(taxonomy: Taxonomy, texts: Iterable[str]) -> NaiveBayesClassifier:
+    # Trained on the labels the taxonomy's keyword matcher gives `texts`
+    matcher = taxonomy.matcher()
+    model = NaiveBayesClassifier(matcher.subs)
+    for batch in _batches(texts):
+        model.partial_fit(batch, [keyword_labels(matcher, text) for text in batch])
+    model.finish()
+    return model
+
+
+def load_classifier(taxonomy: Taxonomy, texts: Callable[[], Iterable[str]]) -> NaiveBayesClassifier:
+    # The saved model for the taxonomy, or one trained on texts() and saved
+    path = classifier_path(taxonomy)
+    model = NaiveBayesClassifier.load(path, taxonomy.digest)
+    if model is None:
+        model = train_classifier(taxonomy, texts())
+        model.save(path, taxonomy.digest)
+    return model
+
+
+def main() -> None:
+    taxonomy = load_taxonomy(sys.argv[1] if len(sys.argv) > 1 else "reviews")
+    path = sys.argv[2] if len(sys.argv) > 2 else SOURCE_FILE
+    texts = [r.review_text.strip('"') for r in iter_dump(path) if r.review_text.strip('"')]
+    t0 = time.perf_counter()
+    model = train_classifier(taxonomy, texts)
+    model.save(classifier_path(taxonomy), taxonomy.digest)
+    print(f"Trained on {len(texts):,} reviews in {time.perf_counter() - t0:.2f}s; model in {classifier_path(taxonomy)}")
+
+    matcher = taxonomy.matcher()
+    t0 = time.perf_counter()
+    keyword_found = [keyword_labels(matcher, text) for text in texts]
+    t_keywords = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    classified = model.classify(texts)
+    t_model = time.perf_counter() - t0
+    print(f"Keyword matcher: {len(texts) / t_keywords:,.0f} reviews/s; classifier: {len(texts) / t_model:,.0f} reviews/s")
+
+    # Labels the classifier gives beyond the keywords, most confident first
+    index = {label: j for j, label in enumerate(model.labels)}
+    added = Counter()
+    examples = {}
+    for text, keywords, found in zip(texts, keyword_found, classified):
+        for cat, sub, confidence in found:
+            j = index[(cat, sub)]
+            if j not in keywords:
+                added[j] += 1
+                examples.setdefault(j, []).append((confidence, text))
+    agreed = sum(len({index[(cat, sub)] for cat, sub, _ in found} & keywords) for keywords, found in zip(keyword_found, classified))
+    print(f"Classifier at confidence >= {CONFIDENCE}: {agreed:,} of {sum(map(len, keyword_found)):,} keyword labels, {sum(added.values()):,} labels beyond them")
+    for j, n in added.most_common():
+        cat, sub = model.labels[j]
+        print(f"\n{cat} > {sub}: {n} more reviews ({model.label_reviews[j]} by keywords)")
+        for confidence, text in sorted(examples[j], reverse=True)[:EXAMPLES]:
+            text = " ".join(text.split())
+            print(f"  [{confidence:.2f}] {text[:160]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Exactly-once review ingestion across overlapping exports.
+
+Each review is fingerprinted by its normalized reviewer, star rating, text and
+posting time rounded to an hour. Fingerprints are kept in an on-disk SQLite
+table together with the (source, line_index) that first ingested them; a Bloom
+filter in front of the table answers most lookups for new reviews without
+touching disk, so neither review texts nor the full fingerprint set are held
+in memory.
+"""
+
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import struct
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from review_parser import ParsedReview
+
+
+DEDUP_CAPACITY = 1_000_000  # fingerprints the Bloom filter is first sized for; it is rebuilt larger when full
+DEDUP_ERROR_RATE = 0.01
+DEDUP_TIME_BUCKET_MINUTES = 60
+DEDUP_COMMIT_EVERY = 10_000
+BLOOM_MAGIC = b"RVBLOOM1"
+BLOOM_HEADER = struct.Struct("<QQQQQ")  # capacity, size in bits, hashes, added, table version
+
+# Slack renders emoji as :shortcodes: in one export and drops them in another
+EMOJI_SHORTCODE_RE = re.compile(r":[a-z0-9_+\-]+:")
+NON_WORD_RE = re.compile(r"[\W_]+")
+EPOCH = datetime(1970, 1, 1)
+
+
+def normalize_text(text: Optional[str]) -> str:
+    # Case, punctuation, spacing and emoji differ between exports of the same review
+    return NON_WORD_RE.sub("", EMOJI_SHORTCODE_RE.sub("", (text or "").casefold()))
+
+
+def review_fingerprints(r: ParsedReview) -> List[bytes]:
+    # The review's own time bucket first, then its neighbours, so twins either side of a bucket edge still meet
+    content = f"{normalize_text(r.reviewer)}\0{r.rating}\0{normalize_text(r.review_text)}".encode("utf-8")
+    if r.posted_at is None:
+        # Undated reviews (no Weekly Summary yet) only match other undated reviews
+        return [hashlib.blake2b(content + b"\0-", digest_size=16).digest()]
+    bucket = (r.posted_at - EPOCH) // timedelta(minutes=DEDUP_TIME_BUCKET_MINUTES)
+    return [hashlib.blake2b(content + b"\0%d" % b, digest_size=16).digest() for b in (bucket, bucket - 1, bucket + 1)]
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = DEDUP_ERROR_RATE) -> None:
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.added = 0
+
+    def _positions(self, fp: bytes) -> Iterator[int]:
+        # Double hashing over the two halves of the fingerprint, which is already a uniform hash
+        h1 = int.from_bytes(fp[:8], "little")
+        h2 = int.from_bytes(fp[8:16], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, fp: bytes) -> None:
+        for p in self._positions(fp):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.added += 1
+
+    def __contains__(self, fp: bytes) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(fp))
+
+    def to_bytes(self, version: int) -> bytes:
+        return BLOOM_MAGIC + BLOOM_HEADER.pack(self.capacity, self.size, self.hashes, self.added, version) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Tuple["BloomFilter", int]:
+        if not data.startswith(BLOOM_MAGIC):
+            raise ValueError("not a review Bloom filter")
+        capacity, size, hashes, added, version = BLOOM_HEADER.unpack_from(data, len(BLOOM_MAGIC))
+        bloom = cls.__new__(cls)
+        bloom.capacity, bloom.size, bloom.hashes, bloom.added = capacity, size, hashes, added
+        bloom.bits = bytearray(data[len(BLOOM_MAGIC) + BLOOM_HEADER.size:])
+        if len(bloom.bits) != (size + 7) // 8:
+            raise ValueError("truncated review Bloom filter")
+        return bloom, version
+
+
+class FingerprintStore:
+    """Fingerprints of every review ingested so far, and which source line first brought each one in."""
+
+    def __init__(self, directory: str, capacity: int = DEDUP_CAPACITY) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.bloom_path = os.path.join(directory, "fingerprints.bloom")
+        self.db = sqlite3.connect(os.path.join(directory, "fingerprints.sqlite"))
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS fingerprints (fp BLOB PRIMARY KEY, source TEXT NOT NULL, line_index INTEGER NOT NULL) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS fingerprints_source ON fingerprints (source, line_index);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+            "INSERT OR IGNORE INTO meta VALUES ('version', 0);"
+        )
+        self.db.commit()
+        self.pending = 0
+        self.duplicates = 0
+        self.bloom = self._load_bloom(capacity)
+
+    def __enter__(self) -> "FingerprintStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _version(self) -> int:
+        return self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def _commit(self) -> None:
+        # Every commit bumps the version, so a Bloom filter saved before a crash is known to be stale
+        self.db.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        self.db.commit()
+        self.pending = 0
+
+    def _load_bloom(self, capacity: int) -> BloomFilter:
+        try:
+            with open(self.bloom_path, "rb") as f:
+                bloom, version = BloomFilter.from_bytes(f.read())
+            if version == self._version() and bloom.added <= bloom.capacity:
+                return bloom
+        except (OSError, ValueError, struct.error):
+            pass
+        return self._rebuild_bloom(capacity)
+
+    def _rebuild_bloom(self, capacity: int) -> BloomFilter:
+        rows = self.db.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+        bloom = BloomFilter(max(capacity, 2 * rows))
+        for (fp,) in self.db.execute("SELECT fp FROM fingerprints"):
+            bloom.add(fp)
+        return bloom
+
+    def owner(self, fp: bytes) -> Optional[Tuple[str, int]]:
+        if fp not in self.bloom:
+            return None
+        row = self.db.execute("SELECT source, line_index FROM fingerprints WHERE fp = ?", (fp,)).fetchone()
+        return tuple(row) if row else None
+
+    def claim(self, r: ParsedReview, source: str) -> Optional[Tuple[str, int]]:
+        # None if the review is new (it is recorded as coming from `source`), else where it was first seen
+        fps = review_fingerprints(r)
+        for fp in fps:
+            owner = self.owner(fp)
+            if owner is not None:
+                self.duplicates += 1
+                return owner
+        self.db.execute("INSERT INTO fingerprints VALUES (?, ?, ?)", (fps[0], os.path.abspath(source), r.line_index))
+        self.bloom.add(fps[0])
+        self.pending += 1
+        if self.pending >= DEDUP_COMMIT_EVERY:
+            self._commit()
+        if self.bloom.added > self.bloom.capacity:
+            self.bloom = self._rebuild_bloom(2 * self.bloom.capacity)
+        return None
+
+    def forget_source(self, source: str, from_line: int = 0) -> None:
+        # Drop what `source` contributed from `from_line` on, before those lines are parsed again.
+        # The Bloom filter keeps their bits; the exact table answers for them from now on.
+        self.db.execute("DELETE FROM fingerprints WHERE source = ? AND line_index >= ?", (os.path.abspath(source), from_line))
+        self._commit()
+
+    def keep_sources(self, sources: Iterable[str]) -> None:
+        # Drop the claims of every other source, for when the outputs are rebuilt from `sources`
+        # alone: a review is only a duplicate while its first copy is in the outputs.
+        # Usually there are none, and the check costs one index probe instead of a Bloom rebuild.
+        kept = sorted({os.path.abspath(source) for source in sources})
+        others = f"source NOT IN ({', '.join('?' * len(kept))})"
+        if self.db.execute(f"SELECT 1 FROM fingerprints WHERE {others} LIMIT 1", kept).fetchone() is None:
+            return
+        deleted = self.db.execute(f"DELETE FROM fingerprints WHERE {others}", kept).rowcount
+        self._commit()
+        if deleted:
+            self.bloom = self._rebuild_bloom(self.bloom.capacity)
+
+    def close(self) -> None:
+        self._commit()
+        version = self._version()
+        tmp = f"{self.bloom_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.bloom.to_bytes(version))
+        os.replace(tmp, self.bloom_path)
+        self.db.close()
+
+
+def iter_unique(records: Iterable[ParsedReview], store: FingerprintStore, source: str) -> Iterator[ParsedReview]:
+    # Reviews of `source` that no export ingested before
+    for r in records:
+        if store.claim(r, source) is None:
+            yield r
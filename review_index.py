@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Inverted token index over the review texts of parsed_reviews.csv.
+
+Every lowercased word of a review maps to the ascending row numbers of the
+reviews containing it. The vocabulary is kept sorted, so every token that
+starts with a given prefix is one bisect and a slice; that is how keyword
+matchers, which match from word starts, find the only rows a keyword can hit.
+The byte offset and day_index of every row are kept too, so a row is read
+back with one seek instead of a scan of the CSV, and day ranges filter rows
+without reading them. IndexedCsvWriter builds the index while the CSV is
+written. The index is saved as one binary file stamped with the size and
+mtime of the CSV it describes, and is rebuilt when the CSV no longer matches.
+"""
+
+import array
+import csv
+import io
+import json
+import os
+import re
+import struct
+import sys
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+
+INDEX_MAGIC = b"RVINDEX2"
+TOKEN_RE = re.compile(r"\w+")
+
+Stamp = Tuple[int, int]  # (size, mtime_ns) of the indexed CSV
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def file_stamp(path: str) -> Optional[Stamp]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def iter_csv_rows(f) -> Iterator[Tuple[List[str], bytes]]:
+    # Each CSV row of a binary file together with its exact bytes, quoted newlines included
+    raw: List[bytes] = []
+
+    def lines() -> Iterator[str]:
+        for line in f:
+            raw.append(line)
+            yield line.decode("utf-8")
+
+    for row in csv.reader(lines()):
+        yield row, b"".join(raw)
+        raw.clear()
+
+
+def parse_csv_row(raw: bytes) -> List[str]:
+    return next(csv.reader(io.StringIO(raw.decode("utf-8"), newline="")))
+
+
+def encode_csv_row(row: List) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(row)
+    return buf.getvalue().encode("utf-8")
+
+
+class TokenIndexBuilder:
+    def __init__(self, start: int = 0) -> None:
+        # start: byte offset of the first row, after any header
+        self.postings: Dict[str, array.array] = {}
+        self.offsets = array.array("Q", [start])
+        self.days = array.array("i")
+
+    def add(self, text: str, size: int, day: int) -> int:
+        # Indexes the next row, `size` bytes long; returns its row number
+        row = len(self.days)
+        postings = self.postings
+        for token in set(tokenize(text)):
+            ids = postings.get(token)
+            if ids is None:
+                ids = postings[token] = array.array("I")
+            ids.append(row)
+        self.offsets.append(self.offsets[-1] + size)
+        self.days.append(day)
+        return row
+
+    def build(self) -> "TokenIndex":
+        tokens = sorted(self.postings)
+        return TokenIndex(tokens, [self.postings[t] for t in tokens], self.offsets, self.days)
+
+
+class IndexedCsvWriter:
+    """csv.writer for a binary file that adds every row it writes to a TokenIndexBuilder."""
+
+    def __init__(self, f, builder: TokenIndexBuilder, text_col: int, day_col: int) -> None:
+        self.f = f
+        self.builder = builder
+        self.text_col = text_col
+        self.day_col = day_col
+        self.buf = io.StringIO()
+        self.writer = csv.writer(self.buf)
+
+    def writerow(self, row: List) -> None:
+        self.buf.seek(0)
+        self.buf.truncate()
+        self.writer.writerow(row)
+        raw = self.buf.getvalue().encode("utf-8")
+        self.f.write(raw)
+        self.builder.add(row[self.text_col], len(raw), int(row[self.day_col]))
+
+
+class TokenIndex:
+    def __init__(self, tokens: List[str], postings: List[array.array], offsets: array.array, days: array.array) -> None:
+        self.tokens = tokens  # sorted
+        self.postings = postings  # ascending row numbers, parallel to tokens
+        self.offsets = offsets  # row i is bytes offsets[i]:offsets[i + 1] of the CSV
+        self.days = days  # day_index of every row
+
+    @property
+    def rows(self) -> int:
+        return len(self.days)
+
+    @classmethod
+    def from_csv(cls, path: str, text_column: str = "review_text", day_column: str = "day_index") -> "TokenIndex":
+        with open(path, "rb") as f:
+            rows = iter_csv_rows(f)
+            header, raw = next(rows)
+            text_col, day_col = header.index(text_column), header.index(day_column)
+            builder = TokenIndexBuilder(len(raw))
+            for row, raw in rows:
+                builder.add(row[text_col], len(raw), int(row[day_col]))
+        return builder.build()
+
+    def resume(self, size: int) -> Optional[TokenIndexBuilder]:
+        # A builder holding the rows in the first `size` bytes of the CSV, to append to after
+        # the CSV is truncated there; None when `size` is not the end of a row
+        n = bisect_left(self.offsets, size)
+        if n >= len(self.offsets) or self.offsets[n] != size:
+            return None
+        builder = TokenIndexBuilder()
+        for token, ids in zip(self.tokens, self.postings):
+            end = bisect_left(ids, n)
+            if end:
+                builder.postings[token] = ids[:end]
+        builder.offsets = self.offsets[:n + 1]
+        builder.days = self.days[:n]
+        return builder
+
+    def token_range(self, prefix: str) -> Tuple[int, int]:
+        # Positions in self.tokens of every token starting with `prefix`
+        lo = bisect_left(self.tokens, prefix)
+        hi = lo
+        while hi < len(self.tokens) and self.tokens[hi].startswith(prefix):
+            hi += 1
+        return lo, hi
+
+    def rows_with_token(self, token: str) -> Set[int]:
+        pos = bisect_left(self.tokens, token)
+        if pos < len(self.tokens) and self.tokens[pos] == token:
+            return set(self.postings[pos])
+        return set()
+
+    def rows_with_prefix(self, prefix: str) -> Set[int]:
+        lo, hi = self.token_range(prefix)
+        found: Set[int] = set()
+        for ids in self.postings[lo:hi]:
+            found.update(ids)
+        return found
+
+    def save(self, path: str, stamp: Optional[Stamp]) -> None:
+        counts = [len(ids) for ids in self.postings]
+        header = json.dumps({"rows": self.rows, "stamp": stamp, "tokens": self.tokens, "counts": counts}, ensure_ascii=False).encode("utf-8")
+        blob = array.array("I")
+        for ids in self.postings:
+            blob.extend(ids)
+        offsets = array.array("Q", self.offsets)
+        days = array.array("i", self.days)
+        if sys.byteorder != "little":
+            for a in (blob, offsets, days):
+                a.byteswap()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(INDEX_MAGIC + struct.pack("<I", len(header)) + header)
+            f.write(offsets.tobytes())
+            f.write(days.tobytes())
+            f.write(blob.tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, stamp: Optional[Stamp] = None) -> Optional["TokenIndex"]:
+        # None when the file is missing or unreadable, or was saved for another `stamp`
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            if not data.startswith(INDEX_MAGIC):
+                return None
+            (header_len,) = struct.unpack_from("<I", data, len(INDEX_MAGIC))
+            pos = len(INDEX_MAGIC) + 4
+            header = json.loads(data[pos:pos + header_len])
+            if stamp is not None and tuple(header["stamp"] or ()) != tuple(stamp):
+                return None
+            rows = header["rows"]
+            pos += header_len
+            offsets = array.array("Q")
+            offsets.frombytes(data[pos:pos + 8 * (rows + 1)])
+            pos += 8 * (rows + 1)
+            days = array.array("i")
+            days.frombytes(data[pos:pos + 4 * rows])
+            pos += 4 * rows
+            blob = array.array("I")
+            blob.frombytes(data[pos:])
+        except (OSError, ValueError, KeyError, struct.error):
+            return None
+        if sys.byteorder != "little":
+            for a in (blob, offsets, days):
+                a.byteswap()
+        postings = []
+        start = 0
+        for count in header["counts"]:
+            postings.append(blob[start:start + count])
+            start += count
+        if start != len(blob) or len(offsets) != rows + 1 or len(days) != rows:
+            return None
+        return cls(header["tokens"], postings, offsets, days)
@@ -0,0 +1,804 @@
+#!/usr/bin/env python3
+"""
+Unified parser for Appbot review dumps.
+
+Understands the three exports we receive and yields one platform-tagged
+ParsedReview per review in a single streaming pass:
+- Android sheet export: header and time on one line ("...repliesAPP 8:52 PM")
+- Raw Slack export: "APP  12:26 AM" on its own line and ":red_circle:" suffixes
+- iOS sheet export: title/body pairs and "Country · vX.Y.Z · iOS" trailers
+"""
+
+import glob
+import itertools
+import mmap
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+
+# Be lenient: accept any content between stars and sentiment, focus on 'by <name>' and sentiment token
+STAR_LINE_RE = re.compile(r"★+.*?\bby\s*(.+?)\s*·\s*(Negative|Positive|Neutral)", re.IGNORECASE)
+WEEKLY_SUMMARY_RE = re.compile(r"^Weekly Summary for\s*(.+?)\s*$")
+WEEK_LABEL_RE = re.compile(r"^\d{1,2}\s+[A-Za-z]+\s*-\s*(\d{1,2})\s+([A-Za-z]+)\s+(\d{4})$")  # "4 Aug - 10 Aug 2025"
+# Sheet exports put the alert title and time on one line; the Slack export splits them
+APBOT_HEADER_INLINE_RE = re.compile(r"^(?:Appbot: .*?)?APP\s+(\d{1,2}):(\d{2})\s*(AM|PM)\s*$")
+TIME_ONLY_RE = re.compile(r"^(\d{1,2}):(\d{2})\s*$")
+LANG_LINE_RE = re.compile(r"^(English|Spanish|German|French|Hindi|Finnish|Danish|Portuguese|Italian|Dutch|Polish|Turkish|Arabic|Russian|Indonesian|Malay|Thai|Vietnamese|Chinese)\s*·\s*Google Play\s*$", re.IGNORECASE)
+STORE_TRAILER_RE = re.compile(r"^(.+?)\s*·\s*v(\d+(?:\.\d+)*)\s*·\s*iOS$")
+APP_LINE_RE = re.compile(r"^([^()]+?)\s*\((Google Play|iOS)\)$")
+DASHED_SEPARATOR = "-------------------"
+
+FORMAT_ANDROID_SHEET = "android_sheet"
+FORMAT_SLACK_EXPORT = "slack_export"
+FORMAT_IOS_SHEET = "ios_sheet"
+
+FORMAT_DEFAULT_PLATFORM: Dict[str, str] = {
+    FORMAT_ANDROID_SHEET: "Android",
+    FORMAT_SLACK_EXPORT: "Android",
+    FORMAT_IOS_SHEET: "iOS",
+}
+STORE_PLATFORM: Dict[str, str] = {"Google Play": "Android", "iOS": "iOS"}
+
+# Line kinds produced by classify_line, in precedence order
+LINE_BLANK = "blank"
+LINE_WEEKLY = "weekly"
+LINE_HEADER = "header"
+LINE_TIME = "time"
+LINE_LANG = "lang"
+LINE_STORE = "store"
+LINE_STAR = "star"
+LINE_REPLY = "reply"
+LINE_APP = "app"
+LINE_TEXT = "text"
+MARKER_KINDS = frozenset({LINE_WEEKLY, LINE_HEADER, LINE_TIME, LINE_LANG, LINE_STORE, LINE_STAR})
+BLOCK_END_KINDS = MARKER_KINDS | {LINE_BLANK, LINE_REPLY}
+TRAILER_KINDS = frozenset({LINE_LANG, LINE_STORE})
+
+# Bump whenever parse output changes; it keys the cached tables in review_cache
+PARSER_VERSION = "3"
+
+SNIFF_BYTES = 8192
+SHARDS_PER_WORKER = 4
+FILES_IN_FLIGHT_PER_WORKER = 2  # dumps parsed ahead per parse worker; bounds memory in bulk mode
+UNDATED_DUMPS_HELD = 8  # daily dumps held back in bulk mode until a Weekly Summary dates them
+READ_BLOCK_BYTES = 1 << 20
+
+# Structural lines (app names, trailers, times, reply links) repeat constantly,
+# so their tokens are memoised; review text is never cached.
+CACHEABLE_KINDS = frozenset({LINE_BLANK, LINE_HEADER, LINE_TIME, LINE_LANG, LINE_STORE, LINE_REPLY, LINE_APP})
+TOKEN_CACHE_SIZE = 4096
+
+
+class LineToken(NamedTuple):
+    kind: str
+    text: str  # stripped line
+    match: Optional[re.Match]
+    star_at_start: bool  # STAR_LINE_RE.match would succeed, not just .search
+    dashed: bool
+
+
+@dataclass
+class ParsedReview:
+    platform: Optional[str]  # "Android" or "iOS"
+    app: Optional[str]  # app line as shown in the alert, e.g. "Pocket FM: Audio Series (Google Play)"
+    day_index: int
+    batch_index: int  # 0-based Appbot alert batch; -1 before the first header
+    line_index: int
+    header_time: Optional[str]  # alert header time, e.g. "12:26 AM"
+    timestamp: Optional[str]  # per-review time line, e.g. "12:26"
+    reviewer: Optional[str]
+    rating: Optional[int]
+    sentiment: Optional[str]
+    rating_line: str
+    title: Optional[str]  # iOS reviews carry a title as their first line
+    review_text: str  # English translation when one was captured
+    original_text: Optional[str]  # untranslated text, only set when a translation was captured
+    language: Optional[str]  # from the "<Language> · Google Play" trailer
+    country: Optional[str]  # from the "<Country> · vX.Y.Z · iOS" trailer
+    app_version: Optional[str]
+    posted_at: Optional[datetime] = None  # reconstructed local time; None until the calendar date is known
+
+
+@dataclass
+class ParserState:
+    # Parser position at a line boundary; written back when a parse runs to completion
+    day_index: int = 1
+    batch_index: int = -1
+    line_index: int = 0  # index of the next line to read
+    header_time: Optional[str] = None
+    header_minutes: Optional[int] = None  # header_time as minutes past midnight
+    base_date: Optional[date] = None  # calendar date of day_index 1, fixed by the first Weekly Summary
+    byte_offset: int = 0  # offset of line_index in the file, when read through iter_lines_from
+    # Position of the last Appbot header seen, just before it was applied. Headers
+    # close every review block, so parsing restarted here reproduces the tail exactly.
+    resume: Optional["ParserState"] = None
+
+
+def clock_minutes(hour: int, minute: int, ampm: str) -> int:
+    return (hour % 12 + (12 if ampm.upper() == "PM" else 0)) * 60 + minute
+
+
+def header_clock_minutes(header_time: str) -> int:
+    # Inverse of the "h:mm AM" form stored in ParsedReview.header_time
+    clock, ampm = header_time.split()
+    hour, minute = clock.split(":")
+    return clock_minutes(int(hour), int(minute), ampm)
+
+
+def week_summary_date(label: str) -> Optional[date]:
+    # A "Weekly Summary for 4 Aug - 10 Aug 2025" alert is posted the day after the week ends
+    m = WEEK_LABEL_RE.match(label)
+    if m is None:
+        return None
+    for fmt in ("%d %b %Y", "%d %B %Y"):
+        try:
+            return datetime.strptime(f"{m.group(1)} {m.group(2)} {m.group(3)}", fmt).date() + timedelta(days=1)
+        except ValueError:
+            continue
+    return None
+
+
+def next_header_day(day_index: int, header_minutes: Optional[int], minutes: int) -> int:
+    # Alerts arrive in time order, so the clock going backwards means midnight has passed
+    if header_minutes is not None and minutes < header_minutes:
+        return day_index + 1
+    return day_index
+
+
+def apply_week_anchor(day_index: int, base_date: Optional[date], posted_on: date) -> Tuple[int, date]:
+    # The first anchor fixes the calendar date of day 1. Later anchors add back
+    # days that passed without any alert, which the clock alone cannot see.
+    if base_date is None:
+        return day_index, posted_on - timedelta(days=day_index - 1)
+    missed = (posted_on - base_date).days + 1 - day_index
+    return day_index + max(missed, 0), base_date
+
+
+def review_datetime(base_date: Optional[date], day_index: int, header_minutes: Optional[int], timestamp: Optional[str]) -> Optional[datetime]:
+    # Alert time on the reconstructed day, refined by the review's own 12-hour "h:mm"
+    # reading when there is one (taken as the reading nearest the alert time)
+    if base_date is None or header_minutes is None:
+        return None
+    minutes = header_minutes
+    if timestamp:
+        hour, minute = timestamp.split(":")
+        reading = (int(hour) % 12) * 60 + int(minute)
+        minutes -= (header_minutes - reading + 360) % 720 - 360
+    return datetime(base_date.year, base_date.month, base_date.day) + timedelta(days=day_index - 1, minutes=minutes)
+
+
+def detect_format(head: str) -> str:
+    # Decide from the first few KB of a dump which export produced it
+    if "(iOS)" in head or re.search(r"·\s*v\d+(?:\.\d+)*\s*·\s*iOS\s*$", head, re.MULTILINE):
+        return FORMAT_IOS_SHEET
+    if ":red_circle:" in head or re.search(r"^APP\s+\d{1,2}:\d{2}\s*(AM|PM)\s*$", head, re.MULTILINE):
+        return FORMAT_SLACK_EXPORT
+    return FORMAT_ANDROID_SHEET
+
+
+def sniff_format(path: str, size: int = SNIFF_BYTES) -> str:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return detect_format(f.read(size))
+
+
+def iter_lines(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            yield line.rstrip("\n")
+
+
+def iter_lines_from(path: str, start: int = 0, end: Optional[int] = None, header_offsets: Optional[Dict[int, int]] = None, first_line: int = 0) -> Iterator[str]:
+    # Decoded lines of the byte range [start, end), split exactly as iter_lines
+    # splits them. Byte offsets of lines that could be Appbot headers are recorded
+    # in `header_offsets` by line index, counting from `first_line`.
+    with open(path, "rb") as f:
+        if end is None:
+            end = os.fstat(f.fileno()).st_size
+        f.seek(start)
+        pos = start  # offset of `carry`
+        line_index = first_line
+        carry = b""
+        while True:
+            block = f.read(min(READ_BLOCK_BYTES, end - pos - len(carry))) if pos + len(carry) < end else b""
+            data = carry + block
+            if block:
+                # Whole lines only, so neither a character nor a \r\n pair is split
+                cut = data.rfind(b"\n") + 1
+                if cut == 0:
+                    carry = data
+                    continue
+                chunk, carry = data[:cut], data[cut:]
+            else:
+                chunk, carry = data, b""
+            if not chunk:
+                return
+            text = chunk.decode("utf-8", errors="ignore")
+            if "\r" in text:
+                # Match text-mode universal newlines
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+            if header_offsets is not None and b"APP" in chunk:
+                # Undecodable bytes between \r and \n merge two breaks into one; byte
+                # positions only map onto line numbers when no merge happened
+                if chunk.count(b"\n") + chunk.count(b"\r") - chunk.count(b"\r\n") == text.count("\n"):
+                    _record_header_offsets(chunk, pos, line_index, header_offsets)
+            lines = text.split("\n") if text else []
+            if text.endswith("\n"):
+                lines.pop()
+            yield from lines
+            line_index += len(lines)
+            pos += len(chunk)
+
+
+def _record_header_offsets(chunk: bytes, chunk_pos: int, line_index: int, header_offsets: Dict[int, int]) -> None:
+    # Line breaks are counted only between candidate lines, so this stays linear
+    scan = 0
+    idx = chunk.find(b"APP")
+    while idx >= 0:
+        line_start = max(chunk.rfind(b"\n", 0, idx), chunk.rfind(b"\r", 0, idx)) + 1
+        line_index += chunk.count(b"\n", scan, line_start) + chunk.count(b"\r", scan, line_start) - chunk.count(b"\r\n", scan, line_start)
+        header_offsets[line_index] = chunk_pos + line_start
+        scan = line_start
+        idx = chunk.find(b"APP", idx + 3)
+
+
+TIME_ONLY_BYTES_RE = re.compile(rb"^\s*\d{1,2}:\d{2}\s*$")
+
+
+def _may_change_state(line: bytes) -> bool:
+    # Could this line be a header, weekly summary, time or app line? Deliberately loose.
+    stripped = line.strip()
+    if not stripped:
+        return False
+    return stripped[:1].isdigit() or stripped.startswith((b"Appbot: ", b"APP", b"Weekly Summary")) or stripped.endswith(b")")
+
+
+def iter_mmap_lines(path: str, platform: Optional[str] = None) -> Iterator[str]:
+    # Lines sliced out of a read-only mapping by offset, so the dump is never copied
+    # onto the heap as a whole. With `platform` set, lines inside another platform's
+    # review blocks come back as "" without being decoded; line numbering is kept.
+    # A block is only skipped when its app line directly follows the review's time
+    # line, which guarantees the parser is between reviews at that point.
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            skipping = False
+            after_time = False
+            size = len(mm)
+            pos = 0
+            while pos < size:
+                end = mm.find(b"\n", pos)
+                if end < 0:
+                    end = size
+                raw = mm[pos:end]
+                pos = end + 1
+                if skipping:
+                    if not _may_change_state(raw):
+                        # One placeholder per logical line, counting bare \r breaks
+                        yield ""
+                        if b"\r" in raw:
+                            for _ in range(raw.count(b"\r") - raw.endswith(b"\r")):
+                                yield ""
+                        continue
+                    skipping = False
+                line = raw.decode("utf-8", errors="ignore")
+                if platform is not None:
+                    if after_time and raw.rstrip().endswith(b")"):
+                        m = APP_LINE_RE.match(line.strip())
+                        skipping = m is not None and STORE_PLATFORM[m.group(2)] != platform
+                    after_time = TIME_ONLY_BYTES_RE.match(raw) is not None
+                if "\r" in line:
+                    # Match text-mode universal newlines
+                    parts = line.split("\r")
+                    if line.endswith("\r"):
+                        parts.pop()
+                    yield from parts
+                else:
+                    yield line
+
+
+_BLANK_TOKEN = LineToken(LINE_BLANK, "", None, False, False)
+_token_cache: Dict[str, LineToken] = {}
+
+
+def classify_line(raw: str) -> LineToken:
+    tok = _token_cache.get(raw)
+    if tok is None:
+        tok = _classify_line(raw)
+        if tok.kind in CACHEABLE_KINDS and len(_token_cache) < TOKEN_CACHE_SIZE:
+            _token_cache[raw] = tok
+    return tok
+
+
+def _classify_line(raw: str) -> LineToken:
+    # Each regex is gated on a cheap necessary condition so a line runs at most
+    # one pattern in practice; precedence matches the historical cascade.
+    line = raw.strip()
+    if not line:
+        return _BLANK_TOKEN
+    first = line[0]
+    if first == "W":
+        m = WEEKLY_SUMMARY_RE.match(line)
+        if m:
+            return LineToken(LINE_WEEKLY, line, m, False, False)
+    elif first == "A":
+        if line.startswith("Appbot: ") or line.startswith("APP"):
+            m = APBOT_HEADER_INLINE_RE.match(line)
+            if m:
+                return LineToken(LINE_HEADER, line, m, False, False)
+    elif len(line) <= 5:
+        # Too short for any marker other than a bare time
+        if first.isdigit():
+            m = TIME_ONLY_RE.match(line)
+            if m:
+                return LineToken(LINE_TIME, line, m, False, False)
+        return LineToken(LINE_TEXT, line, None, False, False)
+    last = line[-1]
+    if (last == "y" or last == "Y") and line[-11:].lower() == "google play":
+        m = LANG_LINE_RE.match(line)
+        if m:
+            return LineToken(LINE_LANG, line, m, False, False)
+    elif last == "S" and line.endswith("· iOS"):
+        m = STORE_TRAILER_RE.match(line)
+        if m:
+            return LineToken(LINE_STORE, line, m, False, False)
+    dashed = first == "-" and line.startswith(DASHED_SEPARATOR)
+    if "★" in line:
+        m = STAR_LINE_RE.search(line)
+        if m:
+            return LineToken(LINE_STAR, line, m, m.start() == 0, dashed)
+    if "|" in line and "reply |" in line.lower():
+        return LineToken(LINE_REPLY, line, None, False, dashed)
+    if last == ")":
+        m = APP_LINE_RE.match(line)
+        if m:
+            return LineToken(LINE_APP, line, m, False, False)
+    return LineToken(LINE_TEXT, line, None, False, dashed)
+
+
+def _is_translation_marker(tok: LineToken) -> bool:
+    # The translation capture historically used STAR_LINE_RE.match rather than .search
+    if tok.kind == LINE_STAR:
+        return tok.star_at_start
+    return tok.kind in MARKER_KINDS
+
+
+def iter_parsed_lines(lines: Iterable[str], weekly_anchors: Optional[List[Tuple[int, str]]] = None, default_platform: Optional[str] = None, state: Optional[ParserState] = None, header_log: Optional[List[Tuple[int, str]]] = None) -> Iterator[ParsedReview]:
+    # Streaming state machine over classified lines. At most one token is held
+    # back for re-examination and at most one review waits for its trailer, so
+    # memory does not depend on input size. Weekly summary anchors are appended
+    # to `weekly_anchors` and (line_index, header_time) of each header to `header_log`
+    # as they are seen. Parsing resumes from `state` when given, and the final
+    # position is written back to it once input runs out.
+    if state is None:
+        state = ParserState()
+    last_header: Optional[ParserState] = None  # position before the latest header
+    counter = itertools.count(state.line_index)
+    tokens = zip(counter, map(classify_line, lines))
+    held: Optional[Tuple[int, LineToken]] = None  # read ahead but not yet consumed
+    pending: Optional[ParsedReview] = None  # parsed review waiting for its store trailer
+    current_day_index = state.day_index
+    batch_index = state.batch_index
+    header_time = state.header_time
+    header_minutes = state.header_minutes
+    base_date = state.base_date
+    timestamp: Optional[str] = None
+    app: Optional[str] = None
+    platform = default_platform
+
+    while True:
+        if held is not None:
+            i, tok = held
+            held = None
+        else:
+            item = next(tokens, None)
+            if item is None:
+                if pending is not None:
+                    yield pending
+                # zip draws from the counter before finding `lines` exhausted
+                state.line_index = next(counter) - 1
+                state.day_index = current_day_index
+                state.batch_index = batch_index
+                state.header_time = header_time
+                state.header_minutes = header_minutes
+                state.base_date = base_date
+                if last_header is not None:
+                    state.resume = last_header
+                return
+            i, tok = item
+        kind = tok.kind
+
+        # Trailers close the review they follow
+        if kind in TRAILER_KINDS:
+            if pending is not None:
+                if kind == LINE_LANG:
+                    pending.language = tok.match.group(1)
+                else:
+                    pending.country = tok.match.group(1)
+                    pending.app_version = tok.match.group(2)
+                yield pending
+                pending = None
+            continue
+
+        if pending is not None and (kind in MARKER_KINDS or kind == LINE_APP):
+            yield pending
+            pending = None
+
+        # Detect weekly summary anchors
+        if kind == LINE_WEEKLY:
+            if weekly_anchors is not None:
+                weekly_anchors.append((i, tok.match.group(1)))
+            posted_on = week_summary_date(tok.match.group(1))
+            if posted_on is not None:
+                current_day_index, base_date = apply_week_anchor(current_day_index, base_date, posted_on)
+            continue
+
+        # Detect appbot header with time; the day advances when the clock goes backwards
+        if kind == LINE_HEADER:
+            last_header = ParserState(current_day_index, batch_index, i, header_time, header_minutes, base_date)
+            hour = int(tok.match.group(1))
+            ampm = tok.match.group(3).upper()
+            minutes = clock_minutes(hour, int(tok.match.group(2)), ampm)
+            current_day_index = next_header_day(current_day_index, header_minutes, minutes)
+            header_minutes = minutes
+            batch_index += 1
+            header_time = f"{hour}:{tok.match.group(2)} {ampm}"
+            if header_log is not None:
+                header_log.append((i, header_time))
+            timestamp = None
+            app = None
+            platform = default_platform
+            continue
+
+        if kind == LINE_TIME:
+            timestamp = tok.text
+            continue
+
+        if kind == LINE_APP:
+            app = tok.text
+            platform = STORE_PLATFORM[tok.match.group(2)]
+            continue
+
+        # Star line indicates start of a review block; other lines don't change state
+        if kind != LINE_STAR:
+            continue
+
+        # The review text is usually the next non-empty line(s) until a blank or a known separator
+        review_lines: List[str] = []
+        original_lines: Optional[List[str]] = None
+        while True:
+            if held is not None:
+                item = held
+                held = None
+            else:
+                item = next(tokens, None)
+                if item is None:
+                    break
+            nxt = item[1]
+            # Blank lines, block markers and reply/permalink lines end the block
+            if nxt.kind in BLOCK_END_KINDS:
+                held = item
+                break
+            if not nxt.dashed:
+                review_lines.append(nxt.text)
+                continue
+
+            # Translation block support: dashed separator followed by 'English Translation'
+            after = next(tokens, None)
+            if after is None:
+                break
+            if not after[1].text.lower().startswith("english translation"):
+                # Lone dashed separator; re-examine the following line
+                held = after
+                continue
+            # Capture until next dashed separator (consumed) or block marker (left for the outer loop)
+            trans_lines: List[str] = []
+            while True:
+                item = next(tokens, None)
+                if item is None or item[1].dashed:
+                    break
+                if _is_translation_marker(item[1]):
+                    held = item
+                    break
+                trans_lines.append(item[1].text)
+            if trans_lines:
+                original_lines = review_lines
+                review_lines = trans_lines
+
+        reviewer = tok.match.group(1).strip()
+        pending = ParsedReview(
+            platform=platform,
+            app=app,
+            day_index=current_day_index,
+            batch_index=batch_index,
+            line_index=i,
+            header_time=header_time,
+            timestamp=timestamp,
+            reviewer=reviewer if reviewer else None,
+            rating=tok.text.count("★"),
+            sentiment=tok.match.group(2),
+            rating_line=tok.text,
+            title=review_lines[0] if platform == "iOS" and review_lines else None,
+            review_text=" ".join(review_lines).strip(),
+            original_text=" ".join(original_lines).strip() if original_lines is not None else None,
+            language=None,
+            country=None,
+            app_version=None,
+            posted_at=review_datetime(base_date, current_day_index, header_minutes, timestamp),
+        )
+
+
+def iter_dump(path: str, weekly_anchors: Optional[List[Tuple[int, str]]] = None, platform: Optional[str] = None, state: Optional[ParserState] = None) -> Iterator[ParsedReview]:
+    # Sniff the export format, then lazily parse the whole dump in one pass. With
+    # `platform` set the dump is read through mmap and only that platform's
+    # review text is decoded and returned. With `state` set parsing starts at its
+    # byte offset, and the end position and latest resume point are written back.
+    default_platform = FORMAT_DEFAULT_PLATFORM[sniff_format(path)]
+    if state is not None:
+        if state.base_date is None:
+            state.base_date = find_base_date(path, state)
+        records = _iter_dump_from(path, weekly_anchors, default_platform, state)
+    elif platform is None:
+        return iter_parsed_lines(iter_lines(path), weekly_anchors, default_platform, ParserState(base_date=find_base_date(path)))
+    else:
+        return _iter_mapped_dump(path, weekly_anchors, platform, ParserState(base_date=find_base_date(path)))
+    if platform is None:
+        return records
+    return (r for r in records if r.platform == platform)
+
+
+def _iter_mapped_dump(path: str, weekly_anchors: Optional[List[Tuple[int, str]]], platform: Optional[str], state: ParserState) -> Iterator[ParsedReview]:
+    # The dump read through mmap from the top, skipping other platforms' reviews, into `state`
+    default_platform = FORMAT_DEFAULT_PLATFORM[sniff_format(path)]
+    for r in iter_parsed_lines(iter_mmap_lines(path, platform), weekly_anchors, default_platform, state):
+        if platform is None or r.platform == platform:
+            yield r
+    state.byte_offset = os.path.getsize(path)
+
+
+def find_base_date(path: str, state: Optional[ParserState] = None) -> Optional[date]:
+    # Calendar date of day_index 1, read ahead from the first Weekly Summary after
+    # `state` so reviews before it are dated too. Header and summary lines are always
+    # handled by the parser's outer loop, so replaying only those reproduces its day count.
+    if state is None:
+        state = ParserState()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= state.byte_offset:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm.find(b"Weekly Summary for", state.byte_offset) < 0:
+                return None
+    return _base_date_from_lines(iter_lines_from(path, state.byte_offset), state)
+
+
+def _base_date_from_lines(lines: Iterable[str], state: ParserState) -> Optional[date]:
+    day_index, header_minutes = state.day_index, state.header_minutes
+    for line in lines:
+        if line.lstrip()[:1] not in ("A", "W"):
+            continue
+        tok = classify_line(line)
+        if tok.kind == LINE_HEADER:
+            minutes = clock_minutes(int(tok.match.group(1)), int(tok.match.group(2)), tok.match.group(3))
+            day_index = next_header_day(day_index, header_minutes, minutes)
+            header_minutes = minutes
+        elif tok.kind == LINE_WEEKLY:
+            posted_on = week_summary_date(tok.match.group(1))
+            if posted_on is not None:
+                return apply_week_anchor(day_index, None, posted_on)[1]
+    return None
+
+
+def _iter_dump_from(path: str, weekly_anchors: Optional[List[Tuple[int, str]]], default_platform: Optional[str], state: ParserState, end: Optional[int] = None, header_log: Optional[List[Tuple[int, str]]] = None) -> Iterator[ParsedReview]:
+    if end is None:
+        # Stop at the size seen now so a concurrent append is left for the next run
+        end = os.path.getsize(path)
+    header_offsets: Dict[int, int] = {}
+    lines = iter_lines_from(path, state.byte_offset, end, header_offsets, state.line_index)
+    yield from iter_parsed_lines(lines, weekly_anchors, default_platform, state, header_log)
+    state.byte_offset = end
+    if state.resume is not None and state.resume.byte_offset == 0:
+        if state.resume.line_index in header_offsets:
+            state.resume.byte_offset = header_offsets[state.resume.line_index]
+        else:
+            state.resume = None
+
+
+def parse_dump(path: str, workers: int = 1) -> Tuple[List[ParsedReview], List[Tuple[int, str]]]:
+    weekly_anchors: List[Tuple[int, str]] = []  # (line_index, label)
+    if workers > 1:
+        reviews = list(iter_dump_parallel(path, weekly_anchors, workers))
+    else:
+        reviews = list(iter_dump(path, weekly_anchors))
+    return reviews, weekly_anchors
+
+
+def _is_header_bytes(line: bytes) -> bool:
+    stripped = line.lstrip()
+    if not (stripped.startswith(b"Appbot: ") or stripped.startswith(b"APP")):
+        return False
+    return classify_line(line.decode("utf-8", errors="ignore").rstrip("\n")).kind == LINE_HEADER
+
+
+def find_shard_offsets(path: str, shards: int, start: int = 0) -> List[int]:
+    # Byte offsets splitting the dump from `start` into roughly equal ranges, each
+    # cut placed at the start of an Appbot header line. Headers end any review
+    # block, so every shard after the first starts with the parser in its outer loop.
+    size = os.path.getsize(path)
+    offsets = [start]
+    with open(path, "rb") as f:
+        for k in range(1, shards):
+            target = start + (size - start) * k // shards
+            if target <= offsets[-1]:
+                continue
+            f.seek(target)
+            f.readline()  # finish the partial line
+            pos = f.tell()
+            for line in iter(f.readline, b""):
+                if _is_header_bytes(line):
+                    break
+                pos += len(line)
+            if offsets[-1] < pos < size:
+                offsets.append(pos)
+    offsets.append(size)
+    return offsets
+
+
+def _parse_shard(path: str, start: int, end: int, default_platform: Optional[str]) -> Tuple[List[ParsedReview], List[Tuple[int, str]], List[Tuple[int, str]], ParserState]:
+    weekly_anchors: List[Tuple[int, str]] = []
+    header_log: List[Tuple[int, str]] = []
+    # Shard-local positions. Days depend on everything before the shard, so they
+    # are recomputed from the header and anchor logs when shards are merged.
+    state = ParserState(day_index=0, byte_offset=start)
+    reviews = list(_iter_dump_from(path, weekly_anchors, default_platform, state, end, header_log))
+    return reviews, weekly_anchors, header_log, state
+
+
+def iter_dump_parallel(path: str, weekly_anchors: Optional[List[Tuple[int, str]]] = None, workers: Optional[int] = None, shards: Optional[int] = None, state: Optional[ParserState] = None) -> Iterator[ParsedReview]:
+    # Parse header-aligned byte-range shards in worker processes and merge them in
+    # order, shifting batch and line positions by what preceded each shard and
+    # replaying its headers and anchors to place reviews on the right day.
+    # Produces exactly what iter_dump does for the same file and `state`.
+    workers = workers or os.cpu_count() or 1
+    if state is None:
+        state = ParserState()
+    if state.base_date is None:
+        state.base_date = find_base_date(path, state)
+    default_platform = FORMAT_DEFAULT_PLATFORM[sniff_format(path)]
+    offsets = find_shard_offsets(path, shards or workers * SHARDS_PER_WORKER, state.byte_offset)
+    batch_base, line_base = state.batch_index, state.line_index
+    day_index, header_time, header_minutes, base_date = state.day_index, state.header_time, state.header_minutes, state.base_date
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_parse_shard, itertools.repeat(path), offsets[:-1], offsets[1:], itertools.repeat(default_platform))
+        for reviews, anchors, header_log, shard_state in results:
+            # Headers and anchors in line order; headers sort first but never share a line with an anchor
+            events = sorted([(line_index + line_base, 0, text) for line_index, text in header_log] + [(line_index + line_base, 1, text) for line_index, text in anchors])
+            pending_events = iter(events)
+            event = next(pending_events, None)
+            batch_index = batch_base
+            last_header: Optional[ParserState] = None
+            for r in itertools.chain(reviews, [None]):
+                line_index = r.line_index + line_base if r is not None else None
+                while event is not None and (line_index is None or event[0] < line_index):
+                    if event[1] == 0:
+                        last_header = ParserState(day_index, batch_index, event[0], header_time, header_minutes, base_date)
+                        minutes = header_clock_minutes(event[2])
+                        day_index = next_header_day(day_index, header_minutes, minutes)
+                        header_minutes = minutes
+                        header_time = event[2]
+                        batch_index += 1
+                    else:
+                        posted_on = week_summary_date(event[2])
+                        if posted_on is not None:
+                            day_index, base_date = apply_week_anchor(day_index, base_date, posted_on)
+                    event = next(pending_events, None)
+                if r is None:
+                    break
+                r.day_index = day_index
+                r.batch_index += batch_base + 1
+                r.line_index = line_index
+                if r.header_time is None:
+                    r.header_time = header_time
+                r.posted_at = review_datetime(base_date, day_index, header_minutes, r.timestamp)
+                yield r
+            if weekly_anchors is not None:
+                weekly_anchors.extend((line_index + line_base, label) for line_index, label in anchors)
+            if last_header is not None:
+                # Byte offsets of headers are only known inside the shard
+                if shard_state.resume is not None:
+                    last_header.byte_offset = shard_state.resume.byte_offset
+                    state.resume = last_header
+                else:
+                    state.resume = None
+            batch_base += shard_state.batch_index + 1
+            line_base += shard_state.line_index
+    state.day_index, state.batch_index, state.line_index = day_index, batch_base, line_base
+    state.header_time, state.header_minutes, state.base_date = header_time, header_minutes, base_date
+    state.byte_offset = offsets[-1]
+
+
+def expand_sources(pattern: str) -> List[str]:
+    # A dump, a directory of dumps or a glob, in name order (daily dumps are named by date)
+    if os.path.isfile(pattern):
+        return [pattern]
+    if os.path.isdir(pattern):
+        return sorted(p for p in (os.path.join(pattern, name) for name in os.listdir(pattern)) if os.path.isfile(p))
+    return sorted(p for p in glob.glob(pattern) if os.path.isfile(p))
+
+
+def parse_dump_file(path: str, platform: Optional[str] = None) -> Tuple[List[ParsedReview], ParserState]:
+    # A whole dump parsed off its mapping, with the final parser state; run in bulk parse workers
+    state = ParserState(base_date=find_base_date(path))
+    reviews = list(_iter_mapped_dump(path, None, platform, state))
+    return reviews, state
+
+
+def _iter_parsed_dumps(paths: List[str], platform: Optional[str], workers: int) -> Iterator[Tuple[str, List[ParsedReview], ParserState]]:
+    # Worker processes parse the next dumps while earlier ones are consumed; results
+    # come back in `paths` order with a bounded number of dumps in memory
+    window = max(2, workers * FILES_IN_FLIGHT_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as parsers:
+        in_flight = deque()
+        pending = iter(paths)
+        for path in itertools.islice(pending, window):
+            in_flight.append((path, parsers.submit(parse_dump_file, path, platform)))
+        while in_flight:
+            path, parsed = in_flight.popleft()
+            reviews, state = parsed.result()
+            for next_path in itertools.islice(pending, 1):
+                in_flight.append((next_path, parsers.submit(parse_dump_file, next_path, platform)))
+            yield path, reviews, state
+
+
+def _iter_mapped_dumps(paths: List[str], platform: Optional[str]) -> Iterator[Tuple[str, Iterator[ParsedReview], ParserState]]:
+    # Single worker: each dump is parsed lazily off its mapping as the corpus is consumed.
+    # Its base date is known up front; the rest of its state once its reviews run out.
+    for path in paths:
+        state = ParserState(base_date=find_base_date(path))
+        yield path, _iter_mapped_dump(path, None, platform, state), state
+
+
+def iter_corpus(paths: List[str], platform: Optional[str] = None, workers: Optional[int] = None, state: Optional[ParserState] = None) -> Iterator[Tuple[str, ParsedReview]]:
+    # Parse many dumps concurrently and yield (path, review) as one corpus in `paths`
+    # order. Days and batches continue across dumps: a dated dump is placed on the
+    # calendar by its Weekly Summary, an undated one is taken to start the day after
+    # the previous dump ends and is dated from its neighbours where it can be. The
+    # corpus base date and day count are written back to `state`.
+    workers = workers or os.cpu_count() or 1
+    if state is None:
+        state = ParserState()
+    if workers > 1 and len(paths) > 1:
+        parsed = _iter_parsed_dumps(paths, platform, workers)
+    else:
+        parsed = _iter_mapped_dumps(paths, platform)
+    day_offset, batch_base, base_date = 0, 0, None
+    held: List[Tuple[str, Iterable[ParsedReview], ParserState]] = []
+    for k, item in enumerate(itertools.chain(parsed, [None])):
+        if item is not None:
+            path, reviews, dump_state = item
+            if base_date is None:
+                # Hold undated dumps until a Weekly Summary says which days they covered;
+                # the last dump has nothing after it to be dated by
+                if dump_state.base_date is None and len(held) + 1 < UNDATED_DUMPS_HELD and k + 1 < len(paths):
+                    held.append((path, list(reviews), dump_state))
+                    continue
+                if dump_state.base_date is not None:
+                    base_date = dump_state.base_date - timedelta(days=day_offset + sum(s.day_index for _, _, s in held))
+            held.append(item)
+        for path, reviews, dump_state in held:
+            if dump_state.base_date is not None:
+                day_offset = (dump_state.base_date - base_date).days
+            for r in reviews:
+                r.day_index += day_offset
+                r.batch_index += batch_base
+                if r.posted_at is None and base_date is not None and r.header_time is not None:
+                    r.posted_at = review_datetime(base_date, r.day_index, header_clock_minutes(r.header_time), r.timestamp)
+                yield path, r
+            day_offset += dump_state.day_index
+            batch_base += dump_state.batch_index + 1
+        held.clear()
+    state.day_index, state.batch_index, state.base_date = day_offset, batch_base - 1, base_date
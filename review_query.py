@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Ad-hoc boolean queries over parsed_reviews.csv, answered from the token index.
+
+    refund AND coins day:20..
+    "money back" OR refund* NOT day:..6
+    (crash OR freeze) AND NOT offline
+
+Words match whole tokens of a review, case-insensitively; a trailing * makes a
+word a prefix. Adjacent terms are ANDed; NOT binds tightest, then AND, then
+OR, and parentheses group. "Quoted phrases" (and words the tokenizer splits,
+like "don't") need their tokens next to each other, which only the review
+text can tell: the posting lists narrow the rows down and just those rows are
+read back. day:A..B, day:A.., day:..B and day:A keep reviews by day_index.
+Everything else is set operations on posting lists.
+"""
+
+import mmap
+import os
+import re
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Iterator, List, Optional, Set, Tuple
+
+from analyze_reviews import OUTPUT_DIR, PARSED_REVIEWS_HEADER, REVIEW_INDEX_FILE
+from review_index import TokenIndex, file_stamp, parse_csv_row, tokenize
+
+
+PARSED_CSV = os.path.join(OUTPUT_DIR, "parsed_reviews.csv")
+TEXT_COL = PARSED_REVIEWS_HEADER.index("review_text")
+SHOW_REVIEWS = 10  # matching reviews printed by the command
+
+QUERY_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"?|day:(-?\d*)(\.\.)?(-?\d*)|([^\s()"]+))')
+
+Node = Tuple  # ("word", token) | ("prefix", prefix) | ("phrase", tokens) | ("day", lo, hi) | ("and", nodes) | ("or", nodes) | ("not", node)
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _lex(query: str) -> Iterator[Tuple[str, object]]:
+    pos = 0
+    query = query.rstrip()
+    while pos < len(query):
+        m = QUERY_TOKEN_RE.match(query, pos)
+        if m is None or m.end() == pos:
+            raise QueryError(f"cannot read query at: {query[pos:]!r}")
+        pos = m.end()
+        lparen, rparen, phrase, day_lo, day_range, day_hi, word = m.groups()
+        if lparen:
+            yield "(", None
+        elif rparen:
+            yield ")", None
+        elif phrase is not None:
+            yield "phrase", phrase
+        elif word is not None:
+            yield (word, None) if word in ("AND", "OR", "NOT") else ("word", word)
+        else:
+            if not day_lo and not day_hi:
+                raise QueryError("day: needs a day or a range, as day:20, day:20.. or day:20..30")
+            lo = int(day_lo) if day_lo else None
+            hi = (int(day_hi) if day_hi else None) if day_range else lo
+            yield "day", (lo, hi)
+
+
+def _term(kind: str, value: str) -> Node:
+    if kind == "word" and value.endswith("*"):
+        tokens = tokenize(value[:-1])
+        if len(tokens) == 1:
+            return ("prefix", tokens[0])
+        if tokens:
+            raise QueryError(f"a prefix must be a single word: {value!r}")
+        raise QueryError(f"nothing to search for in {value!r}")
+    tokens = tokenize(value)
+    if not tokens:
+        raise QueryError(f"nothing to search for in {value!r}")
+    return ("word", tokens[0]) if len(tokens) == 1 else ("phrase", tokens)
+
+
+def parse_query(query: str) -> Node:
+    tokens = list(_lex(query))
+    pos = 0
+
+    def peek() -> Optional[str]:
+        return tokens[pos][0] if pos < len(tokens) else None
+
+    def take() -> Tuple[str, object]:
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def or_expr() -> Node:
+        nodes = [and_expr()]
+        while peek() == "OR":
+            take()
+            nodes.append(and_expr())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def and_expr() -> Node:
+        nodes = [unary()]
+        while peek() not in (None, "OR", ")"):
+            if peek() == "AND":
+                take()
+            nodes.append(unary())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def unary() -> Node:
+        kind, value = take() if pos < len(tokens) else (None, None)
+        if kind == "NOT":
+            return ("not", unary())
+        if kind == "(":
+            node = or_expr()
+            if peek() != ")":
+                raise QueryError("missing )")
+            take()
+            return node
+        if kind == "day":
+            return ("day",) + value
+        if kind in ("word", "phrase"):
+            return _term(kind, value)
+        raise QueryError("query ends too early" if kind is None else f"unexpected {kind}")
+
+    node = or_expr()
+    if pos < len(tokens):
+        raise QueryError(f"unexpected {tokens[pos][0]}")
+    return node
+
+
+class QueryEngine:
+    def __init__(self, index: TokenIndex, csv_path: str) -> None:
+        self.index = index
+        self.csv_path = csv_path
+        self._data: Optional[mmap.mmap] = None
+        self._by_day: Optional[List[int]] = None  # row numbers ordered by day_index
+        self._day_keys: Optional[List[int]] = None  # their days, for bisecting
+
+    def close(self) -> None:
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+
+    def text(self, row: int) -> str:
+        if self._data is None:
+            with open(self.csv_path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        offsets = self.index.offsets
+        return parse_csv_row(self._data[offsets[row]:offsets[row + 1]])[TEXT_COL]
+
+    def search(self, query: str) -> List[int]:
+        # Matching row numbers, ascending
+        return sorted(self._eval(parse_query(query)))
+
+    def _day_span(self, lo: Optional[int], hi: Optional[int]) -> List[int]:
+        # Rows of days lo..hi, either end open; the CSV is mostly in day order, so sorting is cheap
+        if self._by_day is None:
+            days = self.index.days
+            self._by_day = sorted(range(self.index.rows), key=days.__getitem__)
+            self._day_keys = [days[r] for r in self._by_day]
+        start = 0 if lo is None else bisect_left(self._day_keys, lo)
+        end = len(self._by_day) if hi is None else bisect_right(self._day_keys, hi)
+        return self._by_day[start:end]
+
+    def _in_days(self, rows: Set[int], lo: Optional[int], hi: Optional[int]) -> Set[int]:
+        if len(rows) < 1024:
+            days = self.index.days
+            return {r for r in rows if (lo is None or days[r] >= lo) and (hi is None or days[r] <= hi)}
+        return rows.intersection(self._day_span(lo, hi))
+
+    def _eval(self, node: Node) -> Set[int]:
+        kind = node[0]
+        index = self.index
+        if kind == "word":
+            return index.rows_with_token(node[1])
+        if kind == "prefix":
+            return index.rows_with_prefix(node[1])
+        if kind == "phrase":
+            return self._adjacent(node[1], self._with_tokens(node[1], None))
+        if kind == "day":
+            return set(self._day_span(node[1], node[2]))
+        if kind == "or":
+            found: Set[int] = set()
+            for child in node[1]:
+                found |= self._eval(child)
+            return found
+        if kind == "not":
+            return set(range(index.rows)) - self._eval(node[1])
+        # AND: intersect the plain terms and the tokens of phrases first, then filter by days,
+        # check phrases against the text and subtract the NOTs, so the fewest rows are touched
+        children = node[1]
+        rows: Optional[Set[int]] = None
+        for child in children:
+            if child[0] in ("day", "not"):
+                continue
+            if child[0] == "phrase":
+                rows = self._with_tokens(child[1], rows)
+            else:
+                rows = self._eval(child) if rows is None else rows & self._eval(child)
+            if not rows:
+                return set()
+        for child in children:
+            if child[0] == "day":
+                rows = set(self._day_span(child[1], child[2])) if rows is None else self._in_days(rows, child[1], child[2])
+        if rows is None:
+            rows = set(range(index.rows))
+        for child in children:
+            if child[0] == "phrase":
+                rows = self._adjacent(child[1], rows)
+        for child in children:
+            if child[0] == "not" and rows:
+                rows -= self._eval(child[1])
+        return rows
+
+    def _with_tokens(self, tokens: List[str], within: Optional[Set[int]]) -> Set[int]:
+        # Rows holding every token of a phrase, wherever they are
+        rows = within
+        for found in sorted((self.index.rows_with_token(t) for t in set(tokens)), key=len):
+            rows = found if rows is None else rows & found
+            if not rows:
+                break
+        return rows or set()
+
+    def _adjacent(self, tokens: List[str], rows: Set[int]) -> Set[int]:
+        # Of `rows`, those with the tokens next to each other; the only step that reads reviews
+        n = len(tokens)
+        matched = set()
+        for row in rows:
+            words = tokenize(self.text(row))
+            if any(words[i:i + n] == tokens for i in range(len(words) - n + 1)):
+                matched.add(row)
+        return matched
+
+
+def load_index(csv_path: str = PARSED_CSV, index_path: Optional[str] = None) -> TokenIndex:
+    # The saved index, rebuilt and saved again when parsed_reviews.csv has changed since
+    index_path = index_path or REVIEW_INDEX_FILE
+    stamp = file_stamp(csv_path)
+    index = TokenIndex.load(index_path, stamp)
+    if index is None:
+        index = TokenIndex.from_csv(csv_path)
+        index.save(index_path, stamp)
+    return index
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        print(f'Usage: {sys.argv[0]} QUERY [REVIEWS_TO_SHOW]   e.g. \'refund AND coins day:20..\'', file=sys.stderr)
+        sys.exit(2)
+    if not os.path.exists(PARSED_CSV):
+        print(f"No parsed reviews in {OUTPUT_DIR}; run analyze_reviews.py first", file=sys.stderr)
+        sys.exit(1)
+    show = int(sys.argv[2]) if len(sys.argv) > 2 else SHOW_REVIEWS
+    engine = QueryEngine(load_index(), PARSED_CSV)
+    t0 = time.perf_counter()
+    try:
+        rows = engine.search(sys.argv[1])
+    except QueryError as e:
+        print(f"Bad query: {e}", file=sys.stderr)
+        sys.exit(2)
+    elapsed = time.perf_counter() - t0
+    print(f"{len(rows)} reviews match ({elapsed * 1000:.1f} ms)")
+    by_day = Counter(engine.index.days[r] for r in rows)
+    if by_day:
+        print("By day: " + ", ".join(f"{day}: {n}" for day, n in sorted(by_day.items())))
+    for r in rows[:show]:
+        print(f"  [day {engine.index.days[r]}] {engine.text(r)}")
+    engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Rolling mean, standard deviation and z-score of daily counts, kept online.
+
+A RollingScorer holds, per series (a theme, say), its last `window` observed
+counts in a ring buffer together with their sum and sum of squares, so
+appending a day updates only the series observed on it and the history is
+never re-read. A series absent from a day is not observed that day, as with
+pandas' rolling() over a series' rows: the window is its last `window`
+observations, however many days they span. Counts are integers and so are
+both sums, so the variance, (n * squares - sum^2) / n^2, carries no rounding
+drift however long the scorer runs, which running float sums or Welford's
+update with removals would accumulate. The scorer's state is plain JSON
+(to_state / from_state), so it can be saved after one run and carried on by
+the next.
+"""
+
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional
+
+
+WINDOW = 7  # observations
+MIN_PERIODS = 3  # observations in the window before a series is scored
+
+
+@dataclass
+class RollingScore:
+    mean: float
+    std: float  # population standard deviation, as pandas' std(ddof=0)
+    zscore: Optional[float]  # of the latest count; None when every count in the window is the same
+
+
+class RollingScorer:
+    def __init__(self, window: int = WINDOW, min_periods: int = MIN_PERIODS) -> None:
+        self.window = window
+        self.min_periods = min_periods
+        self.last_day: Optional[int] = None
+        self.recent: Dict[str, Deque[int]] = {}  # series -> its last min(observations, window) counts
+        self.sums: Dict[str, int] = {}
+        self.squares: Dict[str, int] = {}
+
+    def append_day(self, day: int, counts: Dict[str, int]) -> Dict[str, RollingScore]:
+        # Observes `day`'s counts and returns the score of every series in `counts` with at
+        # least min_periods observations in its window
+        if self.last_day is not None and day <= self.last_day:
+            raise ValueError(f"day {day} is not after day {self.last_day}")
+        self.last_day = day
+        scores = {}
+        for series, count in counts.items():
+            recent = self.recent.get(series)
+            if recent is None:
+                recent = self.recent[series] = deque(maxlen=self.window)
+                self.sums[series] = 0
+                self.squares[series] = 0
+            if len(recent) == self.window:
+                dropped = recent[0]
+                self.sums[series] -= dropped
+                self.squares[series] -= dropped * dropped
+            recent.append(count)
+            self.sums[series] += count
+            self.squares[series] += count * count
+            score = self.score(series)
+            if score is not None:
+                scores[series] = score
+        return scores
+
+    def score(self, series: str) -> Optional[RollingScore]:
+        recent = self.recent.get(series)
+        if recent is None or len(recent) < self.min_periods:
+            return None
+        n, total = len(recent), self.sums[series]
+        spread = n * self.squares[series] - total * total  # n^2 times the variance, exactly
+        mean = total / n
+        std = math.sqrt(spread) / n
+        return RollingScore(mean, std, (recent[-1] - mean) / std if spread else None)
+
+    def to_state(self) -> Dict:
+        return {
+            "window": self.window,
+            "min_periods": self.min_periods,
+            "last_day": self.last_day,
+            "recent": {series: list(recent) for series, recent in self.recent.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "RollingScorer":
+        scorer = cls(state["window"], state["min_periods"])
+        scorer.last_day = state["last_day"]
+        for series, recent in state["recent"].items():
+            scorer.recent[series] = deque(recent, maxlen=scorer.window)
+            scorer.sums[series] = sum(recent)
+            scorer.squares[series] = sum(count * count for count in recent)
+        return scorer
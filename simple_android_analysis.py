@@ -4,232 +4,113 @@ Android App Review Analysis Tool (No external dependencies)
 Analyzes Android reviews for Pocket FM app to categorize issues and identify trends
 """
 
-import re
 import json
 import csv
-from datetime import datetime
-from collections import defaultdict, Counter
+import sys
+from collections import Counter
+
+from review_parser import expand_sources, iter_corpus
+from match_provenance import MatchProvenance
+from near_duplicates import near_duplicate_clusters
+from parallel_match import match_all
+from taxonomy_store import LiveTaxonomy
+
+# Keyword table for categorize_review, {main category: {subcategory: [keywords]}}, from
+# taxonomies/android_reviews_simple.json. Its compiled matcher is cached on disk, and edits to the file
+# are picked up by the next categorization. Per subcategory the first listed keyword
+# in the review is reported.
+CATEGORY_TAXONOMY = LiveTaxonomy("android_reviews_simple")
+CATEGORIZE_WORKERS = None  # processes categorizing reviews; None uses every core
+# Trends count a cluster of near-duplicate reviews (copies, templates, review campaigns) once
+COUNT_DUPLICATE_CLUSTERS_ONCE = False
+
 
 class AndroidReviewAnalyzer:
     def __init__(self, csv_file_path):
         self.csv_file_path = csv_file_path
         self.reviews_data = []
-        self.categories = {
-            'Ads Related Issues': {
-                'Too many ads / ads gating': [],
-                'Misleading ads / bait-and-switch': [],
-                'Ad quality / inappropriate ads': [],
-                'Ad frequency / interruptions': [],
-                'Forced ad watching': []
-            },
-            'Coins Related Issues': {
-                'Too expensive / high coin cost': [],
-                'Subscription needed / pricing model': [],
-                'Too slow unlock / few free episodes': [],
-                'Coin system confusing': [],
-                'Unauthorized charges / billing issues': []
-            },
-            'Content Discovery Issues': {
-                'Search / discoverability problems': [],
-                'Poor recommendations / irrelevant suggestions': [],
-                'Auto-starts other series': [],
-                'Lack of new content': [],
-                'Content organization / categories': []
-            },
-            'Listening Related Issues': {
-                'Crashes / app not working': [],
-                'Offline / download issues': [],
-                'Buffering / won\'t load': [],
-                'Playback jumps / episode switching': [],
-                'Audio quality / sync issues': [],
-                'Notifications / interruptions': []
-            },
-            'Content Quality Issues': {
-                'AI voices / poor narration quality': [],
-                'Visual vs audio expectation mismatch': [],
-                'Story quality / content issues': [],
-                'Translation / language issues': [],
-                'Missing visual content': []
-            },
-            'User Experience Issues': {
-                'Interface / navigation problems': [],
-                'Login / account issues': [],
-                'Settings / customization problems': [],
-                'App performance / speed': [],
-                'Update / compatibility issues': []
-            },
-            'Support & Service Issues': {
-                'Support unresponsive': [],
-                'Refund / billing disputes': [],
-                'Account recovery problems': [],
-                'Feature requests ignored': [],
-                'Communication / transparency': []
-            },
-            'Localization Issues': {
-                'Missing languages / dubbing': [],
-                'Regional content availability': [],
-                'Cultural adaptation issues': [],
-                'Time zone / scheduling problems': []
-            }
-        }
+        self.matches = MatchProvenance(CATEGORY_TAXONOMY.current().data)  # keyword hits of analyze_reviews
         
     def load_and_parse_reviews(self):
-        """Load and parse the CSV file to extract Android reviews"""
+        """Load and parse the dump to extract Android reviews"""
         print("Loading and parsing reviews...")
         
-        with open(self.csv_file_path, 'r', encoding='utf-8', errors='ignore') as file:
-            content = file.read()
-        
-        # Split by Appbot timestamps to identify individual review sessions
-        sessions = re.split(r'Appbot: App review alerts & repliesAPP \d+:\d+ [AP]M', content)
-        
+        # Google Play reviews of one dump, or of a directory or glob of dumps parsed
+        # concurrently; days are the parser's calendar days, reconstructed from alert times
         day_counter = 0
-        
-        for session in sessions[1:]:  # Skip the first empty split
-            lines = session.strip().split('\n')
-            i = 0
-            
-            while i < len(lines):
-                line = lines[i].strip()
-                
-                # Look for timestamp pattern (e.g., "12:26")
-                time_match = re.match(r'^(\d{1,2}):(\d{2})$', line)
-                if time_match and i + 1 < len(lines):
-                    # Check if next line contains "Pocket FM: Audio Series (Google Play)"
-                    next_line = lines[i + 1].strip()
-                    if "Pocket FM: Audio Series (Google Play)" in next_line:
-                        # Found an Android review
-                        if i + 2 < len(lines):
-                            rating_line = lines[i + 2].strip()
-                            # Extract rating and reviewer info
-                            rating_match = re.search(r'★+.*?by (.*?) ·', rating_line)
-                            if rating_match:
-                                reviewer = rating_match.group(1)
-                                stars = rating_line.count('★')
-                                
-                                # Extract review text (next few lines until we hit reply/permalink/translate)
-                                review_text = ""
-                                j = i + 3
-                                while j < len(lines) and not any(keyword in lines[j].lower() for keyword in ['reply', 'permalink', 'translate', 'english ·', 'spanish ·', 'german ·', 'danish ·']):
-                                    if lines[j].strip() and not lines[j].strip().startswith('---'):
-                                        if "Translation" not in lines[j]:
-                                            review_text += lines[j].strip() + " "
-                                    j += 1
-                                
-                                if review_text.strip():
-                                    review = {
-                                        'timestamp': f"{time_match.group(1)}:{time_match.group(2)}",
-                                        'day': day_counter,
-                                        'reviewer': reviewer,
-                                        'stars': stars,
-                                        'text': review_text.strip().strip('"'),
-                                        'platform': 'Android'
-                                    }
-                                    self.reviews_data.append(review)
-                
-                i += 1
-            
-            day_counter += 1
+        for _, record in iter_corpus(expand_sources(self.csv_file_path), platform='Android'):
+            if record.batch_index < 0:
+                continue
+            day_counter = max(day_counter, record.day_index)
+            review_text = record.review_text.strip('"')
+            if review_text:
+                review = {
+                    'timestamp': record.timestamp,
+                    'posted_at': record.posted_at,
+                    'day': record.day_index,
+                    'reviewer': record.reviewer,
+                    'stars': record.rating,
+                    'text': review_text,
+                    'platform': 'Android'
+                }
+                self.reviews_data.append(review)
             
         print(f"Parsed {len(self.reviews_data)} Android reviews across {day_counter} days")
         return self.reviews_data
     
-    def categorize_review(self, review_text):
-        """Categorize a single review into themes and sub-categories"""
-        review_lower = review_text.lower()
-        categories_found = []
-        
-        # Define keyword patterns for each category and subcategory
-        patterns = {
-            'Ads Related Issues': {
-                'Too many ads / ads gating': ['too many ads', 'ads every', 'constant ads', 'ad after ad', 'ads gating', 'watch ads', 'ads to unlock', 'ads for coins', 'so many ads', 'ads everywhere'],
-                'Misleading ads / bait-and-switch': ['misleading ad', 'false ad', 'ad different', 'nothing like ad', 'ad shows', 'facebook ad', 'advertisement lie', 'fake ad', 'ads lie'],
-                'Ad quality / inappropriate ads': ['inappropriate ads', 'bad ads', 'annoying ads', 'stupid ads', 'ads suck', 'terrible ads'],
-                'Ad frequency / interruptions': ['ads interrupt', 'ads break', 'ads pause', 'ads in middle', 'constant interruption'],
-                'Forced ad watching': ['forced to watch', 'must watch ads', 'cant skip ads', 'skip ad', 'forced ads']
-            },
-            'Coins Related Issues': {
-                'Too expensive / high coin cost': ['too expensive', 'cost too much', 'overpriced', 'ridiculous price', 'money pit', 'expensive coins', '$', 'euro', '€', 'price', 'costly', 'expensive', 'costs', 'spend', 'spent'],
-                'Subscription needed / pricing model': ['subscription', 'monthly fee', 'pay to', 'premium', 'subscription model', 'recurring payment', 'subscribe'],
-                'Too slow unlock / few free episodes': ['only free', 'few free', 'slow unlock', 'limited free', 'not enough free', 'unlock slow'],
-                'Coin system confusing': ['confusing coins', 'dont understand coins', 'coin system', 'how coins work', 'coins confusing'],
-                'Unauthorized charges / billing issues': ['charged without', 'unauthorized', 'auto charge', 'unexpected charge', 'billing issue', 'money taken', 'charged me', 'auto pay']
-            },
-            'Content Discovery Issues': {
-                'Search / discoverability problems': ['cant find', 'search not work', 'hard to find', 'search broken', 'discover', 'find stories'],
-                'Poor recommendations / irrelevant suggestions': ['bad recommend', 'irrelevant suggest', 'wrong suggest', 'recommendations suck', 'bad suggestions'],
-                'Auto-starts other series': ['auto start', 'starts other', 'switches story', 'changes series', 'jumps to other'],
-                'Lack of new content': ['no new content', 'same stories', 'need more content', 'limited content', 'more stories'],
-                'Content organization / categories': ['organize', 'categories', 'sort', 'filter', 'organize content']
-            },
-            'Listening Related Issues': {
-                'Crashes / app not working': ['crash', 'not working', 'wont work', 'broken', 'stops working', 'app freeze', 'freezes', 'crashes'],
-                'Offline / download issues': ['offline', 'download', 'cant download', 'offline not work', 'download problem'],
-                'Buffering / won\'t load': ['buffering', 'wont load', 'loading', 'buffer', 'slow load', 'loads slow'],
-                'Playback jumps / episode switching': ['jumps episode', 'skips', 'playback issue', 'episode jump', 'skipping'],
-                'Audio quality / sync issues': ['audio quality', 'sound quality', 'sync issue', 'audio sync', 'sound problem'],
-                'Notifications / interruptions': ['notification', 'interrupt', 'pause', 'stop playing', 'interruptions']
-            },
-            'Content Quality Issues': {
-                'AI voices / poor narration quality': ['ai voice', 'robot voice', 'artificial voice', 'bad voice', 'voice quality', 'narration', 'narrator', 'robotic', 'computer voice'],
-                'Visual vs audio expectation mismatch': ['expected video', 'thought video', 'no video', 'audio only', 'visual expect', 'no pictures'],
-                'Story quality / content issues': ['bad story', 'story quality', 'poor content', 'story suck', 'boring story'],
-                'Translation / language issues': ['translation', 'language', 'subtitle', 'english', 'translate'],
-                'Missing visual content': ['no visual', 'no picture', 'no image', 'audio only', 'no graphics']
-            },
-            'User Experience Issues': {
-                'Interface / navigation problems': ['interface', 'navigation', 'ui', 'user interface', 'hard to use', 'confusing interface'],
-                'Login / account issues': ['login', 'account', 'sign in', 'password', 'login problem'],
-                'Settings / customization problems': ['settings', 'customize', 'options', 'preferences', 'settings not work'],
-                'App performance / speed': ['slow app', 'app slow', 'performance', 'lag', 'sluggish', 'slow'],
-                'Update / compatibility issues': ['update', 'version', 'compatibility', 'android version', 'update problem']
-            },
-            'Support & Service Issues': {
-                'Support unresponsive': ['support', 'customer service', 'help', 'contact', 'response', 'unresponsive', 'no response'],
-                'Refund / billing disputes': ['refund', 'money back', 'billing', 'charge dispute', 'want refund'],
-                'Account recovery problems': ['account recovery', 'lost account', 'cant access', 'recover account'],
-                'Feature requests ignored': ['feature request', 'suggestion ignored', 'want feature', 'ignore request'],
-                'Communication / transparency': ['communication', 'transparency', 'information', 'explain', 'no communication']
-            },
-            'Localization Issues': {
-                'Missing languages / dubbing': ['language', 'dubbing', 'hindi', 'spanish', 'german', 'french', 'local language', 'other language'],
-                'Regional content availability': ['region', 'country', 'available in', 'geographic', 'not available'],
-                'Cultural adaptation issues': ['cultural', 'culture', 'local custom', 'cultural content'],
-                'Time zone / scheduling problems': ['time zone', 'schedule', 'timing', 'time difference']
+    @staticmethod
+    def category_entries(matches):
+        """matcher.match results as categorize_review reports them"""
+        return [
+            {
+                'main_category': main_category,
+                'subcategory': subcategory,
+                'keyword_matched': keyword
             }
-        }
-        
-        for main_category, subcategories in patterns.items():
-            for subcategory, keywords in subcategories.items():
-                for keyword in keywords:
-                    if keyword in review_lower:
-                        categories_found.append({
-                            'main_category': main_category,
-                            'subcategory': subcategory,
-                            'keyword_matched': keyword
-                        })
-                        break  # Only count once per subcategory per review
-        
-        return categories_found
+            for main_category, subcategory, keyword in matches
+        ]
+
+    def categorize_review(self, review_text, matcher=None):
+        """Categorize a single review into themes and sub-categories"""
+        matcher = matcher or CATEGORY_TAXONOMY.matcher()
+        return self.category_entries(matcher.match(review_text))
+
+    def categorize_many(self, texts, matcher=None, workers=1):
+        """Categorize a batch of reviews; one result list per text, in order. With workers > 1
+        (None: every core) chunks are matched in worker processes"""
+        matcher = matcher or CATEGORY_TAXONOMY.matcher()
+        return [self.category_entries(matches) for matches in match_all(texts, matcher, 'match', workers)]
     
     def analyze_reviews(self):
         """Analyze all reviews and categorize them"""
         print("Categorizing reviews...")
         
-        for review in self.reviews_data:
-            categories = self.categorize_review(review['text'])
-            review['categories'] = categories
+        # One taxonomy for the whole pass; a rerun after the file changes re-categorizes the parsed reviews
+        taxonomy = CATEGORY_TAXONOMY.current()
+        self.matches = MatchProvenance(taxonomy.data)
+        all_hits = match_all([review['text'] for review in self.reviews_data], taxonomy.matcher(), 'match_ids', CATEGORIZE_WORKERS)
+        for review_id, (review, hits) in enumerate(zip(self.reviews_data, all_hits)):
+            review['categories'] = [self.matches.entry(sub_id, keyword_index) for sub_id, keyword_index, _ in hits]
             
             # Add to category tracking
-            for cat in categories:
-                main_cat = cat['main_category']
-                sub_cat = cat['subcategory']
-                self.categories[main_cat][sub_cat].append({
-                    'review': review,
-                    'keyword': cat['keyword_matched']
-                })
+            for sub_id, keyword_index, offset in hits:
+                self.matches.add(review_id, sub_id, keyword_index, offset)
         
         print("Categorization complete!")
+
+    def matched_reviews(self, main_cat, sub_cat):
+        """Drill-down: (review, keyword, offset in the lowercased text) of every match of a subcategory"""
+        return [(self.reviews_data[review_id], keyword, offset) for review_id, keyword, offset in self.matches.hits(main_cat, sub_cat)]
+
+    def assign_duplicate_clusters(self):
+        """Give every review a near-duplicate cluster id, the index of the cluster's first review;
+        a review with no near-duplicate is its own cluster"""
+        print("Finding near-duplicate reviews...")
+        cluster_ids = near_duplicate_clusters(review['text'] for review in self.reviews_data)
+        for review, cluster_id in zip(self.reviews_data, cluster_ids):
+            review['duplicate_cluster'] = cluster_id
+        sizes = [n for n in Counter(cluster_ids).values() if n > 1]
+        print(f"{sum(sizes)} reviews in {len(sizes)} near-duplicate clusters")
         
     def calculate_statistics(self, values):
         """Calculate basic statistics without numpy"""
@@ -241,27 +122,31 @@ class AndroidReviewAnalyzer:
         std_dev = variance ** 0.5
         return mean, std_dev
         
-    def generate_daily_trends(self):
-        """Generate day-on-day trend analysis"""
+    def generate_daily_trends(self, count_clusters_once=COUNT_DUPLICATE_CLUSTERS_ONCE):
+        """Generate day-on-day trend analysis. With count_clusters_once only the first review
+        of each near-duplicate cluster is counted"""
         print("Analyzing daily trends...")
         
-        # Group reviews by day and category
-        daily_data = defaultdict(lambda: defaultdict(int))
-        daily_subcategory_data = defaultdict(lambda: defaultdict(int))
-        
-        for review in self.reviews_data:
-            day = review['day']
-            for cat in review['categories']:
-                main_cat = cat['main_category']
-                sub_cat = cat['subcategory']
-                daily_data[day][main_cat] += 1
-                daily_subcategory_data[day][f"{main_cat} > {sub_cat}"] += 1
+        # Group reviews by day and category, zero-filled: every day from the first review to
+        # the last is in the series, so a quiet day counts as zero instead of vanishing
+        review_days = [review['day'] for review in self.reviews_data]
+        all_days = range(min(review_days), max(review_days) + 1) if review_days else range(0)
+        daily_data = {day: dict.fromkeys(self.matches.category_names(), 0) for day in all_days}
+        daily_subcategory_data = {day: {f"{main_cat} > {sub_cat}": 0 for main_cat, sub_cat in self.matches.subs} for day in all_days}
+        
+        for review_id, sub_id in zip(self.matches.hit_reviews, self.matches.hit_subs):
+            if count_clusters_once and self.reviews_data[review_id].get('duplicate_cluster', review_id) != review_id:
+                continue
+            day = review_days[review_id]
+            main_cat, sub_cat = self.matches.subs[sub_id]
+            daily_data[day][main_cat] += 1
+            daily_subcategory_data[day][f"{main_cat} > {sub_cat}"] += 1
         
         # Calculate trends and anomalies
         trends = {}
         anomalies = []
         
-        for main_cat in self.categories.keys():
+        for main_cat in self.matches.category_names():
             daily_counts = []
             days = sorted(daily_data.keys())
             
@@ -312,30 +197,31 @@ class AndroidReviewAnalyzer:
         }
         
         # Category summary
-        for main_cat, subcategories in self.categories.items():
-            total_issues = sum(len(issues) for issues in subcategories.values())
+        counts = self.matches.counts()
+        for main_cat, subcategories in counts.items():
+            total_issues = sum(subcategories.values())
             insights['category_summary'][main_cat] = {
                 'total_count': total_issues,
                 'percentage': (total_issues / len(self.reviews_data)) * 100 if len(self.reviews_data) > 0 else 0,
                 'subcategories': {}
             }
             
-            for sub_cat, issues in subcategories.items():
-                if len(issues) > 0:
+            for sub_cat, hits in subcategories.items():
+                if hits > 0:
                     insights['category_summary'][main_cat]['subcategories'][sub_cat] = {
-                        'count': len(issues),
-                        'percentage_of_category': (len(issues) / total_issues) * 100 if total_issues > 0 else 0
+                        'count': hits,
+                        'percentage_of_category': (hits / total_issues) * 100 if total_issues > 0 else 0
                     }
         
         # Top issues
         all_subcategory_counts = []
-        for main_cat, subcategories in self.categories.items():
-            for sub_cat, issues in subcategories.items():
-                if len(issues) > 0:
+        for main_cat, subcategories in counts.items():
+            for sub_cat, hits in subcategories.items():
+                if hits > 0:
                     all_subcategory_counts.append({
                         'main_category': main_cat,
                         'subcategory': sub_cat,
-                        'count': len(issues)
+                        'count': hits
                     })
         
         insights['top_issues'] = sorted(all_subcategory_counts, key=lambda x: x['count'], reverse=True)[:10]
@@ -360,16 +246,18 @@ class AndroidReviewAnalyzer:
         # Save parsed reviews
         with open('/workspace/android_analysis_output/android_parsed_reviews.csv', 'w', newline='', encoding='utf-8') as f:
             if self.reviews_data:
-                writer = csv.DictWriter(f, fieldnames=['timestamp', 'day', 'reviewer', 'stars', 'text', 'platform'])
+                writer = csv.DictWriter(f, fieldnames=['timestamp', 'posted_at', 'day', 'reviewer', 'stars', 'text', 'platform', 'duplicate_cluster'])
                 writer.writeheader()
                 for review in self.reviews_data:
                     writer.writerow({
                         'timestamp': review['timestamp'],
+                        'posted_at': review['posted_at'],
                         'day': review['day'],
                         'reviewer': review['reviewer'],
                         'stars': review['stars'],
                         'text': review['text'],
-                        'platform': review['platform']
+                        'platform': review['platform'],
+                        'duplicate_cluster': review.get('duplicate_cluster', '')
                     })
         
         # Save category counts
@@ -383,11 +271,11 @@ class AndroidReviewAnalyzer:
         with open('/workspace/android_analysis_output/android_subcategory_details.csv', 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             writer.writerow(['main_category', 'subcategory', 'count', 'percentage_of_total'])
-            for main_cat, subcategories in self.categories.items():
-                for sub_cat, issues in subcategories.items():
-                    if len(issues) > 0:
-                        percentage = (len(issues) / len(self.reviews_data)) * 100 if len(self.reviews_data) > 0 else 0
-                        writer.writerow([main_cat, sub_cat, len(issues), f"{percentage:.2f}"])
+            for main_cat, subcategories in self.matches.counts().items():
+                for sub_cat, hits in subcategories.items():
+                    if hits > 0:
+                        percentage = (hits / len(self.reviews_data)) * 100 if len(self.reviews_data) > 0 else 0
+                        writer.writerow([main_cat, sub_cat, hits, f"{percentage:.2f}"])
         
         # Save daily trends
         with open('/workspace/android_analysis_output/android_daily_trends.csv', 'w', newline='', encoding='utf-8') as f:
@@ -416,7 +304,8 @@ class AndroidReviewAnalyzer:
         return insights
 
 def main():
-    analyzer = AndroidReviewAnalyzer('/workspace/App reviews dump - Sheet1.csv')
+    # A dump, a directory of dumps or a glob may be given on the command line
+    analyzer = AndroidReviewAnalyzer(sys.argv[1] if len(sys.argv) > 1 else '/workspace/App reviews dump - Sheet1.csv')
     
     # Load and parse reviews
     analyzer.load_and_parse_reviews()
@@ -424,6 +313,9 @@ def main():
     # Categorize reviews
     analyzer.analyze_reviews()
     
+    # Group near-duplicate reviews
+    analyzer.assign_duplicate_clusters()
+    
     # Generate trends and anomalies
     trends, anomalies, daily_data, daily_subcategory_data = analyzer.generate_daily_trends()
     
@@ -437,7 +329,7 @@ def main():
     print("ANDROID REVIEW ANALYSIS COMPLETE")
     print("="*60)
     print(f"Total Android reviews analyzed: {len(analyzer.reviews_data)}")
-    print(f"Categories identified: {len(analyzer.categories)}")
+    print(f"Categories identified: {len(analyzer.matches.category_names())}")
     print(f"Anomalies detected: {len(anomalies)}")
     
     if insights['top_issues']:
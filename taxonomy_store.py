@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Versioned taxonomy files and their compiled matchers.
+
+Each taxonomy lives in taxonomies/<name>.json with a format number, an
+integer version bumped on every edit, a kind and the taxonomy itself; a
+keywords taxonomy may add "languages", keyword blocks in other languages
+under the same categories (LanguageMatcher). A taxonomy is identified by a
+digest of its kind, contents and the matcher version, so whitespace or
+version-only edits keep their compiled matcher. Compiled matchers are
+pickled under MATCHER_CACHE_DIR by digest; start-up reads them back instead
+of rebuilding the automata. LiveTaxonomy re-reads a file when it changes on
+disk, so a long-running process picks up edits without restarting or
+re-parsing reviews.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from keyword_automaton import MATCHER_VERSION, LanguageMatcher, PatternTableMatcher, TaxonomyMatcher
+from output_paths import CACHE_DIR
+
+
+TAXONOMY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "taxonomies")
+MATCHER_CACHE_DIR = os.path.join(CACHE_DIR, "matchers")
+TAXONOMY_FORMAT = 1
+RELOAD_CHECK_SECONDS = 2.0  # LiveTaxonomy stats its file at most this often
+
+KIND_KEYWORDS = "keywords"  # {category: {subcategory: [keywords]}}, matched from word starts (TaxonomyMatcher)
+KIND_SUBSTRINGS = "substrings"  # {category: {subcategory: [keywords]}}, matched anywhere (PatternTableMatcher)
+KIND_THEMES = "themes"  # theme mappings and regex rules for run_review_analysis; nothing to precompile
+
+MATCHER_CLASSES = {KIND_KEYWORDS: TaxonomyMatcher, KIND_SUBSTRINGS: PatternTableMatcher}
+
+_COMPILED: Dict[str, Any] = {}  # digest -> matcher, per process
+
+
+@dataclass(frozen=True)
+class Taxonomy:
+    name: str
+    version: int
+    kind: str
+    digest: str
+    data: Any
+    languages: Dict[str, Any] = field(default_factory=dict)  # {language: {category: {subcategory: [keywords]}}}
+
+    def matcher(self):
+        return compiled_matcher(self.kind, self.data, self.digest, self.languages)
+
+
+def taxonomy_path(name: str, directory: str = TAXONOMY_DIR) -> str:
+    return os.path.join(directory, f"{name}.json")
+
+
+def taxonomy_digest(kind: str, data: Any, languages: Optional[Dict[str, Any]] = None) -> str:
+    # Key order is kept: it decides the order categories are reported in. Language blocks count
+    # only when there are some, so taxonomies without them keep their digest.
+    payload = {"format": TAXONOMY_FORMAT, "kind": kind, "matcher": MATCHER_VERSION, "taxonomy": data}
+    if languages:
+        payload["languages"] = languages
+    payload = json.dumps(payload, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def parse_taxonomy(raw: bytes, name: str) -> Taxonomy:
+    doc = json.loads(raw)
+    if not isinstance(doc, dict) or doc.get("format") != TAXONOMY_FORMAT:
+        raise ValueError(f"taxonomy {name}: not a taxonomy file of format {TAXONOMY_FORMAT}")
+    kind = doc.get("kind")
+    if kind not in (KIND_KEYWORDS, KIND_SUBSTRINGS, KIND_THEMES):
+        raise ValueError(f"taxonomy {name}: unknown kind {kind!r}")
+    version = doc.get("version")
+    if not isinstance(version, int):
+        raise ValueError(f"taxonomy {name}: version must be an integer")
+    data = doc.get("taxonomy")
+    if kind in MATCHER_CLASSES:
+        if not isinstance(data, dict) or not all(
+            isinstance(subs, dict) and all(isinstance(kws, list) and all(isinstance(k, str) for k in kws) for kws in subs.values())
+            for subs in data.values()
+        ):
+            raise ValueError(f"taxonomy {name}: expected {{category: {{subcategory: [keywords]}}}}")
+    languages = doc.get("languages", {})
+    if languages and kind != KIND_KEYWORDS:
+        raise ValueError(f"taxonomy {name}: only {KIND_KEYWORDS} taxonomies take languages")
+    if not isinstance(languages, dict) or not all(
+        isinstance(block, dict) and all(
+            cat in data and isinstance(subs, dict) and all(
+                sub in data[cat] and isinstance(kws, list) and all(isinstance(k, str) for k in kws) for sub, kws in subs.items()
+            )
+            for cat, subs in block.items()
+        )
+        for block in languages.values()
+    ):
+        raise ValueError(f"taxonomy {name}: expected languages as {{language: {{category: {{subcategory: [keywords]}}}}}} of the taxonomy's subcategories")
+    return Taxonomy(name, version, kind, taxonomy_digest(kind, data, languages), data, languages)
+
+
+def load_taxonomy(name: str, directory: str = TAXONOMY_DIR) -> Taxonomy:
+    with open(taxonomy_path(name, directory), "rb") as f:
+        return parse_taxonomy(f.read(), name)
+
+
+def compiled_matcher(kind: str, data: Any, digest: Optional[str] = None, languages: Optional[Dict[str, Any]] = None):
+    # The matcher for a taxonomy: from this process, else from the on-disk cache, else built and
+    # cached. With language blocks it is a LanguageMatcher.
+    if kind not in MATCHER_CLASSES:
+        raise ValueError(f"taxonomy kind {kind!r} has no compiled matcher")
+    if languages and kind != KIND_KEYWORDS:
+        raise ValueError(f"taxonomy kind {kind!r} takes no languages")
+    matcher_class = LanguageMatcher if languages else MATCHER_CLASSES[kind]
+    digest = digest or taxonomy_digest(kind, data, languages)
+    matcher = _COMPILED.get(digest)
+    if matcher is not None:
+        return matcher
+    path = os.path.join(MATCHER_CACHE_DIR, f"{digest}.pickle")
+    try:
+        with open(path, "rb") as f:
+            matcher = pickle.load(f)
+        if not isinstance(matcher, matcher_class):
+            matcher = None
+    except Exception:
+        # A truncated or stale pickle can fail in almost any way; it is rebuilt and overwritten
+        matcher = None
+    if matcher is None:
+        matcher = matcher_class(data, languages) if languages else matcher_class(data)
+        try:
+            os.makedirs(MATCHER_CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(matcher, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # a read-only cache only costs the next process a rebuild
+    _COMPILED[digest] = matcher
+    return matcher
+
+
+class LiveTaxonomy:
+    """A taxonomy file that is re-read when it changes; a broken edit keeps the last good taxonomy."""
+
+    def __init__(self, name: str, directory: str = TAXONOMY_DIR, check_every: float = RELOAD_CHECK_SECONDS) -> None:
+        self.path = taxonomy_path(name, directory)
+        self.name = name
+        self.check_every = check_every
+        self.checked_at = time.monotonic()
+        self.stamp = self._stamp()
+        with open(self.path, "rb") as f:
+            self.taxonomy = parse_taxonomy(f.read(), name)
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def current(self) -> Taxonomy:
+        now = time.monotonic()
+        if now - self.checked_at < self.check_every:
+            return self.taxonomy
+        self.checked_at = now
+        stamp = self._stamp()
+        if stamp is None or stamp == self.stamp:
+            return self.taxonomy
+        self.stamp = stamp
+        try:
+            with open(self.path, "rb") as f:
+                taxonomy = parse_taxonomy(f.read(), self.name)
+        except (OSError, ValueError) as e:
+            print(f"Keeping taxonomy {self.name} v{self.taxonomy.version}: {e}", file=sys.stderr)
+            return self.taxonomy
+        if taxonomy.digest != self.taxonomy.digest:
+            print(f"Reloaded taxonomy {self.name}: v{self.taxonomy.version} -> v{taxonomy.version}", file=sys.stderr)
+        self.taxonomy = taxonomy
+        return taxonomy
+
+    def matcher(self):
+        return self.current().matcher()
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyze_reviews
+import recategorize
+import review_cache
+import taxonomy_store
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Two exports of the same app that share most of their reviews
+EXPORT_A = os.path.join(REPO_DIR, "app review dump")
+EXPORT_B = os.path.join(REPO_DIR, "App reviews dump - Sheet1.csv")
+HEADER = "Appbot: App review alerts & replies\n"  # starts every alert batch of EXPORT_A
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    # Every output, checkpoint and cache of the pipeline goes under tmp_path
+    out = str(tmp_path / "analysis_output")
+    monkeypatch.setattr(analyze_reviews, "OUTPUT_DIR", out)
+    monkeypatch.setattr(analyze_reviews, "CHECKPOINT_FILE", os.path.join(out, "parse_checkpoint.json"))
+    monkeypatch.setattr(analyze_reviews, "DEDUP_DIR", os.path.join(out, "dedup"))
+    monkeypatch.setattr(analyze_reviews, "REVIEW_INDEX_FILE", os.path.join(out, "review_index.bin"))
+    monkeypatch.setattr(analyze_reviews, "APPLIED_TAXONOMY_FILE", os.path.join(out, "taxonomy_applied.json"))
+    # recategorize imported its own copies of the paths
+    for name in ["OUTPUT_DIR", "CHECKPOINT_FILE", "REVIEW_INDEX_FILE", "APPLIED_TAXONOMY_FILE"]:
+        monkeypatch.setattr(recategorize, name, getattr(analyze_reviews, name))
+    monkeypatch.setattr(taxonomy_store, "MATCHER_CACHE_DIR", os.path.join(out, "cache", "matchers"))
+    monkeypatch.setattr(review_cache, "CACHE_DIR", os.path.join(out, "cache"))
+    monkeypatch.setattr(review_cache, "SOURCE_DIGESTS_FILE", os.path.join(out, "cache", "sources.json"))
+    return out
+
+
+def alert_batches(path=EXPORT_A):
+    # The text of `path` cut before every alert batch; joined with HEADER it is the file again
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().split(HEADER)
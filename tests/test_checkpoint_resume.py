@@ -0,0 +1,113 @@
+import os
+import shutil
+
+import pytest
+
+import analyze_reviews
+from conftest import HEADER, alert_batches
+from review_dedup import FingerprintStore
+from review_index import TokenIndex, TokenIndexBuilder, file_stamp
+
+
+OUTPUT_FILES = ["parsed_reviews.csv", "trends.json", "report.md"]
+CUTS = [200, 400]  # alert batches in the dump at each earlier run; week summaries fall between them
+
+
+def run_incremental(source):
+    with FingerprintStore(analyze_reviews.DEDUP_DIR) as store:
+        analyze_reviews.run_incremental(source, analyze_reviews.build_taxonomy(), store=store, languages=analyze_reviews.build_language_taxonomies())
+
+
+def outputs(output_dir):
+    found = {}
+    for name in OUTPUT_FILES:
+        with open(os.path.join(output_dir, name), "rb") as f:
+            found[name] = f.read()
+    index = TokenIndex.load(analyze_reviews.REVIEW_INDEX_FILE, file_stamp(os.path.join(output_dir, "parsed_reviews.csv")))
+    assert index is not None
+    found["index"] = (index.tokens, [list(ids) for ids in index.postings], list(index.offsets), list(index.days))
+    return found
+
+
+def write_dump(path, batches):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER.join(batches))
+
+
+def test_resumed_runs_match_a_full_run(output_dir, tmp_path):
+    batches = alert_batches()
+    dump = str(tmp_path / "growing dump")
+    for cut in CUTS:
+        write_dump(dump, batches[:cut])
+        run_incremental(dump)
+    write_dump(dump, batches)
+    # Appbot only appended, so the last run resumes from the checkpoint
+    assert analyze_reviews.load_checkpoint(dump, analyze_reviews.build_taxonomy(), analyze_reviews.build_language_taxonomies()) is not None
+    run_incremental(dump)
+    resumed = outputs(output_dir)
+
+    shutil.rmtree(output_dir)
+    run_incremental(dump)
+    assert outputs(output_dir) == resumed
+
+
+def test_checkpoint_is_dropped_when_the_parsed_prefix_changes(output_dir, tmp_path):
+    batches = alert_batches()
+    dump = str(tmp_path / "edited dump")
+    write_dump(dump, batches[:CUTS[-1]])
+    run_incremental(dump)
+    taxonomy, languages = analyze_reviews.build_taxonomy(), analyze_reviews.build_language_taxonomies()
+    assert analyze_reviews.load_checkpoint(dump, taxonomy, languages) is not None
+    # Same length, one review edited halfway through what was already parsed
+    edited = batches[:CUTS[-1]]
+    middle = len(edited) // 2
+    edited[middle] = edited[middle].replace("a", "e", 1)
+    write_dump(dump, edited)
+    assert analyze_reviews.load_checkpoint(dump, taxonomy, languages) is None
+
+
+def test_token_index_round_trip(tmp_path):
+    builder = TokenIndexBuilder(start=10)
+    for day, text in enumerate(["App crashes on start", "crash after update", "Great stories", "Ads, ads and more ads"]):
+        builder.add(text, 20 + day, day)
+    index = builder.build()
+    path = str(tmp_path / "index.bin")
+    index.save(path, (123, 456))
+
+    loaded = TokenIndex.load(path, (123, 456))
+    assert loaded.tokens == index.tokens
+    assert [list(ids) for ids in loaded.postings] == [list(ids) for ids in index.postings]
+    assert list(loaded.offsets) == list(index.offsets) and list(loaded.days) == list(index.days)
+    assert loaded.rows_with_prefix("crash") == {0, 1}
+    # Saved for another version of the CSV
+    assert TokenIndex.load(path, (123, 457)) is None
+    assert TokenIndex.load(str(tmp_path / "missing.bin")) is None
+
+
+def test_token_index_resume(tmp_path):
+    texts = ["App crashes on start", "crash after update", "Great stories", "Ads, ads and more ads"]
+    full = TokenIndexBuilder(start=10)
+    for day, text in enumerate(texts):
+        full.add(text, 20 + day, day)
+    index = full.build()
+
+    # Cut back after two rows and the other two added again: the same index as one pass
+    builder = index.resume(index.offsets[2])
+    assert builder.build().rows == 2
+    for day, text in enumerate(texts[2:], start=2):
+        builder.add(text, 20 + day, day)
+    resumed = builder.build()
+    assert resumed.tokens == index.tokens
+    assert [list(ids) for ids in resumed.postings] == [list(ids) for ids in index.postings]
+    assert list(resumed.offsets) == list(index.offsets) and list(resumed.days) == list(index.days)
+    # Not the end of a row
+    assert index.resume(index.offsets[2] + 1) is None
+
+
+@pytest.mark.parametrize("rows", [0, 4])
+def test_token_index_resume_at_the_ends(rows):
+    builder = TokenIndexBuilder(start=10)
+    for day, text in enumerate(["one review", "two reviews", "three", "four"]):
+        builder.add(text, 12, day)
+    index = builder.build()
+    assert index.resume(index.offsets[rows]).build().rows == rows
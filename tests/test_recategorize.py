@@ -0,0 +1,69 @@
+import copy
+import os
+import shutil
+
+import pytest
+
+import analyze_reviews
+from conftest import EXPORT_B
+from recategorize import recategorize_outputs
+from review_dedup import FingerprintStore
+from review_index import TokenIndex, file_stamp
+
+
+OUTPUT_FILES = ["parsed_reviews.csv", "trends.json", "report.md"]
+
+
+def add_keyword(taxonomy, languages):
+    taxonomy["Playback & Performance"]["Crashes / app not working"].append("story")
+
+
+def remove_keyword(taxonomy, languages):
+    keywords = taxonomy["Monetization & Pricing"]["Too expensive / high coin cost"]
+    keywords.remove(keywords[0])
+
+
+def add_subcategory(taxonomy, languages):
+    taxonomy["Content & UX"]["Stories"] = ["stories", "story"]
+
+
+def add_language_keyword(taxonomy, languages):
+    category = next(iter(languages["Spanish"]))
+    subcategory = next(iter(languages["Spanish"][category]))
+    languages["Spanish"][category][subcategory].append("historia")
+
+
+def run_incremental(taxonomy, languages):
+    with FingerprintStore(analyze_reviews.DEDUP_DIR) as store:
+        analyze_reviews.run_incremental(EXPORT_B, taxonomy, store=store, languages=languages)
+
+
+def outputs(output_dir):
+    found = {}
+    for name in OUTPUT_FILES:
+        with open(os.path.join(output_dir, name), "rb") as f:
+            found[name] = f.read()
+    index = TokenIndex.load(analyze_reviews.REVIEW_INDEX_FILE, file_stamp(os.path.join(output_dir, "parsed_reviews.csv")))
+    assert index is not None
+    found["index"] = (index.tokens, [list(ids) for ids in index.postings], list(index.offsets), list(index.days))
+    return found
+
+
+@pytest.mark.parametrize("edit", [add_keyword, remove_keyword, add_subcategory, add_language_keyword])
+def test_edit_matches_a_full_run(output_dir, edit):
+    taxonomy, languages = analyze_reviews.build_taxonomy(), analyze_reviews.build_language_taxonomies()
+    run_incremental(taxonomy, languages)
+    taxonomy, languages = copy.deepcopy(taxonomy), copy.deepcopy(languages)
+    edit(taxonomy, languages)
+
+    stats = recategorize_outputs(taxonomy, languages)
+    assert stats["updated"] > 0
+    relabelled = outputs(output_dir)
+    # The checkpoint was carried over to the new taxonomy, so the next run resumes and changes nothing
+    assert analyze_reviews.load_checkpoint(EXPORT_B, taxonomy, languages) is not None
+    run_incremental(taxonomy, languages)
+    assert outputs(output_dir) == relabelled
+
+    shutil.rmtree(output_dir)
+    run_incremental(taxonomy, languages)
+    assert outputs(output_dir) == relabelled
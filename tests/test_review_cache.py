@@ -0,0 +1,36 @@
+import os
+import shutil
+
+import pytest
+
+import analyze_reviews
+import review_cache
+from conftest import HEADER, alert_batches
+from review_dedup import FingerprintStore
+
+
+@pytest.fixture
+def dump_with_repeat(tmp_path):
+    # The export with its first alert batch posted twice in a row
+    batches = alert_batches()
+    batches.insert(1, batches[1])
+    path = str(tmp_path / "dump with repeat")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER.join(batches))
+    return path
+
+
+def test_both_fills_cache_the_same_reviews(output_dir, dump_with_repeat):
+    with FingerprintStore(analyze_reviews.DEDUP_DIR) as store:
+        trends = analyze_reviews.run_incremental(dump_with_repeat, analyze_reviews.build_taxonomy(), store=store, languages=analyze_reviews.build_language_taxonomies())
+    assert store.duplicates > 0
+    review_cache.store_outputs(dump_with_repeat, os.path.join(output_dir, "parsed_reviews.csv"), trends)
+    key = review_cache.cache_key(dump_with_repeat)
+    stored = review_cache.encode_table(review_cache.read_tables(key, ["reviews"])["reviews"])
+    stored_trends = review_cache.read_trends(key)
+
+    # Filled by a reporting script instead, which parses the dump itself
+    shutil.rmtree(review_cache.CACHE_DIR)
+    review_cache.load_trends(dump_with_repeat)
+    assert review_cache.encode_table(review_cache.read_tables(key, ["reviews"])["reviews"]) == stored
+    assert review_cache.read_trends(key) == stored_trends
@@ -0,0 +1,57 @@
+import pytest
+
+import analyze_reviews
+from conftest import EXPORT_A, EXPORT_B
+from review_dedup import FingerprintStore
+
+
+def reviews_in(trends):
+    return sum(trends["day_totals"].values())
+
+
+def run_bulk(sources):
+    with FingerprintStore(analyze_reviews.DEDUP_DIR) as store:
+        return reviews_in(analyze_reviews.run_bulk(sources, analyze_reviews.build_taxonomy(), workers=1, store=store))
+
+
+def run_incremental(source):
+    with FingerprintStore(analyze_reviews.DEDUP_DIR) as store:
+        return reviews_in(analyze_reviews.run_incremental(source, analyze_reviews.build_taxonomy(), store=store))
+
+
+def test_overlapping_exports_parsed_one_at_a_time(output_dir):
+    alone_b = run_incremental(EXPORT_B)
+    alone_a = run_incremental(EXPORT_A)
+    assert alone_a > 0 and alone_b > 0
+    # Export A's claims are gone with its outputs, so B's shared reviews are not skipped
+    assert run_incremental(EXPORT_B) == alone_b
+    # A resumed run keeps what it wrote and adds nothing
+    assert run_incremental(EXPORT_B) == alone_b
+
+
+def test_overlapping_exports_rebuilt_one_at_a_time(output_dir):
+    alone_b = run_bulk([EXPORT_B])
+    alone_a = run_bulk([EXPORT_A])
+    assert alone_a > 0 and alone_b > 0
+    # Export A's claims are gone with its outputs, so B's shared reviews are not skipped
+    assert run_bulk([EXPORT_B]) == alone_b
+    assert run_incremental(EXPORT_B) == alone_b
+    # A resumed run keeps what it wrote and adds nothing
+    assert run_incremental(EXPORT_B) == alone_b
+
+
+def test_overlapping_exports_ingested_together(output_dir):
+    alone_a = run_bulk([EXPORT_A])
+    alone_b = run_bulk([EXPORT_B])
+    together = run_bulk([EXPORT_A, EXPORT_B])
+    # The shared reviews are counted once
+    assert max(alone_a, alone_b) <= together < alone_a + alone_b
+    assert run_bulk([EXPORT_A, EXPORT_B]) == together
+
+
+def test_keep_sources_leaves_bloom_alone_without_other_sources(tmp_path, monkeypatch):
+    with FingerprintStore(str(tmp_path)) as store:
+        bloom = store.bloom
+        monkeypatch.setattr(store, "_rebuild_bloom", lambda capacity: pytest.fail("Bloom filter rebuilt"))
+        store.keep_sources([EXPORT_A])
+        assert store.bloom is bloom
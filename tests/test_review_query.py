@@ -0,0 +1,104 @@
+import csv
+
+import pytest
+
+from analyze_reviews import PARSED_REVIEWS_HEADER
+from review_index import TokenIndex
+from review_query import QueryEngine, QueryError, parse_query
+
+
+REVIEWS = [  # (day_index, review_text); row numbers follow the list
+    (0, "App crashes on start"),
+    (0, "Refund my coins please"),
+    (1, "crash after the update, want a refund"),
+    (2, "Great stories but too many ads"),
+    (3, "Money back now! I don't like it"),
+    (5, "ads ads ads, no refund"),
+    (8, "back money, strange order"),
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    path = str(tmp_path / "parsed_reviews.csv")
+    text_col, day_col = PARSED_REVIEWS_HEADER.index("review_text"), PARSED_REVIEWS_HEADER.index("day_index")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(PARSED_REVIEWS_HEADER)
+        for day, text in REVIEWS:
+            row = [""] * len(PARSED_REVIEWS_HEADER)
+            row[text_col], row[day_col] = text, day
+            w.writerow(row)
+    engine = QueryEngine(TokenIndex.from_csv(path), path)
+    yield engine
+    engine.close()
+
+
+def test_precedence():
+    # NOT binds tightest, then AND (explicit or adjacent), then OR
+    assert parse_query("a OR b AND c") == ("or", [("word", "a"), ("and", [("word", "b"), ("word", "c")])])
+    assert parse_query("a b OR NOT c") == ("or", [("and", [("word", "a"), ("word", "b")]), ("not", ("word", "c"))])
+    assert parse_query("NOT a AND b") == ("and", [("not", ("word", "a")), ("word", "b")])
+    assert parse_query("(a OR b) c") == ("and", [("or", [("word", "a"), ("word", "b")]), ("word", "c")])
+
+
+@pytest.mark.parametrize("query, rows", [
+    ("refund OR crash* AND update", [1, 2, 5]),
+    ("(refund OR crash*) AND update", [2]),
+    ("refund NOT ads", [1, 2]),
+    ("NOT refund AND NOT ads", [0, 4, 6]),
+    ("crash*", [0, 2]),
+    ('"money back"', [4]),
+    ("don't", [4]),
+    ("money back", [4, 6]),
+])
+def test_search(engine, query, rows):
+    assert engine.search(query) == rows
+
+
+def test_parse_days():
+    assert parse_query("day:3") == ("day", 3, 3)
+    assert parse_query("day:2..5") == ("day", 2, 5)
+    assert parse_query("day:2..") == ("day", 2, None)
+    assert parse_query("day:..5") == ("day", None, 5)
+
+
+@pytest.mark.parametrize("query, rows", [
+    ("day:0", [0, 1]),
+    ("day:1..3", [2, 3, 4]),
+    ("day:3..", [4, 5, 6]),
+    ("day:..1", [0, 1, 2]),
+    ("refund day:1..", [2, 5]),
+    ("refund NOT day:..0", [2, 5]),
+    ("ads day:4..7", [5]),
+    ("day:6..7", []),
+])
+def test_search_days(engine, query, rows):
+    assert engine.search(query) == rows
+
+
+def test_day_filter_on_many_rows(engine):
+    # Past 1024 candidate rows the day filter goes through the day-ordered rows instead
+    engine.index.days[:] = engine.index.days[:0]
+    engine.index.days.extend(day % 10 for day in range(5000))
+    everything = set(range(5000))
+    assert engine._in_days(everything, 3, 4) == {r for r in everything if r % 10 in (3, 4)}
+    assert engine._in_days(everything, None, 0) == {r for r in everything if r % 10 == 0}
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "refund AND",
+    "NOT",
+    "(refund OR ads",
+    "refund )",
+    "OR refund",
+    "day:",
+    "day:..",
+    "!!!",
+    "refund*ads*",
+    "don't*",
+])
+def test_malformed_queries(engine, query):
+    with pytest.raises(QueryError):
+        engine.search(query)
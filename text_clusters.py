@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Groups reviews that no rule matched into candidate themes.
+
+Texts become sparse tf-idf vectors of hashed word unigrams and bigrams, so
+no vocabulary is kept, and mini-batch k-means (Sculley, "Web-scale k-means
+clustering") fits dense centroids one batch at a time. Memory is the
+centroids, one batch and a seeding sample, whatever the number of texts: the
+texts are never held all at once. A cluster is reported with the terms that
+lift its centroid most above the corpus mean and the reviews closest to its
+centre. Texts are tokenized once; later passes read their feature counts
+back from a temporary file.
+"""
+
+import heapq
+import re
+import tempfile
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+N_FEATURES = 1 << 18  # hashed feature space; collisions are rare at this size
+N_CLUSTERS = 12
+BATCH_SIZE = 2048
+EPOCHS = 3  # passes of mini-batch updates
+SEED_SAMPLE = 5000  # texts sampled for k-means++ seeding
+TOP_TERMS = 8
+EXAMPLES = 3
+QUOTE_CHARS = 200
+RANDOM_SEED = 0
+TERM_MEMO = 1 << 20  # terms whose feature is remembered instead of re-hashed
+
+WORD_RE = re.compile(r"[^\W\d_]{2,}")  # words of two or more letters
+STOP_WORDS = frozenset(
+    "a about after all also am an and any are as at be been but by can could did do does dont for from get got had has have he her him his how i if im in into is it its just me more my no now of on one only or our out so some than that the their them then there they this to too up us very was we were what when which who will with would you your".split()
+)
+
+TextSource = Callable[[], Iterable[str]]  # returns a fresh iterator over the same texts on every call
+
+
+def text_terms(text: str) -> List[str]:
+    # Unigrams and bigrams; stop words are dropped as unigrams and only pair with content words
+    words = WORD_RE.findall(text.lower())
+    terms = [w for w in words if w not in STOP_WORDS]
+    terms.extend(f"{a} {b}" for a, b in zip(words, words[1:]) if a not in STOP_WORDS and b not in STOP_WORDS)
+    return terms
+
+
+def term_feature(term: str) -> int:
+    # crc32, not hash(): the same term must land on the same feature in every process
+    return zlib.crc32(term.encode("utf-8")) & (N_FEATURES - 1)
+
+
+class SparseRows(NamedTuple):
+    # CSR rows: row i is indices/data[indptr[i]:indptr[i + 1]], features ascending; no row is empty
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+
+    @property
+    def rows(self) -> int:
+        return len(self.indptr) - 1
+
+    def dot(self, dense: np.ndarray) -> np.ndarray:
+        # rows x dense.T for dense (k, N_FEATURES) -> (rows, k)
+        products = dense[:, self.indices] * self.data
+        return np.add.reduceat(products, self.indptr[:-1], axis=1).T
+
+
+class _FeatureMemo(dict):
+    # term -> term_feature(term), remembering at most TERM_MEMO terms
+    def __missing__(self, term: str) -> int:
+        feature = term_feature(term)
+        if len(self) < TERM_MEMO:
+            self[term] = feature
+        return feature
+
+
+class HashingVectorizer:
+    """Texts to tf-idf rows over hashed terms; idf comes from document frequencies counted first."""
+
+    def __init__(self) -> None:
+        self.doc_freq = np.zeros(N_FEATURES, dtype=np.int64)
+        self.docs = 0
+        self.idf: Optional[np.ndarray] = None
+        self.features = _FeatureMemo()
+
+    def counts(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # (position in texts, feature, count) of every distinct feature of every text, by position
+        positions: List[int] = []
+        features: List[int] = []
+        lookup = self.features.__getitem__
+        for i, text in enumerate(texts):
+            found = list(map(lookup, text_terms(text)))
+            features.extend(found)
+            positions.extend([i] * len(found))
+        keys, counts = np.unique(np.array(positions, dtype=np.int64) * N_FEATURES + np.array(features, dtype=np.int64), return_counts=True)
+        return keys // N_FEATURES, keys % N_FEATURES, counts
+
+    def add_doc_freq(self, features: np.ndarray, texts: int) -> None:
+        # `features` of counts() for `texts` texts that have terms
+        self.doc_freq += np.bincount(features, minlength=N_FEATURES)
+        self.docs += texts
+
+    def finish_idf(self) -> None:
+        self.idf = (np.log((1 + self.docs) / (1 + self.doc_freq)) + 1).astype(np.float32)
+
+    def rows(self, positions: np.ndarray, features: np.ndarray, counts: np.ndarray) -> Tuple[SparseRows, np.ndarray]:
+        # Log-scaled tf-idf rows from counts(), L2-normalized, and the positions they came from
+        weights = (1 + np.log(counts)).astype(np.float32) * self.idf[features]
+        kept, starts, lengths = np.unique(positions, return_index=True, return_counts=True)
+        norms = np.sqrt(np.add.reduceat(weights * weights, starts)) if len(kept) else np.zeros(0, dtype=np.float32)
+        indptr = np.zeros(len(kept) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        return SparseRows(indptr, features.astype(np.int64), weights / np.repeat(norms, lengths)), kept
+
+    def transform(self, texts: List[str]) -> Tuple[SparseRows, np.ndarray]:
+        return self.rows(*self.counts(texts))
+
+
+class MiniBatchKMeans:
+    def __init__(self, clusters: int, rng: np.random.Generator) -> None:
+        self.clusters = clusters
+        self.rng = rng
+        self.centroids = np.zeros((clusters, N_FEATURES), dtype=np.float32)
+        self.counts = np.zeros(clusters, dtype=np.int64)  # texts each centroid has averaged
+
+    def seed(self, sample: SparseRows) -> None:
+        # k-means++ over the sample; rows are unit vectors, so |x - c|^2 = 2 - 2 x.c
+        chosen = [int(self.rng.integers(sample.rows))]
+        nearest = np.full(sample.rows, np.inf)
+        for j in range(self.clusters):
+            row = chosen[-1]
+            start, end = sample.indptr[row], sample.indptr[row + 1]
+            self.centroids[j, sample.indices[start:end]] = sample.data[start:end]
+            if j + 1 == self.clusters:
+                break
+            sims = sample.dot(self.centroids[j:j + 1])[:, 0]
+            nearest = np.minimum(nearest, np.maximum(2 - 2 * sims, 0))
+            total = nearest.sum()
+            chosen.append(int(self.rng.choice(sample.rows, p=nearest / total)) if total > 0 else int(self.rng.integers(sample.rows)))
+
+    def assign(self, batch: SparseRows) -> Tuple[np.ndarray, np.ndarray]:
+        # Nearest centroid of every row and its squared distance
+        dist = (self.centroids * self.centroids).sum(axis=1) - 2 * batch.dot(self.centroids) + 1
+        labels = dist.argmin(axis=1)
+        return labels, dist[np.arange(batch.rows), labels]
+
+    def partial_fit(self, batch: SparseRows) -> None:
+        # Every centroid stays the mean of all rows it has been assigned
+        labels, _ = self.assign(batch)
+        added = np.bincount(labels, minlength=self.clusters)
+        totals = self.counts + added
+        hit = added > 0
+        self.centroids[hit] *= (self.counts[hit] / totals[hit])[:, None].astype(np.float32)
+        row_labels = np.repeat(labels, np.diff(batch.indptr))
+        np.add.at(self.centroids, (row_labels, batch.indices), batch.data / totals[row_labels])
+        self.counts = totals
+
+
+@dataclass
+class TextCluster:
+    size: int
+    top_terms: List[str]
+    examples: List[str]  # the texts closest to the centre, shortened to QUOTE_CHARS
+
+
+def _batches(texts: Iterable[str]) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for text in texts:
+        batch.append(text)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _quote(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= QUOTE_CHARS else text[:QUOTE_CHARS - 3].rstrip() + "..."
+
+
+def _spill(f, positions: np.ndarray, features: np.ndarray, counts: np.ndarray) -> None:
+    np.save(f, positions.astype(np.uint16))
+    np.save(f, features.astype(np.uint32))
+    np.save(f, np.minimum(counts, np.iinfo(np.uint16).max).astype(np.uint16))
+
+
+def _unspill(f, batches: int) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    f.seek(0)
+    for _ in range(batches):
+        yield np.load(f), np.load(f), np.load(f)
+
+
+def cluster_texts(source: TextSource, clusters: int = N_CLUSTERS, seed: int = RANDOM_SEED) -> List[TextCluster]:
+    # Candidate themes among the texts of `source`, largest first; texts without a word are left out.
+    # Texts are tokenized once: each batch's feature counts go to a temporary file, and the
+    # k-means passes read them back; the last pass streams `source` again only for quotes.
+    rng = np.random.default_rng(seed)
+    vectorizer = HashingVectorizer()
+    with tempfile.TemporaryFile() as spill:
+        # Pass 1: feature counts, document frequencies, and a uniform sample (reservoir sampling)
+        # to seed from and to name features with
+        sample: List[str] = []
+        batches = 0
+        for batch in _batches(source()):
+            positions, features, counts = vectorizer.counts(batch)
+            kept = np.unique(positions).tolist()
+            for n, i in enumerate(kept, vectorizer.docs + 1):
+                if len(sample) < SEED_SAMPLE:
+                    sample.append(batch[i])
+                else:
+                    slot = int(rng.integers(n))
+                    if slot < SEED_SAMPLE:
+                        sample[slot] = batch[i]
+            vectorizer.add_doc_freq(features, len(kept))
+            _spill(spill, positions, features, counts)
+            batches += 1
+        if not vectorizer.docs:
+            return []
+        vectorizer.finish_idf()
+        model = MiniBatchKMeans(min(clusters, len(sample)), rng)
+        model.seed(vectorizer.transform(sample)[0])
+
+        for _ in range(EPOCHS):
+            for counted in _unspill(spill, batches):
+                rows, _ = vectorizer.rows(*counted)
+                if rows.rows:
+                    model.partial_fit(rows)
+
+        sizes = np.zeros(model.clusters, dtype=np.int64)
+        closest: List[List[Tuple[float, int, str]]] = [[] for _ in range(model.clusters)]
+        seen = 0
+        for batch, counted in zip(_batches(source()), _unspill(spill, batches)):
+            rows, kept = vectorizer.rows(*counted)
+            if rows.rows:
+                labels, dist = model.assign(rows)
+                sizes += np.bincount(labels, minlength=model.clusters)
+                for label, d, i in zip(labels.tolist(), dist.tolist(), kept.tolist()):
+                    heap = closest[label]
+                    item = (-d, -(seen + i), batch[i])  # ties go to the earlier text
+                    if any(text == batch[i] for _, _, text in heap):
+                        continue  # repeated reviews are quoted once
+                    if len(heap) < EXAMPLES:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+            seen += len(batch)
+
+    # Terms are ranked by how far a centroid exceeds the corpus mean, the count-weighted mean of the
+    # centroids. A feature is named by the commonest term on it in the sample.
+    mean = (model.centroids * (model.counts / max(model.counts.sum(), 1))[:, None]).sum(axis=0)
+    lift = model.centroids - mean
+    candidates = np.argsort(-lift, axis=1)[:, :TOP_TERMS * 3]
+    names: Dict[int, Counter] = {f: Counter() for f in candidates.ravel().tolist()}
+    for text in sample:
+        for term in text_terms(text):
+            feature = vectorizer.features[term]
+            if feature in names:
+                names[feature][term] += 1
+
+    found: List[TextCluster] = []
+    for j in range(model.clusters):
+        if not sizes[j]:
+            continue
+        terms = [names[f].most_common(1)[0][0] for f in candidates[j].tolist() if lift[j, f] > 0 and names[f]]
+        examples = [_quote(text) for _, _, text in sorted(closest[j], reverse=True)]
+        found.append(TextCluster(int(sizes[j]), terms[:TOP_TERMS], examples))
+    found.sort(key=lambda c: -c.size)
+    return found
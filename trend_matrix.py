@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Dense day-by-label count matrices for trends.
+
+Nested {day: {label: count}} dicts only hold the days something happened
+on: a quiet day is missing rather than zero, and any statistic over a window
+of days silently skips it. A CountMatrix has a row for every day from the
+first to the last and a column for every label, zero-filled, and is built
+by one scatter-add (np.bincount) over parallel arrays of day and label ids.
+Totals, per-day rates, rolling windows and weekly roll-ups are array
+operations on it; to_nested() gives the dict form back, zeros left out, for
+the JSON outputs. DayCounts builds one from a stream, folding its buffered
+hits into the matrix every FLUSH_EVERY hits, so memory stays at the matrix
+and one buffer.
+"""
+
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+FLUSH_EVERY = 1 << 16  # buffered hits per scatter-add in DayCounts
+WEEK_DAYS = 7  # as analyze_reviews.week_for_day
+
+
+def _scatter(first_day: int, rows: int, columns: int, days: np.ndarray, labels: np.ndarray, weights: Optional[np.ndarray] = None) -> np.ndarray:
+    # (rows, columns) counts of (day, label) pairs, day first_day in row 0
+    flat = (days - first_day) * columns + labels
+    counts = np.bincount(flat, weights, minlength=rows * columns)
+    return counts.astype(np.int64).reshape(rows, columns)
+
+
+class CountMatrix:
+    """counts[i, j]: hits of labels[j] on day first_day + i; reviews[i]: reviews on that day."""
+
+    def __init__(self, first_day: int, labels: List[str], counts: np.ndarray, reviews: np.ndarray) -> None:
+        self.first_day = first_day
+        self.labels = labels
+        self.counts = counts
+        self.reviews = reviews
+
+    @classmethod
+    def from_hits(cls, labels: List[str], hit_days: Sequence[int], hit_labels: Sequence[int], review_days: Sequence[int]) -> "CountMatrix":
+        # hit_days and hit_labels: the day and label id of every hit; review_days: the day of every
+        # review. Rows run from the first to the last day of any of them
+        hit_days = np.asarray(hit_days, dtype=np.int64)
+        hit_labels = np.asarray(hit_labels, dtype=np.int64)
+        review_days = np.asarray(review_days, dtype=np.int64)
+        every_day = np.concatenate([hit_days, review_days])
+        if not len(every_day):
+            return cls(1, labels, np.zeros((0, len(labels)), dtype=np.int64), np.zeros(0, dtype=np.int64))
+        first_day, rows = int(every_day.min()), int(every_day.max() - every_day.min()) + 1
+        counts = _scatter(first_day, rows, len(labels), hit_days, hit_labels)
+        reviews = np.bincount(review_days - first_day, minlength=rows).astype(np.int64)
+        return cls(first_day, labels, counts, reviews)
+
+    @classmethod
+    def from_nested(cls, nested: Dict[str, Dict[str, int]], review_totals: Dict[str, int]) -> "CountMatrix":
+        # The inverse of to_nested() and review_totals(), e.g. for trends read back from JSON
+        counts = DayCounts()
+        for day, labelled in nested.items():
+            for label, n in labelled.items():
+                counts.add(int(day), label, n)
+        for day, n in review_totals.items():
+            counts.add_review(int(day), n)
+        return counts.matrix()
+
+    @property
+    def rows(self) -> int:
+        return len(self.reviews)
+
+    def days(self) -> np.ndarray:
+        return np.arange(self.first_day, self.first_day + self.rows)
+
+    def totals(self) -> np.ndarray:
+        # Hits of each label over all days
+        return self.counts.sum(axis=0)
+
+    def rates(self) -> np.ndarray:
+        # Hits per review of each label on each day; 0 on days without reviews
+        return np.divide(self.counts, self.reviews[:, None], out=np.zeros(self.counts.shape), where=self.reviews[:, None] > 0)
+
+    def rolling_mean(self, window: int) -> np.ndarray:
+        # Trailing mean of each label's daily hits over `window` days; the first days average what there is
+        sums = np.cumsum(self.counts, axis=0)
+        sums[window:] -= sums[:-window].copy()
+        return sums / np.minimum(np.arange(1, self.rows + 1), window)[:, None]
+
+    def between(self, first_day: Optional[int] = None, last_day: Optional[int] = None) -> "CountMatrix":
+        # Rows of the days first_day..last_day, either end open; a view, not a copy
+        lo = 0 if first_day is None else min(max(first_day - self.first_day, 0), self.rows)
+        hi = self.rows if last_day is None else min(max(last_day - self.first_day + 1, lo), self.rows)
+        return CountMatrix(self.first_day + lo, self.labels, self.counts[lo:hi], self.reviews[lo:hi])
+
+    def combine(self, labels: List[str], starts: Sequence[int]) -> "CountMatrix":
+        # Adjacent columns summed into one per label: labels[k] covers columns starts[k] to starts[k + 1]
+        counts = np.add.reduceat(self.counts, starts, axis=1) if self.rows and len(starts) else np.zeros((self.rows, len(labels)), dtype=np.int64)
+        return CountMatrix(self.first_day, labels, counts, self.reviews)
+
+    def weekly(self, week_days: int = WEEK_DAYS) -> "CountMatrix":
+        # Rows summed per week, day d in week (d - 1) // week_days + 1; first_day becomes the first week
+        if not self.rows:
+            return CountMatrix(1, self.labels, self.counts, self.reviews)
+        weeks = (self.days() - 1) // week_days + 1
+        starts = np.flatnonzero(np.r_[True, weeks[1:] != weeks[:-1]])
+        return CountMatrix(int(weeks[0]), self.labels, np.add.reduceat(self.counts, starts, axis=0), np.add.reduceat(self.reviews, starts))
+
+    def to_nested(self) -> Dict[str, Dict[str, int]]:
+        # {day: {label: count}} of the nonzero counts, days ascending and labels by name, so the
+        # result does not depend on the order the labels were first seen in
+        order = sorted(range(len(self.labels)), key=self.labels.__getitem__)
+        counts = self.counts[:, order]
+        rows, columns = np.nonzero(counts)
+        nested: Dict[str, Dict[str, int]] = {}
+        for i, j, n in zip(rows.tolist(), columns.tolist(), counts[rows, columns].tolist()):
+            nested.setdefault(str(self.first_day + i), {})[self.labels[order[j]]] = n
+        return nested
+
+    def review_totals(self) -> Dict[str, int]:
+        # {day: reviews} of the days with reviews
+        return {str(self.first_day + i): n for i, n in enumerate(self.reviews.tolist()) if n}
+
+
+class DayCounts:
+    """Counts (day, label) hits and reviews per day from a stream into a CountMatrix; labels are
+    numbered in the order they are first seen."""
+
+    def __init__(self) -> None:
+        self.label_ids: Dict[str, int] = {}
+        self.first_day = 1
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+        self.reviews = np.zeros(0, dtype=np.int64)
+        self._days = array("q")
+        self._labels = array("q")
+        self._weights = array("q")
+        self._review_days = array("q")
+        self._review_weights = array("q")
+
+    def add(self, day: int, label: str, n: int = 1) -> None:
+        label_id = self.label_ids.get(label)
+        if label_id is None:
+            label_id = self.label_ids[label] = len(self.label_ids)
+        self._days.append(day)
+        self._labels.append(label_id)
+        self._weights.append(n)
+        if len(self._days) >= FLUSH_EVERY:
+            self.flush()
+
+    def add_review(self, day: int, n: int = 1) -> None:
+        self._review_days.append(day)
+        self._review_weights.append(n)
+        if len(self._review_days) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        # Folds the buffers into the matrix, growing it to their days and labels
+        days = np.frombuffer(self._days, dtype=np.int64)
+        review_days = np.frombuffer(self._review_days, dtype=np.int64)
+        if not len(days) and not len(review_days):
+            return
+        held = [np.array([self.first_day, self.first_day + self.rows - 1])] if self.rows else []
+        every_day = np.concatenate([days, review_days] + held)
+        first_day, rows = int(every_day.min()), int(every_day.max() - every_day.min()) + 1
+        before = self.first_day - first_day
+        counts = np.zeros((rows, len(self.label_ids)), dtype=np.int64)
+        reviews = np.zeros(rows, dtype=np.int64)
+        if self.rows:
+            counts[before:before + self.rows, :self.counts.shape[1]] = self.counts
+            reviews[before:before + self.rows] = self.reviews
+        if len(days):
+            counts += _scatter(first_day, rows, len(self.label_ids), days, np.frombuffer(self._labels, dtype=np.int64), np.frombuffer(self._weights, dtype=np.int64))
+        if len(review_days):
+            reviews += np.bincount(review_days - first_day, np.frombuffer(self._review_weights, dtype=np.int64), minlength=rows).astype(np.int64)
+        self.first_day, self.counts, self.reviews = first_day, counts, reviews
+        # New buffers: the old ones are still exported to numpy
+        self._days, self._labels, self._weights = array("q"), array("q"), array("q")
+        self._review_days, self._review_weights = array("q"), array("q")
+
+    @property
+    def rows(self) -> int:
+        return len(self.reviews)
+
+    def matrix(self) -> CountMatrix:
+        self.flush()
+        return CountMatrix(self.first_day, list(self.label_ids), self.counts, self.reviews)